@@ -0,0 +1,14 @@
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+
+from .revocation import is_revoked
+
+
+class RevocationAwareJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication + revocation check (in-process filter, no DB query)."""
+
+    def get_validated_token(self, raw_token):
+        token = super().get_validated_token(raw_token)
+        if is_revoked(token.payload):
+            raise InvalidToken({"detail": "Token has been revoked", "code": "token_revoked"})
+        return token
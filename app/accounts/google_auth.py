@@ -0,0 +1,290 @@
+"""
+Google sign-in: ID-token verification and single-statement user upsert.
+
+The client sends the ID token Google issued it. It is verified here
+against Google's signing keys, which are cached in-process until the
+Cache-Control max-age of the JWKS response runs out. An unknown `kid`
+(key rotation) triggers a refetch, at most once per KEY_REFETCH_INTERVAL.
+Nothing the client claims about itself (google_id, email, name) is trusted.
+
+For tests / local dev (DEBUG only), GOOGLE_ID_TOKEN_LOCAL_KEY names a PEM
+file: `LocalIssuer` mints Google-shaped tokens with it and the verifier
+trusts its public key instead of fetching Google's.
+"""
+import hashlib
+import os
+import re
+import threading
+import time
+import uuid
+
+import jwt
+import requests
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .search import normalize_username
+from .usernames import free_username
+
+try:
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    CRYPTO_AVAILABLE = True
+except ImportError:
+    CRYPTO_AVAILABLE = False
+
+
+GOOGLE_CERTS_URL = getattr(settings, 'GOOGLE_OAUTH_CERTS_URL', 'https://www.googleapis.com/oauth2/v3/certs')
+GOOGLE_CLIENT_IDS = getattr(settings, 'GOOGLE_OAUTH_CLIENT_IDS', [])
+LOCAL_KEY_PATH = getattr(settings, 'GOOGLE_ID_TOKEN_LOCAL_KEY', None)
+
+GOOGLE_ISSUERS = ('accounts.google.com', 'https://accounts.google.com')
+DEFAULT_KEY_TTL = 3600
+KEY_REFETCH_INTERVAL = 30
+CLOCK_SKEW = 30
+
+
+class GoogleTokenError(ValueError):
+    """ID token missing, malformed, expired, or not for this app."""
+
+
+class GoogleAccountConflict(Exception):
+    """The email belongs to an account linked to a different Google id."""
+
+
+# --------------------------------------------------------------------
+# Signing keys
+# --------------------------------------------------------------------
+class GoogleSigningKeys:
+    def __init__(self, url=GOOGLE_CERTS_URL):
+        self.url = url
+        self._lock = threading.Lock()
+        self._keys = {}
+        self._expires_at = 0.0
+        self._fetched_at = 0.0
+
+    def _refresh(self):
+        resp = requests.get(self.url, timeout=5)
+        resp.raise_for_status()
+        keys = {k.key_id: k for k in jwt.PyJWKSet.from_dict(resp.json()).keys}
+        match = re.search(r'max-age=(\d+)', resp.headers.get('Cache-Control', ''))
+        ttl = int(match.group(1)) if match else DEFAULT_KEY_TTL
+        self._keys = keys
+        self._expires_at = time.monotonic() + ttl
+
+    def get(self, kid):
+        now = time.monotonic()
+        key = self._keys.get(kid)
+        if key is not None and now < self._expires_at:
+            return key
+        with self._lock:
+            key = self._keys.get(kid)
+            stale = time.monotonic() >= self._expires_at
+            if (key is None or stale) and time.monotonic() - self._fetched_at >= KEY_REFETCH_INTERVAL:
+                self._fetched_at = time.monotonic()
+                try:
+                    self._refresh()
+                except Exception:
+                    # Google unreachable: keep verifying with the keys we have
+                    pass
+            return self._keys.get(kid)
+
+
+class LocalIssuer:
+    """Stand-in for Google in tests: an RSA key kept in a PEM file."""
+    issuer = 'https://accounts.google.com'
+
+    def __init__(self, path):
+        if not CRYPTO_AVAILABLE:
+            raise RuntimeError('cryptography is not installed')
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                self.private_key = serialization.load_pem_private_key(f.read(), password=None)
+        else:
+            self.private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+            with open(path, 'wb') as f:
+                f.write(self.private_key.private_bytes(
+                    serialization.Encoding.PEM,
+                    serialization.PrivateFormat.PKCS8,
+                    serialization.NoEncryption(),
+                ))
+        public_pem = self.private_key.public_key().public_bytes(
+            serialization.Encoding.PEM,
+            serialization.PublicFormat.SubjectPublicKeyInfo,
+        )
+        self.kid = 'local-' + hashlib.sha256(public_pem).hexdigest()[:16]
+
+    def jwks(self):
+        jwk = jwt.algorithms.RSAAlgorithm.to_jwk(self.private_key.public_key(), as_dict=True)
+        jwk.update({'kid': self.kid, 'alg': 'RS256', 'use': 'sig'})
+        return {'keys': [jwk]}
+
+    def mint(self, sub, email, name='', picture='', audience=None, ttl=3600, email_verified=True):
+        now = int(time.time())
+        claims = {
+            'iss': self.issuer,
+            'aud': audience or (GOOGLE_CLIENT_IDS[0] if GOOGLE_CLIENT_IDS else 'local-test-client'),
+            'sub': str(sub),
+            'email': email,
+            'email_verified': email_verified,
+            'name': name,
+            'picture': picture,
+            'iat': now,
+            'exp': now + ttl,
+        }
+        return jwt.encode(claims, self.private_key, algorithm='RS256', headers={'kid': self.kid})
+
+
+class LocalSigningKeys:
+    def __init__(self, issuer):
+        self._keys = {k.key_id: k for k in jwt.PyJWKSet.from_dict(issuer.jwks()).keys}
+
+    def get(self, kid):
+        return self._keys.get(kid)
+
+
+_signing_keys = None
+
+
+def signing_keys():
+    global _signing_keys
+    if _signing_keys is None:
+        if LOCAL_KEY_PATH and settings.DEBUG:
+            _signing_keys = LocalSigningKeys(LocalIssuer(LOCAL_KEY_PATH))
+        else:
+            _signing_keys = GoogleSigningKeys()
+    return _signing_keys
+
+
+def _audiences():
+    if GOOGLE_CLIENT_IDS:
+        return list(GOOGLE_CLIENT_IDS)
+    if LOCAL_KEY_PATH and settings.DEBUG:
+        return ['local-test-client']
+    raise GoogleTokenError('Google login is not configured')
+
+
+# --------------------------------------------------------------------
+# Verification
+# --------------------------------------------------------------------
+def verify_id_token(token):
+    """Verified claims dict; raises GoogleTokenError."""
+    try:
+        kid = jwt.get_unverified_header(token).get('kid')
+    except jwt.PyJWTError:
+        raise GoogleTokenError('malformed id_token')
+
+    key = signing_keys().get(kid)
+    if key is None:
+        raise GoogleTokenError('unknown signing key')
+
+    try:
+        claims = jwt.decode(
+            token,
+            key.key,
+            algorithms=['RS256'],
+            audience=_audiences(),
+            leeway=CLOCK_SKEW,
+            options={'require': ['iss', 'aud', 'sub', 'exp', 'iat']},
+        )
+    except jwt.ExpiredSignatureError:
+        raise GoogleTokenError('id_token expired')
+    except jwt.PyJWTError as e:
+        raise GoogleTokenError(f'invalid id_token: {e}')
+
+    if claims.get('iss') not in GOOGLE_ISSUERS:
+        raise GoogleTokenError('invalid issuer')
+    if not claims.get('email') or claims.get('email_verified') not in (True, 'true'):
+        raise GoogleTokenError('Google account email is not verified')
+    return claims
+
+
+# --------------------------------------------------------------------
+# User upsert
+# --------------------------------------------------------------------
+def _upsert_sql(User, fields):
+    qn = connection.ops.quote_name
+    table = qn(User._meta.db_table)
+    columns = ', '.join(qn(f.column) for f in fields)
+    placeholders = ', '.join(['%s'] * len(fields))
+    returning = ', '.join(qn(f.column) for f in User._meta.concrete_fields)
+    return f"""
+        INSERT INTO {table} ({columns}) VALUES ({placeholders})
+        ON CONFLICT ({qn('google_id')}) DO UPDATE SET
+            {qn('is_active')} = TRUE,
+            {qn('last_login')} = EXCLUDED.{qn('last_login')},
+            {qn('updated_at')} = EXCLUDED.{qn('updated_at')},
+            {qn('profile_image')} = CASE WHEN {table}.{qn('profile_image')} = ''
+                THEN EXCLUDED.{qn('profile_image')} ELSE {table}.{qn('profile_image')} END
+        RETURNING {returning}, (xmax = 0)
+    """
+
+
+def _assign_username(user, email):
+    """New rows carry a placeholder name; swap in a readable free one."""
+    # first publish of this user is a plain directory upsert, not a rename
+    user._loaded_username = None
+    for _ in range(3):
+        user.username = free_username(email.split('@')[0])
+        try:
+            with transaction.atomic():
+                user.save(update_fields=['username'])
+            return
+        except IntegrityError:
+            continue
+
+
+def upsert_google_user(claims):
+    """
+    One INSERT ... ON CONFLICT (google_id) DO UPDATE ... RETURNING: a
+    returning Google user costs exactly this statement. Only a brand-new
+    user (username pick) or an existing email account being linked
+    takes further queries.
+    """
+    User = get_user_model()
+    now = timezone.now()
+    email = claims['email']
+
+    user = User(
+        # unique placeholder until _assign_username runs
+        username=f"g_{uuid.uuid4().hex}",
+        email=email,
+        google_id=claims['sub'],
+        full_name=claims.get('name') or '',
+        profile_image=claims.get('picture') or '',
+        is_email_verified=True,  # Google emails are verified
+        is_active=True,
+        last_login=now,
+        date_joined=now,
+    )
+    user.set_unusable_password()
+    user.username_normalized = normalize_username(user.username)
+
+    fields = [f for f in User._meta.concrete_fields if not f.primary_key]
+    params = [f.get_db_prep_save(f.pre_save(user, True), connection) for f in fields]
+
+    try:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(_upsert_sql(User, fields), params)
+            row = cursor.fetchone()
+    except IntegrityError:
+        # email already registered (password signup): link it if it's unclaimed
+        linked = User.objects.filter(
+            Q(google_id__isnull=True) | Q(google_id=''),
+            email=email,
+        ).update(
+            google_id=claims['sub'], is_active=True, is_email_verified=True,
+            last_login=now, updated_at=now,
+        )
+        if not linked:
+            raise GoogleAccountConflict('email is linked to a different Google account')
+        return User.objects.get(email=email)
+
+    *values, inserted = row
+    user = User.from_db(connection.alias, [f.attname for f in User._meta.concrete_fields], values)
+    if inserted:
+        _assign_username(user, email)
+    return user
@@ -0,0 +1,123 @@
+import random
+import string
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, models
+
+from accounts.search import _after, normalize_username, search_users
+
+
+TABLE = "bench_user_search"
+
+
+class BenchUser(models.Model):
+    """Unmanaged view of the synthetic table so search_users runs unchanged."""
+    id = models.BigIntegerField(primary_key=True)
+    username = models.CharField(max_length=150)
+    username_normalized = models.CharField(max_length=150)
+
+    class Meta:
+        app_label = "accounts"
+        managed = False
+        db_table = TABLE
+
+
+def _percentile(sorted_values, pct):
+    index = max(0, int(round(len(sorted_values) * pct / 100.0)) - 1)
+    return sorted_values[index]
+
+
+class Command(BaseCommand):
+    help = "p50/p95/p99 of indexed user search vs the old icontains scan on a synthetic table"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1_000_000)
+        parser.add_argument("--queries", type=int, default=300)
+        parser.add_argument("--page-size", type=int, default=20)
+        parser.add_argument("--keep", action="store_true", help="Don't drop the table afterwards")
+        parser.add_argument("--explain", action="store_true", help="Print EXPLAIN ANALYZE for one query per tier")
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        self._create_table(options["users"])
+        try:
+            prefixes = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(1, 4)))
+                        for _ in range(options["queries"])]
+            substrings = ["".join(rng.choices(string.ascii_lowercase, k=3))
+                          for _ in range(options["queries"])]
+
+            qs = BenchUser.objects.only("id", "username", "username_normalized")
+            limit = options["page_size"]
+
+            self._report("prefix (indexed)", prefixes,
+                         lambda q: search_users(qs, q, limit))
+            self._report("substring (indexed)", substrings,
+                         lambda q: search_users(qs, q, limit))
+            self._report("second page (cursor)", prefixes,
+                         lambda q: search_users(qs, q, limit, search_users(qs, q, limit)[1]))
+            self._report("icontains + count (old)", substrings, lambda q: (
+                list(BenchUser.objects.filter(username__icontains=q).order_by("username")[:limit]),
+                BenchUser.objects.filter(username__icontains=q).count(),
+            ))
+            if options["explain"]:
+                self._explain(qs, prefixes[0], substrings[0], limit)
+        finally:
+            if not options["keep"]:
+                with connection.cursor() as cursor:
+                    cursor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+
+    def _create_table(self, count):
+        self.stdout.write(f"building {TABLE} with {count} users ...")
+        started = time.perf_counter()
+        with connection.cursor() as cursor:
+            cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            cursor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+            # md5 gives well-spread names; mixed case exercises normalization
+            cursor.execute(f"""
+                CREATE UNLOGGED TABLE {TABLE} AS
+                SELECT g::bigint AS id,
+                       initcap(substr(md5(g::text), 1, 6)) || '_' || g AS username
+                FROM generate_series(1, %s) AS g
+            """, [count])
+            cursor.execute(f"ALTER TABLE {TABLE} ADD PRIMARY KEY (id)")
+            cursor.execute(f"ALTER TABLE {TABLE} ADD COLUMN username_normalized varchar(150)")
+            cursor.execute(f"UPDATE {TABLE} SET username_normalized = lower(username)")
+            # same indexes as accounts.User
+            cursor.execute(
+                f"CREATE INDEX {TABLE}_prefix ON {TABLE} "
+                f"(username_normalized varchar_pattern_ops, id)"
+            )
+            cursor.execute(f"CREATE INDEX {TABLE}_order ON {TABLE} (username_normalized, id)")
+            cursor.execute(
+                f"CREATE INDEX {TABLE}_trgm ON {TABLE} USING gin (username_normalized gin_trgm_ops)"
+            )
+            cursor.execute(f"ANALYZE {TABLE}")
+        self.stdout.write(f"  built in {time.perf_counter() - started:.1f}s")
+
+    def _explain(self, qs, prefix, substring, limit):
+        prefix, substring = normalize_username(prefix), normalize_username(substring)
+        first = qs.filter(username_normalized__startswith=prefix)
+        last = first.order_by("username_normalized", "id")[limit - 1:limit].first()
+        plans = [
+            (f"prefix {prefix!r}", first),
+            (f"substring {substring!r}", qs.filter(username_normalized__contains=substring)
+                                           .exclude(username_normalized__startswith=substring)),
+        ]
+        if last is not None:
+            plans.append((f"second page {prefix!r}", _after(first, last.username_normalized, last.id)))
+        for label, tier_qs in plans:
+            self.stdout.write(self.style.MIGRATE_HEADING(f"EXPLAIN {label}"))
+            page = tier_qs.order_by("username_normalized", "id")[:limit + 1]
+            self.stdout.write(page.explain(analyze=True, buffers=True))
+
+    def _report(self, label, queries, run):
+        latencies = []
+        for q in queries:
+            t0 = time.perf_counter()
+            run(q)
+            latencies.append((time.perf_counter() - t0) * 1000)
+        latencies.sort()
+        self.stdout.write(self.style.MIGRATE_HEADING(label))
+        for pct in (50, 95, 99):
+            self.stdout.write(f"  p{pct:<3}  {_percentile(latencies, pct):10.2f} ms")
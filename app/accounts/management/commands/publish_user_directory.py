@@ -0,0 +1,29 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from common.user_directory import publish, user_event
+
+
+class Command(BaseCommand):
+    help = "Publish a full snapshot of the user directory to the chat change feed"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        qs = User.objects.only("id", "username", "username_normalized", "profile_image").order_by("pk")
+
+        last_pk = None
+        total = 0
+        while True:
+            batch = qs if last_pk is None else qs.filter(pk__gt=last_pk)
+            users = list(batch[:options["batch_size"]])
+            if not users:
+                break
+            publish([user_event(u) for u in users])
+            last_pk = users[-1].pk
+            total += len(users)
+            self.stdout.write(f"  {total} users published")
+
+        self.stdout.write(self.style.SUCCESS(f"Published {total} users"))
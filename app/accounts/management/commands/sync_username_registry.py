@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from accounts.usernames import BLOOM_BITS, BLOOM_HASHES, rebuild_registry
+
+
+class Command(BaseCommand):
+    help = "Rebuild the Redis Bloom filter behind fast username-availability checks"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"Bloom filter: {BLOOM_BITS} bits ({BLOOM_BITS / 8 / 1024 / 1024:.1f} MiB), {BLOOM_HASHES} hashes"
+        )
+        total = rebuild_registry(batch_size=options["batch_size"], stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(f"Registered {total} usernames"))
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.9 on 2026-10-19 16:00
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+from django.db.models.functions import Lower
+
+
+def backfill_username_normalized(apps, schema_editor):
+    User = apps.get_model('accounts', 'User')
+    # lower() in SQL; non-ASCII names get the exact NFKC form on their next save
+    User.objects.update(username_normalized=Lower('username'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_user_profile_image_user_updated_at_and_more'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='user',
+            name='username_normalized',
+            field=models.CharField(blank=True, default='', editable=False, max_length=150),
+        ),
+        migrations.RunPython(backfill_username_normalized, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['username_normalized', 'id'], name='user_username_norm_prefix', opclasses=['varchar_pattern_ops', 'int8_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['username_normalized'], name='user_username_norm_trgm', opclasses=['gin_trgm_ops']),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.9 on 2026-10-19 18:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_user_username_normalized'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['username_normalized', 'id'], name='user_username_norm_order'),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.contrib.postgres.indexes import GinIndex
 from django.utils import timezone
 from datetime import timedelta
 import os
@@ -19,6 +20,8 @@ class User(AbstractUser):
     # Profile
     full_name = models.CharField(max_length=150, blank=True)
     username = models.CharField(max_length=150, unique=True, blank=True)
+    # NFKC + lowercase copy of username, kept in sync in save() – search index
+    username_normalized = models.CharField(max_length=150, blank=True, default='', editable=False)
     profile_image = models.URLField(blank=True)  # ImageKit URL
 
     # Mobile (verified later)
@@ -38,6 +41,44 @@ class User(AbstractUser):
     # Metadata
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # prefix search: LIKE 'q%'
+            models.Index(
+                fields=['username_normalized', 'id'],
+                name='user_username_norm_prefix',
+                opclasses=['varchar_pattern_ops', 'int8_ops'],
+            ),
+            # ORDER BY (username_normalized, id) + keyset filter: pattern_ops
+            # sorts bytewise, so it can't hand back the collation order
+            models.Index(fields=['username_normalized', 'id'], name='user_username_norm_order'),
+            # substring search: LIKE '%q%'
+            GinIndex(
+                fields=['username_normalized'],
+                name='user_username_norm_trgm',
+                opclasses=['gin_trgm_ops'],
+            ),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # remembered so a rename can go out as user.renamed (accounts/signals.py)
+        instance._loaded_username = instance.__dict__.get('username')
+        return instance
+
+    def save(self, *args, **kwargs):
+        from .search import normalize_username
+        self.username_normalized = normalize_username(self.username)
+        update_fields = kwargs.get('update_fields')
+        if update_fields:
+            # updated_at versions /accounts/me/ (ETag / Last-Modified)
+            update_fields = set(update_fields) | {'updated_at'}
+            if 'username' in update_fields:
+                update_fields.add('username_normalized')
+            kwargs['update_fields'] = update_fields
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return self.username or self.email
 
@@ -0,0 +1,251 @@
+"""
+JWT revocation and refresh-token rotation.
+
+Every token carries a `fam` (family) claim shared by one login's refresh
+chain and the access tokens minted from it. Revoked jtis / families sit in
+the Redis sorted set `jwt:revoked` (scored by when the entry may be
+dropped); per-user "everything issued before T" cut-offs sit in the hash
+`jwt:revoked_users`. Cut-offs are in microseconds and are compared with the
+token's `iat_us` claim, because the standard `iat` only has whole seconds.
+
+Each process mirrors both in memory: revoked ids go into an in-process
+Bloom filter, cut-offs into a dict. A subscriber thread keeps them current
+from the `jwt:revocations` pub/sub channel, so checking a token on an
+authenticated request is a memory lookup. A Redis round trip happens only
+when the filter says "maybe" (a real revocation or a rare false positive).
+
+Refresh rotation: a refresh token can be used once. The jti is claimed
+with SET NX, and presenting an already-used one revokes its whole family
+(token theft: attacker and victim both hold it).
+"""
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+from django.conf import settings
+
+from common.bloom import BloomFilter
+from common.redis_service import redis_client
+
+
+logger = logging.getLogger(__name__)
+
+REVOKED_KEY = "jwt:revoked"
+REVOKED_USERS_KEY = "jwt:revoked_users"
+USED_KEY = "jwt:used:{jti}"
+CHANNEL = "jwt:revocations"
+ISSUED_AT_CLAIM = "iat_us"
+
+BLOOM_CAPACITY = getattr(settings, 'JWT_REVOCATION_BLOOM_CAPACITY', 200_000)
+BLOOM_ERROR_RATE = getattr(settings, 'JWT_REVOCATION_BLOOM_ERROR_RATE', 0.001)
+# drop expired entries and rebuild the (add-only) filter this often
+REBUILD_INTERVAL = getattr(settings, 'JWT_REVOCATION_REBUILD_INTERVAL', 3600)
+
+
+def _refresh_lifetime():
+    return int(settings.SIMPLE_JWT['REFRESH_TOKEN_LIFETIME'].total_seconds())
+
+
+def new_family():
+    return uuid.uuid4().hex
+
+
+def now_us():
+    return time.time_ns() // 1000
+
+
+class TokenRevoked(Exception):
+    pass
+
+
+class RefreshReuse(TokenRevoked):
+    """A rotated-out refresh token came back – its family is now revoked."""
+
+
+# --------------------------------------------------------------------
+# In-process mirror
+# --------------------------------------------------------------------
+class RevocationMirror:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._bloom = BloomFilter(BLOOM_CAPACITY, BLOOM_ERROR_RATE)
+        self._user_cutoffs = {}
+        self._loaded_at = 0.0
+        self._ready = False
+        self._pid = None
+
+    def _load(self):
+        now = time.time()
+        bloom = BloomFilter(BLOOM_CAPACITY, BLOOM_ERROR_RATE)
+        pipe = redis_client.pipeline()
+        pipe.zremrangebyscore(REVOKED_KEY, '-inf', now)
+        pipe.zrange(REVOKED_KEY, 0, -1)
+        pipe.hgetall(REVOKED_USERS_KEY)
+        _, members, cutoffs = pipe.execute()
+        for member in members:
+            bloom.add(member)
+        horizon = (now - _refresh_lifetime()) * 1_000_000
+        user_cutoffs = {uid: int(ts) for uid, ts in cutoffs.items() if int(ts) > horizon}
+        with self._lock:
+            self._bloom = bloom
+            self._user_cutoffs = user_cutoffs
+            self._loaded_at = now
+            self._ready = True
+
+    def _apply(self, message):
+        try:
+            event = json.loads(message)
+        except ValueError:
+            return
+        with self._lock:
+            if event.get('member'):
+                self._bloom.add(event['member'])
+            if event.get('user_id'):
+                uid = str(event['user_id'])
+                self._user_cutoffs[uid] = max(self._user_cutoffs.get(uid, 0), int(event['before']))
+
+    def _listen(self):
+        while True:
+            pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(CHANNEL)
+                # snapshot after subscribing, so nothing published in between is lost
+                self._load()
+                while True:
+                    message = pubsub.get_message(timeout=1.0)
+                    if message and message.get('type') == 'message':
+                        self._apply(message['data'])
+                    if time.time() - self._loaded_at > REBUILD_INTERVAL:
+                        self._load()
+            except Exception:
+                logger.warning("revocation subscriber lost Redis, resyncing", exc_info=True)
+                with self._lock:
+                    self._ready = False
+                time.sleep(1)
+            finally:
+                try:
+                    pubsub.close()
+                except Exception:
+                    pass
+
+    def start(self):
+        # one subscriber per process (gunicorn / daphne workers fork)
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._ready = False
+        threading.Thread(target=self._listen, name="jwt-revocations", daemon=True).start()
+
+    def maybe_revoked(self, member):
+        """None when the mirror isn't synced yet (caller asks Redis)."""
+        self.start()
+        if not self._ready:
+            return None
+        return member in self._bloom
+
+    def user_cutoff(self, user_id):
+        self.start()
+        if not self._ready:
+            return None
+        return self._user_cutoffs.get(str(user_id), 0)
+
+
+mirror = RevocationMirror()
+
+
+# --------------------------------------------------------------------
+# Revoking
+# --------------------------------------------------------------------
+def _revoke_member(member, until):
+    pipe = redis_client.pipeline()
+    pipe.zadd(REVOKED_KEY, {member: until})
+    pipe.publish(CHANNEL, json.dumps({'member': member}))
+    pipe.execute()
+
+
+def revoke_family(family):
+    """Every refresh / access token of one login chain."""
+    _revoke_member(f"fam:{family}", time.time() + _refresh_lifetime())
+
+
+def revoke_jti(jti, exp):
+    _revoke_member(f"jti:{jti}", exp)
+
+
+def revoke_user(user_id):
+    """Everything issued to the user so far (deactivation, password reset)."""
+    before = now_us()
+    pipe = redis_client.pipeline()
+    pipe.hset(REVOKED_USERS_KEY, str(user_id), before)
+    pipe.publish(CHANNEL, json.dumps({'user_id': str(user_id), 'before': before}))
+    pipe.execute()
+
+
+# --------------------------------------------------------------------
+# Checking
+# --------------------------------------------------------------------
+def _confirmed(member):
+    try:
+        return redis_client.zscore(REVOKED_KEY, member) is not None
+    except Exception:
+        # can't confirm a filter hit – fail closed
+        return True
+
+
+def is_revoked(payload):
+    """True if the token (claims mapping) was revoked."""
+    user_id = payload.get(settings.SIMPLE_JWT.get('USER_ID_CLAIM', 'user_id'))
+    issued_at = payload.get(ISSUED_AT_CLAIM)
+    if issued_at is None:
+        # token without the claim: its second is only known to have started
+        # at `iat`, so one issued later in the cut-off's second is revoked too
+        issued_at = int(payload.get('iat') or 0) * 1_000_000
+
+    cutoff = mirror.user_cutoff(user_id)
+    if cutoff is None:
+        try:
+            cutoff = int(redis_client.hget(REVOKED_USERS_KEY, str(user_id)) or 0)
+        except Exception:
+            cutoff = 0
+    if issued_at and issued_at < cutoff:
+        return True
+
+    members = []
+    if payload.get('jti'):
+        members.append(f"jti:{payload['jti']}")
+    if payload.get('fam'):
+        members.append(f"fam:{payload['fam']}")
+    for member in members:
+        hit = mirror.maybe_revoked(member)
+        if hit is None or hit:
+            if _confirmed(member):
+                return True
+    return False
+
+
+def check_not_revoked(payload):
+    if is_revoked(payload):
+        raise TokenRevoked('token has been revoked')
+
+
+# --------------------------------------------------------------------
+# Rotation
+# --------------------------------------------------------------------
+def claim_refresh(payload):
+    """
+    Mark a refresh token as spent. A second use is treated as theft:
+    the family is revoked and RefreshReuse raised.
+    """
+    check_not_revoked(payload)
+    jti = payload['jti']
+    ttl = max(1, int(payload['exp'] - time.time()))
+    if not redis_client.set(USED_KEY.format(jti=jti), 1, nx=True, ex=ttl):
+        if payload.get('fam'):
+            revoke_family(payload['fam'])
+        raise RefreshReuse('refresh token reuse detected')
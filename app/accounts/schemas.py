@@ -0,0 +1,125 @@
+"""
+Typed request / response payloads for the accounts JSON views (msgspec Structs).
+DRF views keep using request.data / serializers.
+"""
+from typing import Optional, Union
+
+import msgspec
+
+
+# --------------------
+# Requests
+# --------------------
+class SendRegistrationOtpRequest(msgspec.Struct):
+    email: str = ''
+    username: str = ''
+    mobile_number: str = ''
+
+
+class VerifyRegistrationOtpRequest(msgspec.Struct):
+    email: str = ''
+    otp: Union[str, int] = ''
+    password: str = ''
+
+
+class LoginRequest(msgspec.Struct):
+    username: str = ''  # username / email / mobile
+    password: str = ''
+
+
+class PasswordResetRequest(msgspec.Struct):
+    email: str = ''
+
+
+class PasswordResetVerifyRequest(msgspec.Struct):
+    email: str = ''
+    otp: Union[str, int] = ''
+
+
+class PasswordResetConfirmRequest(msgspec.Struct):
+    email: str = ''
+    reset_token: str = ''
+    new_password: str = ''
+
+
+class GoogleLoginRequest(msgspec.Struct):
+    # Google-issued ID token; google_id / email / name are read from it
+    id_token: str = ''
+
+
+class RefreshTokenRequest(msgspec.Struct):
+    refresh: str = ''
+
+
+class VerifyTokenRequest(msgspec.Struct):
+    token: Optional[str] = None
+    access: Optional[str] = None
+
+
+class PublicKeyRequest(msgspec.Struct):
+    public_key: str = ''
+
+
+# --------------------
+# Responses
+# --------------------
+class UserSummary(msgspec.Struct):
+    id: int
+    username: str
+    email: str
+    full_name: str
+    mobile_number: Optional[str]
+    role: str
+
+    @classmethod
+    def from_model(cls, user):
+        return cls(
+            id=user.id,
+            username=user.username,
+            email=user.email,
+            full_name=user.full_name,
+            mobile_number=user.mobile_number,
+            role=user.role,
+        )
+
+
+class LoginUser(UserSummary):
+    is_email_verified: bool
+
+    @classmethod
+    def from_model(cls, user):
+        return cls(
+            id=user.id,
+            username=user.username,
+            email=user.email,
+            full_name=user.full_name,
+            mobile_number=user.mobile_number,
+            role=user.role,
+            is_email_verified=user.is_email_verified,
+        )
+
+
+class UserProfile(UserSummary):
+    is_staff: bool
+    is_superuser: bool
+    is_email_verified: bool
+    is_mobile_verified: bool
+    date_joined: Optional[str]
+    last_login: Optional[str]
+
+    @classmethod
+    def from_model(cls, user):
+        return cls(
+            id=user.id,
+            username=user.username,
+            email=user.email,
+            full_name=user.full_name,
+            mobile_number=user.mobile_number,
+            role=user.role,
+            is_staff=user.is_staff,
+            is_superuser=user.is_superuser,
+            is_email_verified=user.is_email_verified,
+            is_mobile_verified=user.is_mobile_verified,
+            date_joined=user.date_joined.isoformat() if user.date_joined else None,
+            last_login=user.last_login.isoformat() if user.last_login else None,
+        )
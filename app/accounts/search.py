@@ -0,0 +1,78 @@
+"""
+Indexed username search.
+
+`User.username_normalized` (NFKC + lowercase) carries three indexes:
+  - btree varchar_pattern_ops  -> prefix tier:    LIKE 'q%'
+  - GIN gin_trgm_ops           -> substring tier: LIKE '%q%' (q >= 3 chars)
+  - btree default opclass      -> ORDER BY (username_normalized, id) and the
+                                  keyset filter (collation order, which the
+                                  pattern_ops index can't provide)
+
+Results are ranked prefix matches first, then other substring matches,
+each tier ordered by (username_normalized, id). Paging is a keyset cursor
+over (tier, username_normalized, id) – no OFFSET, no COUNT(*).
+"""
+import unicodedata
+
+from django.db.models import Q
+
+from common.cursors import decode_cursor, encode_cursor
+
+
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+# trigram index can't serve shorter substrings – below this only prefixes match
+MIN_SUBSTRING_LEN = 3
+
+PREFIX_TIER = 0
+SUBSTRING_TIER = 1
+
+
+def normalize_username(value):
+    return unicodedata.normalize('NFKC', value or '').strip().lower()
+
+
+def _after(qs, name, last_id):
+    return qs.filter(
+        Q(username_normalized__gt=name) |
+        Q(username_normalized=name, id__gt=last_id)
+    )
+
+
+def search_users(qs, search, limit, cursor=None):
+    """
+    Returns (rows, next_cursor). `qs` is any queryset over a model with
+    `username_normalized` and an integer `id` (User, or the benchmark table).
+    Raises ValueError on a malformed cursor.
+    """
+    q = normalize_username(search)
+    position = decode_cursor(cursor)
+    tier, name, last_id = PREFIX_TIER, None, None
+    if position:
+        (tier, name), last_id = position
+        last_id = int(last_id)
+
+    tiers = [(PREFIX_TIER, qs.filter(username_normalized__startswith=q) if q else qs)]
+    if q and len(q) >= MIN_SUBSTRING_LEN:
+        tiers.append((
+            SUBSTRING_TIER,
+            qs.filter(username_normalized__contains=q).exclude(username_normalized__startswith=q),
+        ))
+
+    rows = []
+    for tier_no, tier_qs in tiers:
+        if tier_no < tier:
+            continue
+        if tier_no == tier and name is not None:
+            tier_qs = _after(tier_qs, name, last_id)
+        need = limit + 1 - len(rows)
+        found = list(tier_qs.order_by('username_normalized', 'id')[:need])
+        rows.extend((tier_no, r) for r in found)
+        if len(rows) > limit:
+            break
+
+    next_cursor = None
+    if len(rows) > limit:
+        tier_no, last = rows[limit - 1]
+        next_cursor = encode_cursor([tier_no, last.username_normalized], last.id)
+    return [r for _, r in rows[:limit]], next_cursor
@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from common.user_directory import publish_user, publish_user_deleted, publish_user_renamed
+from .usernames import register_usernames
+
+
+# fields the chat directory replica carries
+DIRECTORY_FIELDS = {"username", "profile_image"}
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def user_saved(sender, instance, created, update_fields=None, **kwargs):
+    # last_login / token bookkeeping saves don't touch the directory
+    if update_fields is not None and not DIRECTORY_FIELDS & set(update_fields):
+        return
+    old_username = getattr(instance, "_loaded_username", None)
+    instance._loaded_username = instance.username
+    if instance.username and instance.username != old_username:
+        transaction.on_commit(lambda: register_usernames([instance.username]))
+    if not created and old_username is not None and old_username != instance.username:
+        transaction.on_commit(lambda: publish_user_renamed(instance, old_username))
+    else:
+        transaction.on_commit(lambda: publish_user(instance))
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def user_deleted(sender, instance, **kwargs):
+    user_id = instance.pk
+    transaction.on_commit(lambda: publish_user_deleted(user_id))
@@ -3,7 +3,7 @@ Custom SimpleJWT token classes to include username in access token
 """
 from datetime import timedelta
 from django.conf import settings
-from rest_framework_simplejwt.tokens import Token, AccessToken
+from rest_framework_simplejwt.tokens import Token, AccessToken, RefreshToken
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 
 
@@ -24,3 +24,22 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     def get_token(cls, user):
         token = CustomAccessToken.for_user(user)
         return token
+
+
+def issue_tokens(user, family=None):
+    """
+    (access, refresh) for one login chain. `family` is kept across
+    rotations so a detected reuse can revoke the whole chain.
+    """
+    from .revocation import ISSUED_AT_CLAIM, new_family, now_us
+
+    family = family or new_family()
+    # sub-second issue time, so revoke_user's cut-off is exact
+    issued_at = now_us()
+    refresh = RefreshToken.for_user(user)
+    refresh['fam'] = family
+    refresh[ISSUED_AT_CLAIM] = issued_at
+    access = CustomAccessToken.for_user(user)
+    access['fam'] = family
+    access[ISSUED_AT_CLAIM] = issued_at
+    return access, refresh
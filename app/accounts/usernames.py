@@ -0,0 +1,186 @@
+"""
+Username availability, free-suffix selection and suggestions.
+
+A Bloom filter over normalized usernames lives in one Redis bitmap
+(plain SETBIT / GETBIT, no RedisBloom module needed). It never forgets a
+name, so it can only answer "definitely free" or "maybe taken":
+
+  - "definitely free" is returned straight away – no DB query per keystroke
+  - "maybe taken" (real hit, false positive, or a since-renamed user)
+    falls through to the unique index
+
+Every User save that sets a username adds it (accounts/signals.py);
+`manage.py sync_username_registry` rebuilds the filter from the table.
+Only a finished rebuild sets the ready bit (one past the filter's bits)
+in the bitmap itself, so a bitmap that was evicted or flushed and then
+re-created by a single save is not trusted until the next rebuild.
+"""
+import random
+import re
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+
+from common.bloom import bloom_offsets, bloom_size
+from common.redis_service import redis_client
+from .search import normalize_username
+
+
+REGISTRY_KEY = "usernames:bloom"
+REGISTRY_BUILDING_KEY = "usernames:bloom:building"
+BLOOM_CAPACITY = getattr(settings, 'USERNAME_BLOOM_CAPACITY', 2_000_000)
+BLOOM_ERROR_RATE = getattr(settings, 'USERNAME_BLOOM_ERROR_RATE', 0.001)
+
+USERNAME_MAX_LENGTH = 150
+SUGGESTION_COUNT = 5
+
+BLOOM_BITS, BLOOM_HASHES = bloom_size(BLOOM_CAPACITY, BLOOM_ERROR_RATE)
+READY_BIT = BLOOM_BITS
+
+
+def _offsets(name):
+    return bloom_offsets(name, BLOOM_BITS, BLOOM_HASHES)
+
+
+# --------------------------------------------------------------------
+# Registry
+# --------------------------------------------------------------------
+def _add(pipe, key, usernames):
+    for username in usernames:
+        name = normalize_username(username)
+        if name:
+            for offset in _offsets(name):
+                pipe.setbit(key, offset, 1)
+
+
+def register_usernames(usernames):
+    """Add names to the live filter (and to a rebuild in progress)."""
+    try:
+        keys = [REGISTRY_KEY]
+        building = redis_client.get(REGISTRY_BUILDING_KEY)
+        if building:
+            keys.append(building)
+        pipe = redis_client.pipeline(transaction=False)
+        for key in keys:
+            _add(pipe, key, usernames)
+        pipe.execute()
+    except Exception:
+        pass
+
+
+def maybe_taken(username):
+    """
+    False only when the filter proves nobody has this name. True for a
+    filter hit – and whenever the filter isn't ready or Redis is down.
+    """
+    name = normalize_username(username)
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.getbit(REGISTRY_KEY, READY_BIT)
+        for offset in _offsets(name):
+            pipe.getbit(REGISTRY_KEY, offset)
+        ready, *bits = pipe.execute()
+    except Exception:
+        return True
+    return not ready or all(bits)
+
+
+def rebuild_registry(batch_size=5000, stdout=None):
+    """
+    Fill a fresh bitmap from the User table in keyset batches, then swap
+    it in with RENAME. Saves during the rebuild write to both bitmaps.
+    """
+    User = get_user_model()
+    temp_key = f"{REGISTRY_KEY}:rebuild"
+    redis_client.delete(temp_key)
+    redis_client.set(REGISTRY_BUILDING_KEY, temp_key, ex=3600)
+
+    qs = User.objects.order_by('pk').values_list('pk', 'username')
+    last_pk = None
+    total = 0
+    try:
+        while True:
+            rows = list((qs if last_pk is None else qs.filter(pk__gt=last_pk))[:batch_size])
+            if not rows:
+                break
+            pipe = redis_client.pipeline(transaction=False)
+            _add(pipe, temp_key, [username for _, username in rows])
+            pipe.execute()
+            last_pk = rows[-1][0]
+            total += len(rows)
+            if stdout is not None:
+                stdout.write(f"  {total} usernames added\n")
+
+        # the ready bit travels with the bitmap through the RENAME
+        redis_client.setbit(temp_key, READY_BIT, 1)
+        redis_client.rename(temp_key, REGISTRY_KEY)
+    finally:
+        redis_client.delete(REGISTRY_BUILDING_KEY)
+    return total
+
+
+# --------------------------------------------------------------------
+# Lookups
+# --------------------------------------------------------------------
+def username_taken(username):
+    if not maybe_taken(username):
+        return False
+    return get_user_model().objects.filter(username=username).exists()
+
+
+def _taken_with_suffix(base):
+    """
+    Every taken `<base><digits>` name (normalized) in one query: a range
+    scan on the username_normalized prefix index, regex as the filter.
+    """
+    name = normalize_username(base)
+    return set(
+        get_user_model().objects
+        .filter(username_normalized__startswith=name,
+                username_normalized__regex=rf'^{re.escape(name)}[0-9]*$')
+        .values_list('username_normalized', flat=True)
+    )
+
+
+def _clip(base, suffix=''):
+    return f"{base[:USERNAME_MAX_LENGTH - len(suffix)]}{suffix}"
+
+
+def free_username(base):
+    """`base`, else `base<n>` with the lowest free n."""
+    base = _clip(base)
+    if not maybe_taken(base):
+        return base
+    taken = _taken_with_suffix(base)
+    if normalize_username(base) not in taken:
+        return base
+    n = 1
+    while normalize_username(_clip(base, str(n))) in taken:
+        n += 1
+    return _clip(base, str(n))
+
+
+def suggest_usernames(base, count=SUGGESTION_COUNT):
+    """
+    Free alternatives to `base`: the lowest free numbered one first, then
+    random 2–4 digit suffixes – all checked against one prefix query.
+    """
+    base = _clip(normalize_username(base))
+    if not base:
+        return []
+    taken = _taken_with_suffix(base)
+
+    suggestions = []
+    n = 1
+    while normalize_username(_clip(base, str(n))) in taken:
+        n += 1
+    suggestions.append(_clip(base, str(n)))
+
+    rng = random.Random()
+    attempts = 0
+    while len(suggestions) < count and attempts < count * 20:
+        attempts += 1
+        candidate = _clip(base, str(rng.randint(10, 9999)))
+        if candidate not in taken and candidate not in suggestions:
+            suggestions.append(candidate)
+    return suggestions
@@ -1,21 +1,42 @@
-from django.http import JsonResponse
-from django.contrib.auth import authenticate, login, logout
+from django.contrib.auth import authenticate, logout
+from django.contrib.auth.models import update_last_login
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth import get_user_model
-import json
 from .models import OTP
+from .search import MAX_PAGE_SIZE, PAGE_SIZE, search_users
+from .google_auth import GoogleAccountConflict, GoogleTokenError, upsert_google_user, verify_id_token
+from .usernames import suggest_usernames, username_taken
 from .utils import send_otp
-from rest_framework_simplejwt.serializers import TokenRefreshSerializer, TokenVerifySerializer
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.serializers import TokenVerifySerializer
 from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
-from .tokens import CustomAccessToken
+from .revocation import TokenRevoked, claim_refresh, is_revoked, revoke_family, revoke_jti, revoke_user
+from .tokens import CustomAccessToken, issue_tokens
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from django.core.paginator import Paginator
 from common.otp_service import verify_otp
 from accounts.tasks import send_registration_otp_email
 from common.redis_service import rate_limit, increment_counter
+from common.codecs import not_modified, parse_body, respond, version_etag
+from common.identity_keys import store_identity
+from common.user_directory import publish_public_key
+from .schemas import (
+    GoogleLoginRequest,
+    LoginRequest,
+    LoginUser,
+    PasswordResetConfirmRequest,
+    PasswordResetRequest,
+    PasswordResetVerifyRequest,
+    PublicKeyRequest,
+    RefreshTokenRequest,
+    SendRegistrationOtpRequest,
+    UserProfile,
+    UserSummary,
+    VerifyRegistrationOtpRequest,
+    VerifyTokenRequest,
+)
 
 
 User = get_user_model()
@@ -41,6 +62,9 @@ def _user_from_request(request):
     except Exception as e:
         return None
 
+    if is_revoked(payload.payload):
+        return None
+
     # Extract user_id
     user_id = payload.get("user_id")
 
@@ -57,21 +81,14 @@ def _user_from_request(request):
 def home_view(request):
     """API home/status endpoint"""
     if request.user.is_authenticated:
-        return JsonResponse({
+        return respond(request, {
             'success': True,
             'message': 'Welcome to Django Auth API',
             'authenticated': True,
-            'user': {
-                'id': request.user.id,
-                'username': request.user.username,
-                'email': request.user.email,
-                'full_name': request.user.full_name,
-                'mobile_number': request.user.mobile_number,
-                'role': request.user.role
-            }
+            'user': UserSummary.from_model(request.user)
         })
     else:
-        return JsonResponse({
+        return respond(request, {
             'success': True,
             'message': 'Welcome to Django Auth API',
             'authenticated': False,
@@ -91,21 +108,26 @@ def home_view(request):
 
 @csrf_exempt
 def send_registration_otp(request):
-    data = json.loads(request.body)
+    try:
+        data = parse_body(request, SendRegistrationOtpRequest)
+    except ValueError as e:
+        return respond(request, {"success": False, "error": f"Invalid request body: {e}"}, status=400)
 
-    email = data.get("email")
-    username = data.get("username")
-    mobile = data.get("mobile_number")
+    email = data.email
+    username = data.username
+    mobile = data.mobile_number
 
     if not all([email, username, mobile]):
-        return JsonResponse(
+        return respond(
+            request,
             {"success": False, "error": "email, username, mobile required"},
             status=400
         )
 
     # 🔒 Rate limit per email
     if not rate_limit(f"rate:otp:{email}", limit=5, window=3600):
-        return JsonResponse(
+        return respond(
+            request,
             {"success": False, "error": "Too many OTP requests"},
             status=429
         )
@@ -113,16 +135,17 @@ def send_registration_otp(request):
     # 🔒 Rate limit per IP
     ip = request.META.get("REMOTE_ADDR")
     if not rate_limit(f"rate:otp:ip:{ip}", limit=20, window=3600):
-        return JsonResponse(
+        return respond(
+            request,
             {"success": False, "error": "Too many requests"},
             status=429
         )
 
-    if User.objects.filter(username=username).exists():
-        return JsonResponse({"success": False, "error": "Username already taken"}, status=400)
+    if username_taken(username):
+        return respond(request, {"success": False, "error": "Username already taken"}, status=400)
 
     if User.objects.filter(mobile_number=mobile).exists():
-        return JsonResponse({"success": False, "error": "Mobile already registered"}, status=400)
+        return respond(request, {"success": False, "error": "Mobile already registered"}, status=400)
 
     user, created = User.objects.get_or_create(
         email=email,
@@ -134,24 +157,28 @@ def send_registration_otp(request):
     )
 
     if not created and user.is_active:
-        return JsonResponse({"success": False, "error": "Email already registered"}, status=400)
+        return respond(request, {"success": False, "error": "Email already registered"}, status=400)
 
     # 🔥 OTP generation + TTL happens INSIDE WORKER
     send_registration_otp_email.delay(email)
 
 
-    return JsonResponse({"success": True, "message": "OTP sent"})
+    return respond(request, {"success": True, "message": "OTP sent"})
 
 @csrf_exempt
 def verify_registration_otp(request):
-    data = json.loads(request.body)
+    try:
+        data = parse_body(request, VerifyRegistrationOtpRequest)
+    except ValueError as e:
+        return respond(request, {"success": False, "error": f"Invalid request body: {e}"}, status=400)
 
-    email = data.get("email")
-    otp = data.get("otp")
-    password = data.get("password")
+    email = data.email
+    otp = str(data.otp)
+    password = data.password
 
     if not all([email, otp, password]):
-        return JsonResponse(
+        return respond(
+            request,
             {"success": False, "error": "email, otp, password required"},
             status=400
         )
@@ -159,7 +186,8 @@ def verify_registration_otp(request):
     # 🔒 OTP attempt limit
     allowed, _ = increment_counter(f"otp:attempt:{email}", limit=5)
     if not allowed:
-        return JsonResponse(
+        return respond(
+            request,
             {"success": False, "error": "Too many wrong attempts"},
             status=429
         )
@@ -167,7 +195,7 @@ def verify_registration_otp(request):
     # ✅ CORRECT KEY USAGE
     ok, msg = verify_otp(f"otp:register:{email}", otp)
     if not ok:
-        return JsonResponse({"success": False, "error": msg}, status=400)
+        return respond(request, {"success": False, "error": msg}, status=400)
 
     user = User.objects.get(email=email)
 
@@ -176,7 +204,7 @@ def verify_registration_otp(request):
     user.is_email_verified = True
     user.save()
 
-    return JsonResponse({
+    return respond(request, {
         "success": True,
         "message": "Account created successfully"
     })
@@ -186,16 +214,15 @@ def verify_registration_otp(request):
 def login_view(request):
     """API endpoint for user login (via email/username/mobile)"""
     try:
-        data = json.loads(request.body)
-        
-    except json.JSONDecodeError:
-        return JsonResponse({'error': 'Invalid JSON'}, status=400)
-    
-    username = data.get('username')
-    password = data.get('password')
+        data = parse_body(request, LoginRequest)
+    except ValueError as e:
+        return respond(request, {'error': f'Invalid request body: {e}'}, status=400)
+
+    username = data.username
+    password = data.password
     
     if not username or not password:
-        return JsonResponse({
+        return respond(request, {
             'success': False,
             'error': 'Username/email/mobile and password are required'
         }, status=400)
@@ -203,18 +230,18 @@ def login_view(request):
     
     user = authenticate(request, username=username, password=password)
     if user is not None:
-        login(request, user, backend='django.contrib.auth.backends.ModelBackend')
+        # JWT only – no session row; just keep last_login current
+        update_last_login(None, user)
         # Issue JWT tokens on login (using custom token with username)
-        refresh = RefreshToken.for_user(user)
-        access = CustomAccessToken.for_user(user)
+        access, refresh = issue_tokens(user)
         tokens = {'accessToken': str(access), 'refreshToken': str(refresh)}
-        return JsonResponse({
+        return respond(request, {
             'success': True,
             'message': 'Login successful',
             'tokens': tokens
         }, status=200)
     else:
-        return JsonResponse({
+        return respond(request, {
             'success': False,
             'error': 'Invalid username/email/mobile or password'
         }, status=401)
@@ -233,7 +260,7 @@ def update_profile(request):
         if not increment_counter(key, 3):
             return Response({"error": "username change limit reached"}, status=429)
 
-        if User.objects.filter(username=data["username"]).exists():
+        if username_taken(data["username"]):
             return Response({"error": "username taken"}, status=400)
 
         user.username = data["username"]
@@ -296,15 +323,18 @@ def upload_profile_picture(request):
 @permission_classes([IsAuthenticated])
 def users_list(request):
     search = request.GET.get('search', '').strip()
-    page = int(request.GET.get('page', 1))
-    page_size = int(request.GET.get('page_size', 20))
-
-    qs = User.objects.all()
-    if search:
-        qs = qs.filter(username__icontains=search)
+    cursor = request.GET.get('cursor') or None
+    try:
+        page_size = int(request.GET.get('page_size', PAGE_SIZE))
+    except ValueError:
+        page_size = PAGE_SIZE
+    page_size = max(1, min(page_size, MAX_PAGE_SIZE))
 
-    paginator = Paginator(qs.order_by('username'), page_size)
-    page_obj = paginator.get_page(page)
+    qs = User.objects.only('id', 'username', 'username_normalized')
+    try:
+        users, next_cursor = search_users(qs, search, page_size, cursor)
+    except ValueError:
+        return Response({"success": False, "error": "invalid cursor"}, status=400)
 
     results = [
         {
@@ -312,30 +342,35 @@ def users_list(request):
             "username": u.username,
             # zarurat ho to extra fields bhi bhej sakte ho
         }
-        for u in page_obj.object_list
+        for u in users
     ]
 
+    # keyset paging: pass next_cursor back as ?cursor= (no page numbers / counts)
     return Response({
         "results": results,
-        "page": page,
         "page_size": page_size,
-        "has_next": page_obj.has_next(),
+        "has_next": next_cursor is not None,
+        "next_cursor": next_cursor,
     })
 
 @csrf_exempt
 @require_http_methods(["POST"])
 def password_reset_request(request):
-    data = json.loads(request.body)
-    email = data.get("email")
+    try:
+        data = parse_body(request, PasswordResetRequest)
+    except ValueError as e:
+        return respond(request, {"success": False, "error": f"Invalid request body: {e}"}, status=400)
+    email = data.email
 
     if not email:
-        return JsonResponse({"success": False, "error": "email required"}, status=400)
+        return respond(request, {"success": False, "error": "email required"}, status=400)
 
     # rate limit (5 req / 10 min)
     from common.redis_service import rate_limit
     key = f"rate:password_reset:{email}"
     if not rate_limit(key, limit=5, window=600):
-        return JsonResponse(
+        return respond(
+            request,
             {"success": False, "error": "Too many requests, try later"},
             status=429
         )
@@ -343,14 +378,14 @@ def password_reset_request(request):
     user = User.objects.filter(email=email).first()
     if not user:
         # security: same response
-        return JsonResponse({"success": True, "message": "If account exists, OTP sent"})
+        return respond(request, {"success": True, "message": "If account exists, OTP sent"})
 
     from accounts.redis_otp import send_otp_redis
     otp = send_otp_redis(user.id, "password_reset")
 
     send_otp(user, "password_reset", otp)  # email/sms util
 
-    return JsonResponse({
+    return respond(request, {
         "success": True,
         "message": "OTP sent for password reset"
     })
@@ -358,23 +393,27 @@ def password_reset_request(request):
 @csrf_exempt
 @require_http_methods(["POST"])
 def password_reset_verify(request):
-    data = json.loads(request.body)
-    email = data.get("email")
-    otp = data.get("otp")
+    try:
+        data = parse_body(request, PasswordResetVerifyRequest)
+    except ValueError as e:
+        return respond(request, {"success": False, "error": f"Invalid request body: {e}"}, status=400)
+    email = data.email
+    otp = str(data.otp)
 
     if not email or not otp:
-        return JsonResponse(
+        return respond(
+            request,
             {"success": False, "error": "email & otp required"},
             status=400
         )
 
     user = User.objects.filter(email=email).first()
     if not user:
-        return JsonResponse({"success": False, "error": "Invalid OTP"}, status=400)
+        return respond(request, {"success": False, "error": "Invalid OTP"}, status=400)
 
     from accounts.redis_otp import verify_otp_redis
     if not verify_otp_redis(user.id, "password_reset", otp):
-        return JsonResponse({"success": False, "error": "Invalid or expired OTP"}, status=400)
+        return respond(request, {"success": False, "error": "Invalid or expired OTP"}, status=400)
 
     # generate reset token
     import secrets
@@ -383,7 +422,7 @@ def password_reset_verify(request):
     from common.redis_service import set_otp
     set_otp(f"reset_token:{user.id}", reset_token, ttl=600)  # 10 min
 
-    return JsonResponse({
+    return respond(request, {
         "success": True,
         "reset_token": reset_token
     })
@@ -391,32 +430,38 @@ def password_reset_verify(request):
 @csrf_exempt
 @require_http_methods(["POST"])
 def password_reset_confirm(request):
-    data = json.loads(request.body)
-    email = data.get("email")
-    reset_token = data.get("reset_token")
-    new_password = data.get("new_password")
+    try:
+        data = parse_body(request, PasswordResetConfirmRequest)
+    except ValueError as e:
+        return respond(request, {"success": False, "error": f"Invalid request body: {e}"}, status=400)
+    email = data.email
+    reset_token = data.reset_token
+    new_password = data.new_password
 
     if not all([email, reset_token, new_password]):
-        return JsonResponse(
+        return respond(
+            request,
             {"success": False, "error": "All fields required"},
             status=400
         )
 
     if len(new_password) < 8:
-        return JsonResponse(
+        return respond(
+            request,
             {"success": False, "error": "Password too short"},
             status=400
         )
 
     user = User.objects.filter(email=email).first()
     if not user:
-        return JsonResponse({"success": False, "error": "Invalid token"}, status=400)
+        return respond(request, {"success": False, "error": "Invalid token"}, status=400)
 
     from common.redis_service import get_otp, delete_otp
     stored_token = get_otp(f"reset_token:{user.id}")
 
     if not stored_token or stored_token != reset_token:
-        return JsonResponse(
+        return respond(
+            request,
             {"success": False, "error": "Invalid or expired reset token"},
             status=400
         )
@@ -424,11 +469,13 @@ def password_reset_confirm(request):
     # set new password
     user.set_password(new_password)
     user.save()
+    # sessions on other devices end with the old password
+    revoke_user(user.id)
 
     # cleanup
     delete_otp(f"reset_token:{user.id}")
 
-    return JsonResponse({
+    return respond(request, {
         "success": True,
         "message": "Password reset successful"
     })
@@ -487,8 +534,10 @@ def check_username(request):
     if not username:
         return Response({"error": "username required"}, status=400)
 
-    exists = User.objects.filter(username=username).exists()
-    return Response({"available": not exists})
+    # Bloom-filter fast path: most free names never reach the DB
+    if not username_taken(username):
+        return Response({"available": True})
+    return Response({"available": False, "suggestions": suggest_usernames(username)})
 
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
@@ -496,6 +545,8 @@ def deactivate_account(request):
     user = request.user
     user.is_active = False
     user.save()
+    # outstanding access / refresh tokens stop working on every worker
+    revoke_user(user.id)
     return Response({"success": True, "message": "Account deactivated"})
 
 
@@ -515,71 +566,37 @@ def security_info(request):
 @csrf_exempt
 @require_http_methods(["POST"])
 def google_login_view(request):
-    """Handle Google OAuth2 login"""
+    """Handle Google sign-in: verified ID token -> one upsert -> JWTs (no session)"""
     try:
-        data = json.loads(request.body)
-    except json.JSONDecodeError:
-        return JsonResponse({'error': 'Invalid JSON'}, status=400)
-    
-    google_id = data.get('google_id')
-    email = data.get('email')
-    full_name = data.get('full_name')
-    picture_url = data.get('picture_url')
-    
-    if not google_id or not email:
-        return JsonResponse({
+        data = parse_body(request, GoogleLoginRequest)
+    except ValueError as e:
+        return respond(request, {'error': f'Invalid request body: {e}'}, status=400)
+
+    if not data.id_token:
+        return respond(request, {
             'success': False,
-            'error': 'Google ID and email are required'
+            'error': 'id_token required'
         }, status=400)
-    
-    # Find or create user
+
+    # identity comes from the signed token, never from client-supplied ids
     try:
-        user = User.objects.get(google_id=google_id)
-    except User.DoesNotExist:
-        try:
-            user = User.objects.get(email=email)
-            # Link existing user with Google ID
-            user.google_id = google_id
-            user.save()
-        except User.DoesNotExist:
-            # Create new user
-            username = email.split('@')[0]
-            counter = 1
-            while User.objects.filter(username=username).exists():
-                username = f"{email.split('@')[0]}{counter}"
-                counter += 1
-            
-            user = User.objects.create_user(
-                username=username,
-                email=email,
-                google_id=google_id,
-                full_name=full_name or '',
-                is_email_verified=True,  # Google emails are verified
-                is_active=True
-            )
-    
-    # Ensure user is active
-    if not user.is_active:
-        user.is_active = True
-        user.save()
-    
-    login(request, user)
-    
-    return JsonResponse({
+        claims = verify_id_token(data.id_token)
+    except GoogleTokenError as e:
+        return respond(request, {'success': False, 'error': str(e)}, status=401)
+
+    try:
+        user = upsert_google_user(claims)
+    except GoogleAccountConflict as e:
+        return respond(request, {'success': False, 'error': str(e)}, status=409)
+
+    access, refresh = issue_tokens(user)
+    return respond(request, {
         'success': True,
         'message': 'Google login successful',
-        'user': {
-            'id': user.id,
-            'username': user.username,
-            'email': user.email,
-            'full_name': user.full_name,
-            'mobile_number': user.mobile_number,
-            'role': user.role,
-            'is_email_verified': user.is_email_verified
-        },
+        'user': LoginUser.from_model(user),
         'tokens': {
-            'access': str(CustomAccessToken.for_user(user)),
-            'refresh': str(RefreshToken.for_user(user))
+            'access': str(access),
+            'refresh': str(refresh)
         }
     }, status=200)
 
@@ -587,19 +604,34 @@ def google_login_view(request):
 @csrf_exempt
 @require_http_methods(["POST"])
 def refresh_token_view(request):
-    """Refresh an access token using a refresh token (SimpleJWT)."""
+    """
+    Rotate a refresh token: the presented one is spent and a new
+    access + refresh pair of the same family is returned. Presenting a
+    spent refresh token again revokes the whole family.
+    """
     try:
-        data = json.loads(request.body)
-    except json.JSONDecodeError:
-        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+        data = parse_body(request, RefreshTokenRequest)
+    except ValueError as e:
+        return respond(request, {'error': f'Invalid request body: {e}'}, status=400)
+
+    try:
+        old = RefreshToken(data.refresh)
+    except TokenError as e:
+        return respond(request, {'success': False, 'error': str(e)}, status=401)
+
+    try:
+        claim_refresh(old.payload)
+    except TokenRevoked as e:
+        return respond(request, {'success': False, 'error': str(e)}, status=401)
+
+    user = User.objects.filter(id=old.get('user_id'), is_active=True).first()
+    if user is None:
+        return respond(request, {'success': False, 'error': 'User not found or inactive'}, status=401)
 
-    serializer = TokenRefreshSerializer(data=data)
-    if serializer.is_valid():
-        access = serializer.validated_data.get('access')
-        # Return tokens dict to match client test expectations
-        tokens = {'access': access, 'refresh': data.get('refresh')}
-        return JsonResponse({'success': True, 'tokens': tokens}, status=200)
-    return JsonResponse({'success': False, 'errors': serializer.errors}, status=400)
+    access, refresh = issue_tokens(user, family=old.get('fam'))
+    # Return tokens dict to match client test expectations
+    tokens = {'access': str(access), 'refresh': str(refresh)}
+    return respond(request, {'success': True, 'tokens': tokens}, status=200)
 
 
 @csrf_exempt
@@ -607,31 +639,57 @@ def refresh_token_view(request):
 def verify_access_token(request):
     """Verify an access token and return its payload when valid."""
     try:
-        data = json.loads(request.body)
-    except json.JSONDecodeError:
-        return JsonResponse({'error': 'Invalid JSON'}, status=400)
-    token_str = data.get('token') or data.get('access')
+        data = parse_body(request, VerifyTokenRequest)
+    except ValueError as e:
+        return respond(request, {'error': f'Invalid request body: {e}'}, status=400)
+    token_str = data.token or data.access
     if not token_str:
-        return JsonResponse({'success': False, 'error': 'token required'}, status=400)
+        return respond(request, {'success': False, 'error': 'token required'}, status=400)
 
     try:
-        # Decode JWT without signature verification (we just want to extract the payload)
-        # For production, use verified=True and provide the secret key
-        import jwt
-        payload = jwt.decode(token_str, options={"verify_signature": False}, algorithms=["HS256"])
-    except Exception as e:
-        return JsonResponse({'success': False, 'error': f'Invalid token: {str(e)}'}, status=400)
+        # signature + expiry checked; chat introspection relies on this
+        payload = CustomAccessToken(token_str).payload
+    except TokenError as e:
+        return respond(request, {'success': False, 'error': f'Invalid token: {str(e)}'}, status=400)
+
+    if is_revoked(payload):
+        return respond(request, {'success': False, 'error': 'Token has been revoked'}, status=401)
 
     # Return decoded payload for callers (chat service expects user info inside token payload)
     # Return under 'user' key for compatibility with chat introspection
-    return JsonResponse({'success': True, 'user': payload}, status=200)
+    return respond(request, {'success': True, 'user': payload}, status=200)
 
 
 @require_http_methods(["POST"])
 def logout_view(request):
-    """API endpoint for user logout"""
+    """API endpoint for user logout – revokes the login chain of the presented token"""
+    try:
+        data = parse_body(request, RefreshTokenRequest)
+    except ValueError:
+        data = RefreshTokenRequest()
+
+    token = None
+    if data.refresh:
+        try:
+            token = RefreshToken(data.refresh)
+        except TokenError:
+            token = None
+    if token is None:
+        parts = request.META.get('HTTP_AUTHORIZATION', '').split()
+        if len(parts) == 2 and parts[0].lower() == 'bearer':
+            try:
+                token = CustomAccessToken(parts[1])
+            except TokenError:
+                token = None
+
+    if token is not None:
+        if token.get('fam'):
+            revoke_family(token['fam'])
+        else:
+            revoke_jti(token['jti'], token['exp'])
+
     logout(request)
-    return JsonResponse({
+    return respond(request, {
         'success': True,
         'message': 'Logout successful'
     }, status=200)
@@ -642,28 +700,21 @@ def user_profile_view(request):
     """API endpoint to get current user profile"""
     user = _user_from_request(request)
     if not user:
-        return JsonResponse({
+        return respond(request, {
             'success': False,
             'error': 'Not authenticated'
         }, status=401)
 
-    return JsonResponse({
+    # every save bumps updated_at (User.save), so it versions the whole profile
+    etag = version_etag(user.pk, user.updated_at)
+    cached = not_modified(request, etag, user.updated_at, cache='profile')
+    if cached:
+        return cached
+
+    return respond(request, {
         'success': True,
-        'user': {
-            'id': user.id,
-            'username': user.username,
-            'email': user.email,
-            'full_name': user.full_name,
-            'mobile_number': user.mobile_number,
-            'role': user.role,
-            'is_staff': user.is_staff,
-            'is_superuser': user.is_superuser,
-            'is_email_verified': user.is_email_verified,
-            'is_mobile_verified': user.is_mobile_verified,
-            'date_joined': user.date_joined.isoformat() if user.date_joined else None,
-            'last_login': user.last_login.isoformat() if user.last_login else None
-        }
-    }, status=200)
+        'user': UserProfile.from_model(user)
+    }, status=200, etag=etag, last_modified=user.updated_at, cache='profile')
 
 
 @csrf_exempt
@@ -672,19 +723,21 @@ def register_public_key(request):
     """Register or update the authenticated user's public key."""
     user = _user_from_request(request)
     if not user:
-        return JsonResponse({'success': False, 'error': 'Not authenticated'}, status=401)
+        return respond(request, {'success': False, 'error': 'Not authenticated'}, status=401)
 
     try:
-        data = json.loads(request.body)
-    except json.JSONDecodeError:
-        return JsonResponse({'success': False, 'error': 'Invalid JSON'}, status=400)
+        data = parse_body(request, PublicKeyRequest)
+    except ValueError as e:
+        return respond(request, {'success': False, 'error': f'Invalid request body: {e}'}, status=400)
 
-    public_key = data.get('public_key')
+    public_key = data.public_key
     if not public_key:
-        return JsonResponse({'success': False, 'error': 'public_key required'}, status=400)
+        return respond(request, {'success': False, 'error': 'public_key required'}, status=400)
 
-    # Store the public key on the user model (field `public_key` expected by migrations)
     user.public_key = public_key
-    user.save()
+    user.save(update_fields=['public_key', 'updated_at'])
+    store_identity(user.id, public_key)
+    # chat's sync_user_directory mirrors it into secure_dm.E2EEIdentity
+    publish_public_key(user)
 
-    return JsonResponse({'success': True, 'message': 'Public key registered'}, status=200)
+    return respond(request, {'success': True, 'message': 'Public key registered'}, status=200)
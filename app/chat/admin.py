@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Conversation, ConversationMember, Message
+from .models import ArchiveSegment, Conversation, ConversationMember, Message, SenderKeyEnvelope
 
 
 @admin.register(Conversation)
@@ -15,3 +15,14 @@ class ConversationMemberAdmin(admin.ModelAdmin):
 @admin.register(Message)
 class MessageAdmin(admin.ModelAdmin):
     list_display = ('id', 'conversation', 'sender_username', 'timestamp')
+
+
+@admin.register(SenderKeyEnvelope)
+class SenderKeyEnvelopeAdmin(admin.ModelAdmin):
+    list_display = ('conversation', 'sender_id', 'key_id', 'recipient_id', 'created_at')
+
+
+@admin.register(ArchiveSegment)
+class ArchiveSegmentAdmin(admin.ModelAdmin):
+    list_display = ('kind', 'conversation_id', 'first_ts', 'last_ts', 'message_count', 'size_bytes')
+    list_filter = ('kind',)
@@ -0,0 +1,291 @@
+"""
+Tiered archival of old chat / DM history into compressed segment files.
+
+A segment holds one conversation's messages for a time range as NDJSON,
+split into frames of FRAME_RECORDS lines that are zstd-compressed
+independently and concatenated. The ArchiveSegment row keeps the sparse
+index – (first timestamp, byte offset, length, count) per frame – so a
+history page decompresses only the frames it needs (a ranged GET on object
+storage).
+
+The segment file is written first; the ArchiveSegment row and the deletion
+of the hot rows then commit together, so readers never see a message twice
+and a crash only leaves an orphan file behind.
+"""
+import os
+import uuid
+from datetime import datetime
+from typing import Any, Optional
+
+import msgspec
+from django.conf import settings
+from django.db import transaction
+
+from .models import ArchiveSegment, Message
+from .secure_dm.models import DMConversation, DMMessage
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+try:
+    import boto3
+    BOTO3_AVAILABLE = True
+except ImportError:
+    BOTO3_AVAILABLE = False
+
+
+ARCHIVE_STORAGE = getattr(settings, 'CHAT_ARCHIVE_STORAGE', 'local')  # "local" or "s3"
+ARCHIVE_DIR = getattr(settings, 'CHAT_ARCHIVE_DIR', 'archive')
+ARCHIVE_BUCKET = getattr(settings, 'CHAT_ARCHIVE_BUCKET', None)
+ARCHIVE_AFTER_DAYS = getattr(settings, 'CHAT_ARCHIVE_AFTER_DAYS', 180)
+FRAME_RECORDS = 256
+SEGMENT_MAX_MESSAGES = 50000
+ZSTD_LEVEL = 9
+DELETE_BATCH = 5000
+
+
+class ArchivedMessage(msgspec.Struct):
+    """One NDJSON line; has the attributes MessageOut / DMMessageOut read."""
+    id: str
+    conversation_id: str
+    sender_id: str
+    timestamp: datetime
+    ciphertext: bytes
+    metadata: Optional[dict[str, Any]] = None
+    sender_username: str = ''
+    sender_key_id: Optional[int] = None
+    nonce: bytes = b''
+
+
+_encoder = msgspec.json.Encoder()
+_decoder = msgspec.json.Decoder(ArchivedMessage)
+
+
+def _chat_record(m):
+    return ArchivedMessage(
+        id=str(m.id),
+        conversation_id=str(m.conversation_id),
+        sender_id=m.sender_id,
+        timestamp=m.timestamp,
+        ciphertext=bytes(m.ciphertext),
+        metadata=m.metadata,
+        sender_username=m.sender_username,
+        sender_key_id=m.sender_key_id,
+    )
+
+
+def _dm_record(m):
+    return ArchivedMessage(
+        id=str(m.id),
+        conversation_id=str(m.conversation_id),
+        sender_id=m.sender_id,
+        timestamp=m.timestamp,
+        ciphertext=bytes(m.ciphertext),
+        metadata=m.metadata,
+        nonce=bytes(m.nonce),
+    )
+
+
+KINDS = {
+    'chat': (Message, _chat_record),
+    'dm': (DMMessage, _dm_record),
+}
+
+
+# --------------------------------------------------------------------
+# Segment storage
+# --------------------------------------------------------------------
+class LocalSegmentStorage:
+    def __init__(self, root):
+        self.root = root
+
+    def _full(self, path):
+        return os.path.join(self.root, path)
+
+    def write(self, path, data):
+        full = self._full(path)
+        os.makedirs(os.path.dirname(full), exist_ok=True)
+        tmp = f"{full}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, full)
+
+    def read(self, path, offset, length):
+        with open(self._full(path), 'rb') as f:
+            f.seek(offset)
+            return f.read(length)
+
+    def delete(self, path):
+        try:
+            os.remove(self._full(path))
+        except FileNotFoundError:
+            pass
+
+
+class S3SegmentStorage:
+    """S3-compatible object storage (R2 credentials from the environment)."""
+
+    def __init__(self, bucket):
+        if not BOTO3_AVAILABLE:
+            raise RuntimeError('boto3 is required for CHAT_ARCHIVE_STORAGE="s3"')
+        self.bucket = bucket
+        self.client = boto3.client(
+            's3',
+            endpoint_url=os.getenv('R2_ENDPOINT_URL'),
+            aws_access_key_id=os.getenv('R2_ACCESS_KEY_ID'),
+            aws_secret_access_key=os.getenv('R2_SECRET_ACCESS_KEY'),
+        )
+
+    def write(self, path, data):
+        self.client.put_object(Bucket=self.bucket, Key=path, Body=data, ContentType='application/zstd')
+
+    def read(self, path, offset, length):
+        obj = self.client.get_object(Bucket=self.bucket, Key=path, Range=f'bytes={offset}-{offset + length - 1}')
+        return obj['Body'].read()
+
+    def delete(self, path):
+        self.client.delete_object(Bucket=self.bucket, Key=path)
+
+
+_storage = None
+
+
+def get_storage():
+    global _storage
+    if _storage is None:
+        if ARCHIVE_STORAGE == 's3':
+            _storage = S3SegmentStorage(ARCHIVE_BUCKET)
+        else:
+            _storage = LocalSegmentStorage(ARCHIVE_DIR)
+    return _storage
+
+
+# --------------------------------------------------------------------
+# Write
+# --------------------------------------------------------------------
+def write_segment(kind, conversation_id, records):
+    """Compress `records` (oldest first) into a segment file; returns (path, size, frames)."""
+    if not ZSTD_AVAILABLE:
+        raise RuntimeError('zstandard is required for message archival')
+
+    compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL)
+    buf = bytearray()
+    frames = []
+    for start in range(0, len(records), FRAME_RECORDS):
+        chunk = records[start:start + FRAME_RECORDS]
+        raw = b'\n'.join(_encoder.encode(r) for r in chunk) + b'\n'
+        compressed = compressor.compress(raw)
+        frames.append([chunk[0].timestamp.isoformat(), len(buf), len(compressed), len(chunk)])
+        buf += compressed
+
+    path = f"{kind}/{conversation_id}/{records[0].timestamp:%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}.ndjson.zst"
+    get_storage().write(path, bytes(buf))
+    return path, len(buf), frames
+
+
+def archive_conversation(kind, conversation_id, cutoff):
+    """Move this conversation's rows older than `cutoff` into segments. Returns rows moved."""
+    model, to_record = KINDS[kind]
+    qs = model.objects.filter(conversation_id=conversation_id, timestamp__lt=cutoff)
+    if kind == 'dm':
+        # keep the DM list's denormalized last message hot
+        last_id = DMConversation.objects.filter(id=conversation_id).values_list('last_message_id', flat=True).first()
+        if last_id:
+            qs = qs.exclude(id=last_id)
+
+    moved = 0
+    while True:
+        rows = list(qs.order_by('timestamp', 'id')[:SEGMENT_MAX_MESSAGES])
+        if not rows:
+            break
+        records = [to_record(m) for m in rows]
+        path, size, frames = write_segment(kind, conversation_id, records)
+
+        with transaction.atomic():
+            ArchiveSegment.objects.create(
+                kind=kind,
+                conversation_id=conversation_id,
+                first_ts=records[0].timestamp,
+                last_ts=records[-1].timestamp,
+                message_count=len(records),
+                size_bytes=size,
+                path=path,
+                frames=frames,
+            )
+            ids = [m.id for m in rows]
+            for start in range(0, len(ids), DELETE_BATCH):
+                model.objects.filter(id__in=ids[start:start + DELETE_BATCH]).delete()
+
+        moved += len(rows)
+        if len(rows) < SEGMENT_MAX_MESSAGES:
+            break
+    return moved
+
+
+def conversations_to_archive(kind, cutoff):
+    model, _ = KINDS[kind]
+    return (
+        model.objects.filter(timestamp__lt=cutoff)
+        .values_list('conversation_id', flat=True)
+        .distinct()
+    )
+
+
+# --------------------------------------------------------------------
+# Read
+# --------------------------------------------------------------------
+def _read_frame(path, frame):
+    _, offset, length, _ = frame
+    data = get_storage().read(path, offset, length)
+    raw = zstandard.ZstdDecompressor().decompress(data)
+    return [_decoder.decode(line) for line in raw.splitlines() if line]
+
+
+def has_archived(kind, conversation_id, before=None):
+    segs = ArchiveSegment.objects.filter(kind=kind, conversation_id=conversation_id)
+    if before:
+        segs = segs.filter(first_ts__lte=before[0])
+    return segs.exists()
+
+
+def read_archived(kind, conversation_id, limit, before=None):
+    """
+    Newest `limit` archived messages older than `before` = (timestamp, id),
+    oldest first, plus has_more. Only frames that can hold such rows are
+    fetched and decompressed.
+    """
+    segs = ArchiveSegment.objects.filter(kind=kind, conversation_id=conversation_id)
+    if before:
+        before = (before[0], str(before[1]))
+        segs = segs.filter(first_ts__lte=before[0])
+
+    rows = []
+    for seg in segs.order_by('-last_ts'):
+        for frame in reversed(seg.frames):
+            if before and datetime.fromisoformat(frame[0]) > before[0]:
+                continue
+            for r in reversed(_read_frame(seg.path, frame)):
+                if before and (r.timestamp, r.id) >= before:
+                    continue
+                rows.append(r)
+            if len(rows) > limit:
+                break
+        if len(rows) > limit:
+            break
+
+    rows.sort(key=lambda r: (r.timestamp, r.id), reverse=True)
+    return rows[:limit][::-1], len(rows) > limit
+
+
+def read_all_archived(kind, conversation_id):
+    """Every archived message of the conversation, oldest first."""
+    rows = []
+    for seg in ArchiveSegment.objects.filter(kind=kind, conversation_id=conversation_id).order_by('first_ts'):
+        for frame in seg.frames:
+            rows.extend(_read_frame(seg.path, frame))
+    return rows
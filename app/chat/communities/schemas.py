@@ -0,0 +1,24 @@
+"""Typed request payloads for the community / group / room API (msgspec Structs)"""
+from typing import Any, Optional
+
+import msgspec
+
+from common.codecs import Base64Bytes
+
+
+class CreateCommunityRequest(msgspec.Struct):
+    name: str = ''
+
+
+class CreateGroupRequest(msgspec.Struct):
+    name: str = ''
+
+
+class CreateRoomRequest(msgspec.Struct):
+    name: str = ''
+
+
+class RoomMessageRequest(msgspec.Struct):
+    # base64 text in JSON bodies, raw bin in MessagePack / CBOR
+    ciphertext: Base64Bytes = b''
+    metadata: Optional[dict[str, Any]] = None
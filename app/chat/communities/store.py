@@ -0,0 +1,236 @@
+"""
+Community -> group -> room hierarchy on the Mongo collections.
+
+Listings page by `_id` over the (parent, _id) indexes, so every page costs
+the same however many groups/rooms a community has. Counters live on the
+parent documents and only ever move by `$inc`. Listing pages are cached in
+Redis under a per-community version that every structural write bumps.
+"""
+from datetime import datetime, timezone as dt_timezone
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from django.conf import settings
+from django.utils import timezone
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from common.codecs import decode, encode
+from common.redis_service import redis_client
+from chat.db import collections as cols
+
+
+LISTING_CACHE_TTL = getattr(settings, 'CHAT_COMMUNITY_LISTING_CACHE_TTL', 30)
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+ADMIN_ROLES = ('owner', 'admin')
+
+
+def object_id(value):
+    """ObjectId from a path/cursor string; ValueError if malformed."""
+    try:
+        return ObjectId(str(value))
+    except (InvalidId, TypeError):
+        raise ValueError('invalid id')
+
+
+# ---------- communities ----------
+def create_community(name, owner_id):
+    now = timezone.now()
+    doc = {
+        'name': name,
+        'ownerId': owner_id,
+        'memberCount': 1,
+        'groupCount': 0,
+        'roomCount': 0,
+        'messageCount': 0,
+        'createdAt': now,
+    }
+    doc['_id'] = cols.communities_col.insert_one(doc).inserted_id
+    cols.community_members_col.insert_one({
+        'communityId': doc['_id'],
+        'userId': owner_id,
+        'role': 'owner',
+        'joinedAt': now,
+    })
+    return doc
+
+
+def get_community(community_id):
+    return cols.communities_col.find_one({'_id': community_id})
+
+
+def member_role(community_id, user_id):
+    doc = cols.community_members_col.find_one(
+        {'communityId': community_id, 'userId': user_id}, {'role': 1}
+    )
+    return doc['role'] if doc else None
+
+
+def join_community(community_id, user_id):
+    """True if the user was added (memberCount moves only then)."""
+    try:
+        cols.community_members_col.insert_one({
+            'communityId': community_id,
+            'userId': user_id,
+            'role': 'member',
+            'joinedAt': timezone.now(),
+        })
+    except DuplicateKeyError:
+        return False
+    cols.communities_col.update_one({'_id': community_id}, {'$inc': {'memberCount': 1}})
+    return True
+
+
+def leave_community(community_id, user_id):
+    result = cols.community_members_col.delete_one(
+        {'communityId': community_id, 'userId': user_id, 'role': {'$ne': 'owner'}}
+    )
+    if result.deleted_count:
+        cols.communities_col.update_one({'_id': community_id}, {'$inc': {'memberCount': -1}})
+        return True
+    return False
+
+
+# ---------- groups / rooms ----------
+def create_group(community_id, name, created_by):
+    doc = {
+        'communityId': community_id,
+        'name': name,
+        'createdBy': created_by,
+        'roomCount': 0,
+        'messageCount': 0,
+        'createdAt': timezone.now(),
+    }
+    doc['_id'] = cols.groups_col.insert_one(doc).inserted_id
+    cols.communities_col.update_one({'_id': community_id}, {'$inc': {'groupCount': 1}})
+    bump_listing_version(community_id)
+    return doc
+
+
+def get_group(community_id, group_id):
+    return cols.groups_col.find_one({'_id': group_id, 'communityId': community_id})
+
+
+def create_room(community_id, group_id, name, created_by):
+    doc = {
+        'communityId': community_id,
+        'groupId': group_id,
+        'name': name,
+        'createdBy': created_by,
+        'messageCount': 0,
+        'lastMessageAt': None,
+        'createdAt': timezone.now(),
+    }
+    doc['_id'] = cols.rooms_col.insert_one(doc).inserted_id
+    cols.groups_col.update_one({'_id': group_id}, {'$inc': {'roomCount': 1}})
+    cols.communities_col.update_one({'_id': community_id}, {'$inc': {'roomCount': 1}})
+    bump_listing_version(community_id)
+    return doc
+
+
+def get_room(room_id):
+    return cols.rooms_col.find_one({'_id': room_id})
+
+
+def add_room_message(room, sender_id, sender_username, ciphertext, metadata=None):
+    now = timezone.now()
+    doc = {
+        'roomId': room['_id'],
+        'senderId': sender_id,
+        'senderUsername': sender_username,
+        'ciphertext': ciphertext,
+        'metadata': metadata or {},
+        'createdAt': now,
+    }
+    doc['_id'] = cols.messages_col.insert_one(doc).inserted_id
+    room = cols.rooms_col.find_one_and_update(
+        {'_id': room['_id']},
+        {'$inc': {'messageCount': 1}, '$max': {'lastMessageAt': now}},
+        return_document=ReturnDocument.AFTER,
+    )
+    cols.groups_col.update_one({'_id': room['groupId']}, {'$inc': {'messageCount': 1}})
+    cols.communities_col.update_one({'_id': room['communityId']}, {'$inc': {'messageCount': 1}})
+    return doc
+
+
+def room_messages(room_id, limit, before=None):
+    """Newest first from the (roomId, createdAt, _id) index; `before` = (createdAt, _id)."""
+    query = {'roomId': room_id}
+    if before:
+        created_at, last_id = before
+        query['$or'] = [
+            {'createdAt': {'$lt': created_at}},
+            {'createdAt': created_at, '_id': {'$lt': last_id}},
+        ]
+    rows = list(
+        cols.messages_col.find(query)
+        .sort([('createdAt', -1), ('_id', -1)])
+        .limit(limit + 1)
+    )
+    return rows[:limit], len(rows) > limit
+
+
+# ---------- cached listings ----------
+def _version_key(community_id):
+    return f"community:{community_id}:listing_ver"
+
+
+def bump_listing_version(community_id):
+    try:
+        redis_client.incr(_version_key(community_id))
+    except Exception:
+        pass
+
+
+def _page(collection, query, limit, after):
+    if after is not None:
+        query = {**query, '_id': {'$gt': after}}
+    rows = list(collection.find(query).sort('_id', 1).limit(limit + 1))
+    return rows[:limit], (str(rows[limit - 1]['_id']) if len(rows) > limit else None)
+
+
+def list_page(kind, community_id, limit, after=None, group_id=None):
+    """
+    One listing page ("groups" or "rooms") as (rows, next_cursor), served
+    from Redis when the community's listing version hasn't moved.
+    Counters inside cached pages may lag by up to LISTING_CACHE_TTL.
+    """
+    try:
+        version = redis_client.get(_version_key(community_id)) or '0'
+        cache_key = f"community:{community_id}:{kind}:v{version}:{group_id or '-'}:{after or '-'}:{limit}"
+        cached = redis_client.get(cache_key)
+    except Exception:
+        cache_key, cached = None, None
+
+    if cached:
+        rows, next_cursor = decode('json', cached.encode())
+        return rows, next_cursor
+
+    if kind == 'groups':
+        rows, next_cursor = _page(cols.groups_col, {'communityId': community_id}, limit, after)
+    else:
+        query = {'groupId': group_id} if group_id is not None else {'communityId': community_id}
+        rows, next_cursor = _page(cols.rooms_col, query, limit, after)
+
+    rows = [plain(r) for r in rows]
+    if cache_key:
+        try:
+            redis_client.setex(cache_key, LISTING_CACHE_TTL, encode('json', [rows, next_cursor]).decode())
+        except Exception:
+            pass
+    return rows, next_cursor
+
+
+def plain(doc):
+    """BSON doc -> JSON-safe dict (ObjectIds as str, datetimes as ISO)."""
+    out = {}
+    for key, value in doc.items():
+        if isinstance(value, ObjectId):
+            value = str(value)
+        elif isinstance(value, datetime):
+            # pymongo returns naive UTC
+            value = (value if value.tzinfo else value.replace(tzinfo=dt_timezone.utc)).isoformat()
+        out['id' if key == '_id' else key] = value
+    return out
@@ -0,0 +1,13 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('', views.community_create, name='community_create'),
+    path('rooms/<str:room_id>/messages/', views.room_messages, name='room_messages'),
+    path('<str:community_id>/', views.community_detail, name='community_detail'),
+    path('<str:community_id>/join/', views.community_join, name='community_join'),
+    path('<str:community_id>/leave/', views.community_leave, name='community_leave'),
+    path('<str:community_id>/groups/', views.community_groups, name='community_groups'),
+    path('<str:community_id>/rooms/', views.community_rooms, name='community_rooms'),
+    path('<str:community_id>/groups/<str:group_id>/rooms/', views.group_rooms, name='group_rooms'),
+]
@@ -0,0 +1,273 @@
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+
+from common.codecs import parse_body, respond
+from common.cursors import decode_cursor, encode_cursor
+from chat.views import introspect_token
+from . import store
+from .schemas import CreateCommunityRequest, CreateGroupRequest, CreateRoomRequest, RoomMessageRequest
+
+
+# --------------------------------------------------------------------
+# Helpers
+# --------------------------------------------------------------------
+def page_params(request):
+    """(limit, after ObjectId or None) from ?limit=&cursor=; ValueError if bad."""
+    limit = int(request.GET.get('limit', store.PAGE_SIZE))
+    limit = max(1, min(limit, store.MAX_PAGE_SIZE))
+    cursor = request.GET.get('cursor')
+    return limit, (store.object_id(cursor) if cursor else None)
+
+
+def load_community(request, community_id):
+    """(community doc, error response)"""
+    try:
+        cid = store.object_id(community_id)
+    except ValueError:
+        return None, respond(request, {'success': False, 'error': 'Community not found'}, status=404)
+    community = store.get_community(cid)
+    if not community:
+        return None, respond(request, {'success': False, 'error': 'Community not found'}, status=404)
+    return community, None
+
+
+def auth_error(request):
+    return respond(request, {'success': False, 'error': 'Authentication required'}, status=401)
+
+
+# --------------------------------------------------------------------
+# Communities
+# --------------------------------------------------------------------
+@csrf_exempt
+@require_http_methods(['POST'])
+def community_create(request):
+    user = introspect_token(request)
+    if not user:
+        return auth_error(request)
+
+    try:
+        body = parse_body(request, CreateCommunityRequest)
+    except ValueError as e:
+        return respond(request, {'success': False, 'error': f'Invalid request body: {e}'}, status=400)
+
+    if not body.name.strip():
+        return respond(request, {'success': False, 'error': 'name required'}, status=400)
+
+    community = store.create_community(body.name.strip(), str(user['id']))
+    return respond(request, {'success': True, 'community': store.plain(community)}, status=201)
+
+
+@csrf_exempt
+@require_http_methods(['GET'])
+def community_detail(request, community_id):
+    """Community with its counters (memberCount, groupCount, roomCount, messageCount)."""
+    user = introspect_token(request)
+    if not user:
+        return auth_error(request)
+
+    community, error = load_community(request, community_id)
+    if error:
+        return error
+
+    return respond(request, {
+        'success': True,
+        'community': store.plain(community),
+        'role': store.member_role(community['_id'], str(user['id'])),
+    })
+
+
+@csrf_exempt
+@require_http_methods(['POST'])
+def community_join(request, community_id):
+    user = introspect_token(request)
+    if not user:
+        return auth_error(request)
+
+    community, error = load_community(request, community_id)
+    if error:
+        return error
+
+    joined = store.join_community(community['_id'], str(user['id']))
+    return respond(request, {'success': True, 'joined': joined})
+
+
+@csrf_exempt
+@require_http_methods(['POST'])
+def community_leave(request, community_id):
+    user = introspect_token(request)
+    if not user:
+        return auth_error(request)
+
+    community, error = load_community(request, community_id)
+    if error:
+        return error
+
+    left = store.leave_community(community['_id'], str(user['id']))
+    return respond(request, {'success': True, 'left': left})
+
+
+# --------------------------------------------------------------------
+# Groups / rooms (cursor-paginated, cached listings)
+# --------------------------------------------------------------------
+@csrf_exempt
+@require_http_methods(['GET', 'POST'])
+def community_groups(request, community_id):
+    """
+    GET  ?limit=&cursor=  -> groups of the community, oldest first
+    POST { "name" }       -> create group (owner / admin)
+    """
+    user = introspect_token(request)
+    if not user:
+        return auth_error(request)
+
+    community, error = load_community(request, community_id)
+    if error:
+        return error
+
+    if request.method == 'GET':
+        try:
+            limit, after = page_params(request)
+        except ValueError:
+            return respond(request, {'success': False, 'error': 'Invalid limit or cursor'}, status=400)
+
+        groups, next_cursor = store.list_page('groups', community['_id'], limit, after)
+        return respond(request, {'success': True, 'groups': groups, 'next_cursor': next_cursor})
+
+    if store.member_role(community['_id'], str(user['id'])) not in store.ADMIN_ROLES:
+        return respond(request, {'success': False, 'error': 'Admin required'}, status=403)
+
+    try:
+        body = parse_body(request, CreateGroupRequest)
+    except ValueError as e:
+        return respond(request, {'success': False, 'error': f'Invalid request body: {e}'}, status=400)
+
+    if not body.name.strip():
+        return respond(request, {'success': False, 'error': 'name required'}, status=400)
+
+    group = store.create_group(community['_id'], body.name.strip(), str(user['id']))
+    return respond(request, {'success': True, 'group': store.plain(group)}, status=201)
+
+
+@csrf_exempt
+@require_http_methods(['GET'])
+def community_rooms(request, community_id):
+    """All rooms of the community across groups, ?limit=&cursor="""
+    user = introspect_token(request)
+    if not user:
+        return auth_error(request)
+
+    community, error = load_community(request, community_id)
+    if error:
+        return error
+
+    try:
+        limit, after = page_params(request)
+    except ValueError:
+        return respond(request, {'success': False, 'error': 'Invalid limit or cursor'}, status=400)
+
+    rooms, next_cursor = store.list_page('rooms', community['_id'], limit, after)
+    return respond(request, {'success': True, 'rooms': rooms, 'next_cursor': next_cursor})
+
+
+@csrf_exempt
+@require_http_methods(['GET', 'POST'])
+def group_rooms(request, community_id, group_id):
+    """
+    GET  ?limit=&cursor=  -> rooms of one group
+    POST { "name" }       -> create room (owner / admin)
+    """
+    user = introspect_token(request)
+    if not user:
+        return auth_error(request)
+
+    community, error = load_community(request, community_id)
+    if error:
+        return error
+
+    try:
+        group = store.get_group(community['_id'], store.object_id(group_id))
+    except ValueError:
+        group = None
+    if not group:
+        return respond(request, {'success': False, 'error': 'Group not found'}, status=404)
+
+    if request.method == 'GET':
+        try:
+            limit, after = page_params(request)
+        except ValueError:
+            return respond(request, {'success': False, 'error': 'Invalid limit or cursor'}, status=400)
+
+        rooms, next_cursor = store.list_page('rooms', community['_id'], limit, after, group_id=group['_id'])
+        return respond(request, {'success': True, 'rooms': rooms, 'next_cursor': next_cursor})
+
+    if store.member_role(community['_id'], str(user['id'])) not in store.ADMIN_ROLES:
+        return respond(request, {'success': False, 'error': 'Admin required'}, status=403)
+
+    try:
+        body = parse_body(request, CreateRoomRequest)
+    except ValueError as e:
+        return respond(request, {'success': False, 'error': f'Invalid request body: {e}'}, status=400)
+
+    if not body.name.strip():
+        return respond(request, {'success': False, 'error': 'name required'}, status=400)
+
+    room = store.create_room(community['_id'], group['_id'], body.name.strip(), str(user['id']))
+    return respond(request, {'success': True, 'room': store.plain(room)}, status=201)
+
+
+# --------------------------------------------------------------------
+# Room messages
+# --------------------------------------------------------------------
+@csrf_exempt
+@require_http_methods(['GET', 'POST'])
+def room_messages(request, room_id):
+    """
+    GET  ?limit=&cursor=                  -> newest first
+    POST { "ciphertext", "metadata" }     -> post (community members only)
+    """
+    user = introspect_token(request)
+    if not user:
+        return auth_error(request)
+
+    try:
+        room = store.get_room(store.object_id(room_id))
+    except ValueError:
+        room = None
+    if not room:
+        return respond(request, {'success': False, 'error': 'Room not found'}, status=404)
+
+    uid = str(user['id'])
+    if not store.member_role(room['communityId'], uid):
+        return respond(request, {'success': False, 'error': 'Not a community member'}, status=403)
+
+    if request.method == 'GET':
+        try:
+            limit = max(1, min(int(request.GET.get('limit', store.PAGE_SIZE)), store.MAX_PAGE_SIZE))
+            before = decode_cursor(request.GET.get('cursor'))
+            if before:
+                before = (before[0], store.object_id(before[1]))
+        except ValueError:
+            return respond(request, {'success': False, 'error': 'Invalid limit or cursor'}, status=400)
+
+        rows, has_more = store.room_messages(room['_id'], limit, before)
+        next_cursor = encode_cursor(rows[-1]['createdAt'], rows[-1]['_id']) if has_more else None
+        return respond(request, {
+            'success': True,
+            'messages': [store.plain(m) for m in rows],
+            'next_cursor': next_cursor,
+        })
+
+    try:
+        body = parse_body(request, RoomMessageRequest)
+    except ValueError as e:
+        return respond(request, {'success': False, 'error': f'Invalid request body: {e}'}, status=400)
+
+    if not body.ciphertext:
+        return respond(request, {'success': False, 'error': 'ciphertext required'}, status=400)
+
+    msg = store.add_room_message(room, uid, user['username'], body.ciphertext, body.metadata)
+    return respond(
+        request,
+        {'success': True, 'message_id': str(msg['_id']), 'timestamp': msg['createdAt'].isoformat()},
+        status=201,
+    )
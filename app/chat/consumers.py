@@ -1,16 +1,32 @@
 # chat_app/consumers.py
+import asyncio
+
 from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from asgiref.sync import sync_to_async
 from urllib.parse import parse_qs
 from django.conf import settings
 import jwt
 
+from common import codecs
+from .events import replay_events, is_newer
+from .outbound import (
+    OutboundQueue,
+    batch_options,
+    node_stats,
+    last_event_id as frame_event_id,
+    SLOW_CONSUMER_CLOSE_CODE,
+)
+
 
 class ChatConsumer(AsyncJsonWebsocketConsumer):
     async def connect(self):
-        # query params: ?token=...&userId=...
+        # query params: ?token=...&userId=...&lastEventId=...
+        #               &batch=1&batchMs=<window ms>&batchMax=<events>
+        #               &codec=msgpack|cbor  (binary frames; default JSON text)
         query = parse_qs(self.scope["query_string"].decode())
         token = query.get("token", [None])[0]
         user_id = query.get("userId", [None])[0]
+        last_event_id = query.get("lastEventId", [None])[0]
 
         # yaha tum simple JWT decode / verify kar sakte ho
         # ya auth server pe verify call karo (jitna tum already kar rahe ho)
@@ -18,16 +34,104 @@ class ChatConsumer(AsyncJsonWebsocketConsumer):
             await self.close()
             return
 
+        codec = query.get("codec", [codecs.JSON])[0]
+        self.codec = codec if codecs.available(codec) else codecs.JSON
+
         self.user_id = str(user_id)
         self.group_name = f"user_{self.user_id}"
+        self.last_event_id = None       # newest eventId enqueued (dedupe)
+        self.last_sent_event_id = None  # newest eventId written (resume hint)
+        self.outbound = OutboundQueue()
+        self.writer_task = None
+        # batch opt-in: events ek JSON array frame me jaate hai
+        self.batching = batch_options(query)
 
+        # group_add pehle, replay baad me – taaki beech ka koi event miss na ho.
+        # Duplicates chat_message me eventId compare karke skip ho jaate hai.
         await self.channel_layer.group_add(self.group_name, self.channel_name)
         await self.accept()
 
+        if last_event_id:
+            await self.resume_from(last_event_id)
+
+        # replay seedha bheja gaya; live events ab bounded queue se jayenge
+        self.writer_task = asyncio.ensure_future(self.write_outbound())
+
+    async def resume_from(self, last_event_id):
+        """
+        Reconnect pe sirf gap replay karo. Agar stream cursor ke aage trim
+        ho chuka hai to client ko full resync bolna padega.
+        """
+        try:
+            events = await sync_to_async(replay_events)(self.user_id, last_event_id)
+        except Exception:
+            events = None
+
+        if events is None:
+            await self.send_json({"type": "resync_required"})
+            return
+
+        self.last_event_id = last_event_id
+        self.last_sent_event_id = last_event_id
+        for data in events:
+            await self.send_json(data)
+            self.last_event_id = self.last_sent_event_id = data["eventId"]
+
+    async def write_outbound(self):
+        """
+        Single writer per socket. Channel-layer handlers sirf enqueue karte
+        hai, isliye slow client ki wajah se channel capacity nahi bharti.
+        """
+        while True:
+            if self.batching:
+                window, max_events = self.batching
+                frame = await self.outbound.get_batch(max_events, window)
+            else:
+                frame = await self.outbound.get()
+            await self.send_json(frame)
+            self.last_sent_event_id = frame_event_id(frame) or self.last_sent_event_id
+
+    async def disconnect_slow_consumer(self):
+        """Queue overflow: resume hint bhejo aur socket band karo."""
+        node_stats.incr("slow_disconnects")
+        self.stop_writer()
+        self.outbound.clear()
+        try:
+            await self.send_json({
+                "type": "slow_consumer",
+                "resume": {"lastEventId": self.last_sent_event_id},
+            })
+        finally:
+            await self.close(code=SLOW_CONSUMER_CLOSE_CODE)
+
+    def stop_writer(self):
+        if self.writer_task is not None:
+            self.writer_task.cancel()
+            self.writer_task = None
+
     async def disconnect(self, close_code):
+        if hasattr(self, "outbound"):
+            self.stop_writer()
+            self.outbound.clear()
         if hasattr(self, "group_name"):
             await self.channel_layer.group_discard(self.group_name, self.channel_name)
 
+    async def send_json(self, content, close=False):
+        if getattr(self, "codec", codecs.JSON) == codecs.JSON:
+            await super().send_json(content, close=close)
+            return
+        await self.send(bytes_data=codecs.encode(self.codec, content), close=close)
+
+    async def receive(self, text_data=None, bytes_data=None, **kwargs):
+        if bytes_data is not None and getattr(self, "codec", codecs.JSON) != codecs.JSON:
+            try:
+                content = codecs.decode(self.codec, bytes_data)
+            except ValueError:
+                return
+            await self.receive_json(content, **kwargs)
+            return
+        await super().receive(text_data=text_data, bytes_data=bytes_data, **kwargs)
+
     async def receive_json(self, content, **kwargs):
         # Agar future me client se messages aayenge to handle karna
         # Abhi hum sirf server -> client push kar rahe hai.
@@ -39,4 +143,24 @@ class ChatConsumer(AsyncJsonWebsocketConsumer):
         to ye method call hoga.
         event["data"] me humne payload dala hai (message / e2ee_message / conversation_created).
         """
-        await self.send_json(event["data"])
+        data = event["data"]
+        event_id = data.get("eventId")
+        if event_id and self.last_event_id:
+            # replay ke dauraan aaye hue live events already bhej chuke hai
+            if not is_newer(event_id, self.last_event_id):
+                return
+        if event_id:
+            self.last_event_id = event_id
+
+        if self.writer_task is None:
+            return
+
+        if not self.outbound.put(data):
+            await self.disconnect_slow_consumer()
+            return
+
+        if node_stats.flush_due():
+            try:
+                await sync_to_async(node_stats.flush, thread_sensitive=False)()
+            except Exception:
+                pass
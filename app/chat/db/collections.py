@@ -1,9 +1,21 @@
 from .mongo import get_db
 
-db = get_db()
+# Attribute name -> collection. Resolved on access (PEP 562), so importing
+# this module never touches Mongo and each process uses its own client.
+COLLECTIONS = {
+    "users_col": "users",
+    "communities_col": "communities",
+    "groups_col": "groups",
+    "rooms_col": "rooms",
+    "community_members_col": "community_members",
+    "messages_col": "messages",
+    "message_buckets_col": "message_buckets",
+    "dm_keys_col": "dm_keys",
+}
 
-users_col = db.users
-communities_col = db.communities
-groups_col = db.groups
-messages_col = db.messages
-dm_keys_col = db.dm_keys
+
+def __getattr__(name):
+    try:
+        return get_db()[COLLECTIONS[name]]
+    except KeyError:
+        raise AttributeError(name)
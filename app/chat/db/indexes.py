@@ -1,4 +1,97 @@
-from .collections import messages_col, groups_col
+"""
+Declared Mongo indexes. Nothing here runs on import – apply them with
+`python manage.py sync_mongo_indexes`.
+"""
+from pymongo import ASCENDING, DESCENDING, IndexModel
 
-messages_col.create_index([("roomId", 1), ("createdAt", -1)])
-groups_col.create_index("communityId")
+from .mongo import get_db
+
+
+INDEXES = {
+    "messages": [
+        # _id tiebreak matches room_messages' sort, so a page is a pure index walk
+        # (name kept so sync_mongo_indexes rebuilds the old two-key index in place)
+        IndexModel(
+            [("roomId", ASCENDING), ("createdAt", DESCENDING), ("_id", DESCENDING)],
+            name="roomId_1_createdAt_-1",
+        ),
+    ],
+    # (parent, _id) compounds: a listing page is one index range scan from the cursor
+    "groups": [
+        IndexModel([("communityId", ASCENDING), ("_id", ASCENDING)], name="communityId_1__id_1"),
+    ],
+    "rooms": [
+        IndexModel([("communityId", ASCENDING), ("_id", ASCENDING)], name="communityId_1__id_1"),
+        IndexModel([("groupId", ASCENDING), ("_id", ASCENDING)], name="groupId_1__id_1"),
+    ],
+    "community_members": [
+        IndexModel([("communityId", ASCENDING), ("userId", ASCENDING)], name="communityId_1_userId_1", unique=True),
+    ],
+    "message_buckets": [
+        IndexModel([("conversationId", ASCENDING), ("bucket", DESCENDING)], name="conversationId_1_bucket_-1"),
+        # rename propagation (MongoBucketMessageStore.rename_sender)
+        IndexModel([("messages.senderId", ASCENDING), ("_id", ASCENDING)], name="messages.senderId_1__id_1"),
+    ],
+}
+
+
+def _key(spec):
+    return [(field, direction) for field, direction in spec]
+
+
+def diff_indexes(db=None, collections=None):
+    """
+    {collection: {"missing": [IndexModel], "changed": [name], "extra": [name]}}
+
+    "changed" = same name, different key or options that matter (unique,
+    sparse, partial filter, TTL); those must be dropped and rebuilt.
+    """
+    db = db if db is not None else get_db()
+    plan = {}
+    for coll_name, models in INDEXES.items():
+        if collections and coll_name not in collections:
+            continue
+        existing = db[coll_name].index_information()
+        missing, changed = [], []
+        wanted = set()
+        for model in models:
+            doc = model.document
+            name = doc["name"]
+            wanted.add(name)
+            current = existing.get(name)
+            if current is None:
+                missing.append(model)
+                continue
+            options = ("unique", "sparse", "partialFilterExpression", "expireAfterSeconds")
+            if _key(current["key"]) != _key(doc["key"].items()) or any(
+                current.get(o) != doc.get(o) for o in options
+            ):
+                changed.append(name)
+                missing.append(model)
+        extra = sorted(n for n in existing if n != "_id_" and n not in wanted)
+        plan[coll_name] = {"missing": missing, "changed": changed, "extra": extra}
+    return plan
+
+
+def sync_indexes(db=None, collections=None, drop_extra=False, stdout=None):
+    """Apply `diff_indexes`; builds run in the background on the server."""
+    db = db if db is not None else get_db()
+    plan = diff_indexes(db, collections)
+    for coll_name, changes in plan.items():
+        coll = db[coll_name]
+        for name in changes["changed"]:
+            coll.drop_index(name)
+        if changes["missing"]:
+            for model in changes["missing"]:
+                model.document.setdefault("background", True)
+            coll.create_indexes(changes["missing"])
+        if drop_extra:
+            for name in changes["extra"]:
+                coll.drop_index(name)
+        if stdout is not None:
+            stdout.write(
+                f"  {coll_name}: +{len(changes['missing'])} "
+                f"~{len(changes['changed'])} "
+                f"{'-' if drop_extra else '?'}{len(changes['extra'])}\n"
+            )
+    return plan
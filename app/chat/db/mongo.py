@@ -1,22 +1,65 @@
 import os
+import threading
+
 from pymongo import MongoClient
 from dotenv import load_dotenv
 
 load_dotenv()
 
-_MONGO_CLIENT = None
+# alias -> (pid, MongoClient). Clients are created on first use and never
+# shared across a fork: a preforked worker that inherited the parent's entry
+# gets its own client (PyMongo clients are not fork-safe).
+_CLIENTS = {}
+_LOCK = threading.Lock()
+
+_SETTINGS = {
+    "default": {
+        "uri_env": "MONGO_URI",
+        "db_env": "MONGO_DB_NAME",
+    },
+}
+
+
+def _reset_after_fork():
+    global _LOCK
+    _LOCK = threading.Lock()
+    # inherited sockets belong to the parent – just drop our references
+    _CLIENTS.clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_mongo_client(alias="default"):
+    pid = os.getpid()
+    entry = _CLIENTS.get(alias)
+    if entry is not None and entry[0] == pid:
+        return entry[1]
+
+    with _LOCK:
+        entry = _CLIENTS.get(alias)
+        if entry is None or entry[0] != pid:
+            client = MongoClient(
+                os.getenv(_SETTINGS[alias]["uri_env"]),
+                maxPoolSize=50,
+                serverSelectionTimeoutMS=5000,
+                connect=False,  # no I/O until the first operation
+            )
+            entry = (pid, client)
+            _CLIENTS[alias] = entry
+    return entry[1]
+
 
-def get_mongo_client():
-    global _MONGO_CLIENT
-    if _MONGO_CLIENT is None:
-        _MONGO_CLIENT = MongoClient(
-            os.getenv("MONGO_URI"),
-            maxPoolSize=50,
-            serverSelectionTimeoutMS=5000
-        )
-    return _MONGO_CLIENT
+def get_db(alias="default"):
+    client = get_mongo_client(alias)
+    return client[os.getenv(_SETTINGS[alias]["db_env"])]
 
 
-def get_db():
-    client = get_mongo_client()
-    return client[os.getenv("MONGO_DB_NAME")]
\ No newline at end of file
+def close_clients():
+    """Close this process's clients (tests / management commands)."""
+    with _LOCK:
+        for pid, client in list(_CLIENTS.values()):
+            if pid == os.getpid():
+                client.close()
+        _CLIENTS.clear()
@@ -0,0 +1,285 @@
+"""
+Chat's local replica of the user directory (id, username, avatar).
+
+Accounts publishes every User change to the `directory:users` stream
+(common.user_directory). Two consumers replay it:
+
+  - `sync_user_directory` (management command, one per deployment) keeps
+    the DirectoryUser table current and records how far it got in
+    `directory:users:applied`.
+  - every chat process holds a `DirectoryIndex`: the table loaded into a
+    sorted (username_normalized, user_id) list for bisect prefix search,
+    plus a dict for id -> name/avatar. The first read starts a background
+    load (reads see an empty directory until it lands); after that it tops
+    itself up from the stream at most every
+    CHAT_USER_DIRECTORY_REFRESH_SECONDS.
+
+User search and participant display therefore never wait on the auth
+service.
+"""
+import bisect
+import threading
+import time
+import unicodedata
+
+import msgspec
+from django.conf import settings
+from django.db import transaction
+
+from common.cursors import decode_cursor, encode_cursor
+from common.redis_service import redis_client
+from common.user_directory import USER_DELETED, USER_PUBLIC_KEY, oldest_change_id, read_changes
+from .models import DirectoryUser
+from .secure_dm.models import E2EEIdentity
+
+
+APPLIED_KEY = "directory:users:applied"
+REFRESH_SECONDS = getattr(settings, 'CHAT_USER_DIRECTORY_REFRESH_SECONDS', 1.0)
+READ_BATCH = 1000
+START_ID = "0-0"
+
+
+class DirectoryEntry(msgspec.Struct):
+    user_id: str
+    username: str
+    username_normalized: str
+    avatar: str = ''
+
+    @classmethod
+    def from_event(cls, event):
+        return cls(
+            user_id=event['id'],
+            username=event.get('username', ''),
+            username_normalized=event.get('username_normalized') or event.get('username', '').lower(),
+            avatar=event.get('avatar', ''),
+        )
+
+    @classmethod
+    def from_model(cls, row):
+        return cls(
+            user_id=row.user_id,
+            username=row.username,
+            username_normalized=row.username_normalized,
+            avatar=row.avatar,
+        )
+
+
+def _stream_id(value):
+    ms, _, seq = value.partition('-')
+    return int(ms), int(seq or 0)
+
+
+def _collapse(changes):
+    """Last event per user id wins: {user_id: DirectoryEntry | None (deleted)}."""
+    latest = {}
+    for _, event in changes:
+        if not event.get('id') or event.get('type') == USER_PUBLIC_KEY:
+            continue
+        latest[event['id']] = None if event.get('type') == USER_DELETED else DirectoryEntry.from_event(event)
+    return latest
+
+
+def _trimmed_past(applied):
+    """True if entries after `applied` were already trimmed off the stream."""
+    oldest = oldest_change_id()
+    return oldest is not None and applied != START_ID and _stream_id(oldest) > _stream_id(applied)
+
+
+# --------------------------------------------------------------------
+# Replica table
+# --------------------------------------------------------------------
+def apply_changes(changes):
+    """Upsert / delete one batch of stream entries into DirectoryUser (and mirror identity keys)."""
+    latest = _collapse(changes)
+    upserts = [
+        DirectoryUser(
+            user_id=e.user_id,
+            username=e.username,
+            username_normalized=e.username_normalized,
+            avatar=e.avatar,
+        )
+        for e in latest.values() if e is not None
+    ]
+    deleted = [uid for uid, e in latest.items() if e is None]
+    # last key per user wins, like _collapse
+    keys = {
+        event['id']: event['public_key']
+        for _, event in changes
+        if event.get('type') == USER_PUBLIC_KEY and event.get('id') and event.get('public_key')
+    }
+
+    with transaction.atomic():
+        if upserts:
+            DirectoryUser.objects.bulk_create(
+                upserts,
+                update_conflicts=True,
+                unique_fields=['user_id'],
+                update_fields=['username', 'username_normalized', 'avatar', 'updated_at'],
+            )
+        if deleted:
+            DirectoryUser.objects.filter(user_id__in=deleted).delete()
+        if keys:
+            E2EEIdentity.objects.bulk_create(
+                [E2EEIdentity(user_id=uid, public_key=key) for uid, key in keys.items()],
+                update_conflicts=True,
+                unique_fields=['user_id'],
+                update_fields=['public_key', 'updated_at'],
+            )
+    return len(latest)
+
+
+def sync_replica(max_batches=None):
+    """
+    Apply everything after the recorded position. Returns (entries, gap);
+    `gap` means the stream was trimmed past us and a fresh
+    publish_user_directory snapshot is needed to be complete again.
+    """
+    from .renames import queue_renames  # renames imports this module
+
+    applied = redis_client.get(APPLIED_KEY) or START_ID
+    gap = _trimmed_past(applied)
+    total = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        changes = read_changes(applied, READ_BATCH)
+        if not changes:
+            break
+        apply_changes(changes)
+        queue_renames(changes)
+        applied = changes[-1][0]
+        redis_client.set(APPLIED_KEY, applied)
+        total += len(changes)
+        batches += 1
+        if len(changes) < READ_BATCH:
+            break
+    return total, gap
+
+
+# --------------------------------------------------------------------
+# In-process prefix index
+# --------------------------------------------------------------------
+class DirectoryIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._warm_lock = threading.Lock()
+        self._warming = False
+        self._names = []    # sorted [(username_normalized, user_id)]
+        self._entries = {}  # user_id -> DirectoryEntry
+        self._position = None
+        self._checked_at = 0.0
+
+    # ---------- loading ----------
+    def _load(self):
+        # read the table's position first: anything applied after it is
+        # replayed from the stream, and replaying an entry twice is a no-op
+        try:
+            position = redis_client.get(APPLIED_KEY) or START_ID
+        except Exception:
+            position = START_ID
+        entries = {}
+        for row in DirectoryUser.objects.all().iterator(chunk_size=5000):
+            entries[row.user_id] = DirectoryEntry.from_model(row)
+        self._entries = entries
+        self._names = sorted((e.username_normalized, e.user_id) for e in entries.values())
+        self._position = position
+
+    def _apply(self, changes):
+        for user_id, entry in _collapse(changes).items():
+            old = self._entries.pop(user_id, None)
+            if old is not None:
+                i = bisect.bisect_left(self._names, (old.username_normalized, user_id))
+                if i < len(self._names) and self._names[i] == (old.username_normalized, user_id):
+                    del self._names[i]
+            if entry is not None:
+                self._entries[user_id] = entry
+                bisect.insort(self._names, (entry.username_normalized, user_id))
+        self._position = changes[-1][0]
+
+    def warm(self):
+        """Load the table in a background thread (no-op once loaded or loading)."""
+        with self._warm_lock:
+            if self._warming or self._position is not None:
+                return
+            self._warming = True
+        threading.Thread(target=self._warm, name='directory-warm', daemon=True).start()
+
+    def _warm(self):
+        try:
+            self.refresh(force=True)
+        finally:
+            # a failed load (DB down) is retried by the next read
+            self._warming = False
+
+    def refresh(self, force=False):
+        if self._position is None and not force:
+            # never load the whole table inside a request
+            self.warm()
+            return
+        now = time.monotonic()
+        if not force and self._position is not None and now - self._checked_at < REFRESH_SECONDS:
+            return
+        with self._lock:
+            if not force and self._position is not None and now - self._checked_at < REFRESH_SECONDS:
+                return
+            self._checked_at = now
+            if self._position is None:
+                self._load()
+            try:
+                if _trimmed_past(self._position):
+                    self._load()
+                while True:
+                    changes = read_changes(self._position, READ_BATCH)
+                    if not changes:
+                        break
+                    self._apply(changes)
+                    if len(changes) < READ_BATCH:
+                        break
+            except Exception:
+                # Redis down: keep serving what we have
+                pass
+
+    # ---------- reads ----------
+    def search(self, query, limit, cursor=None):
+        """
+        Prefix search on the normalized username, ordered by (name, id).
+        Returns (entries, next_cursor); raises ValueError on a bad cursor.
+        """
+        self.refresh()
+        q = unicodedata.normalize('NFKC', query or '').strip().lower()
+        position = decode_cursor(cursor)
+        start = (q, '')
+        if position:
+            name, last_id = position
+            start = (name, str(last_id) + '\0')
+
+        names = self._names
+        i = bisect.bisect_left(names, start)
+        found = []
+        while i < len(names) and len(found) <= limit:
+            name, user_id = names[i]
+            if not name.startswith(q):
+                break
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                found.append(entry)
+            i += 1
+
+        next_cursor = None
+        if len(found) > limit:
+            last = found[limit - 1]
+            next_cursor = encode_cursor(last.username_normalized, last.user_id)
+        return found[:limit], next_cursor
+
+    def get_many(self, user_ids):
+        """{user_id: DirectoryEntry} for the ids the replica knows."""
+        self.refresh()
+        entries = self._entries
+        return {str(u): entries[str(u)] for u in user_ids if str(u) in entries}
+
+
+directory = DirectoryIndex()
+
+
+def display_names(user_ids):
+    """{user_id: username} for participant display (unknown ids omitted)."""
+    return {uid: e.username for uid, e in directory.get_many(user_ids).items()}
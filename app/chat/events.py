@@ -0,0 +1,137 @@
+import json
+
+from django.conf import settings
+
+import msgspec
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+
+from common.codecs import to_payload
+from common.redis_service import redis_client
+
+
+EVENT_STREAM_MAXLEN = getattr(settings, 'CHAT_EVENT_STREAM_MAXLEN', 1000)
+EVENT_STREAM_TTL = getattr(settings, 'CHAT_EVENT_STREAM_TTL', 86400)
+REPLAY_BATCH_SIZE = 200
+
+
+def stream_key(user_id):
+    return f"events:user:{user_id}"
+
+
+def _parse_event_id(event_id):
+    """
+    Redis stream ids look like "<ms>-<seq>". Returns a comparable tuple,
+    or None if the id is malformed.
+    """
+    try:
+        ms, _, seq = str(event_id).partition('-')
+        return int(ms), int(seq or 0)
+    except (TypeError, ValueError):
+        return None
+
+
+# --------------------------------------------------------------------
+# Publish – append to the per-user log, then push over Channels
+# --------------------------------------------------------------------
+def publish_event(user_id, payload):
+    """
+    Append `payload` to the bounded per-user event stream and broadcast it
+    to the user's channel group. The stream id is attached as `eventId`
+    so clients can resume from it after a reconnect.
+
+    Returns the stream id (or None if Redis was unavailable – the live
+    broadcast still goes out in that case).
+    """
+    key = stream_key(user_id)
+    event_id = None
+
+    try:
+        pipe = redis_client.pipeline()
+        pipe.xadd(
+            key,
+            {'data': json.dumps(payload)},
+            maxlen=EVENT_STREAM_MAXLEN,
+            approximate=True,
+        )
+        pipe.expire(key, EVENT_STREAM_TTL)
+        event_id = pipe.execute()[0]
+    except Exception:
+        event_id = None
+
+    data = dict(payload)
+    if event_id:
+        data['eventId'] = event_id
+
+    channel_layer = get_channel_layer()
+    async_to_sync(channel_layer.group_send)(
+        f"user_{user_id}",
+        {
+            "type": "chat.message",
+            "data": data,
+        },
+    )
+    return event_id
+
+
+def publish_to_users(user_ids, payload):
+    """`payload` may be a schema Struct; it is converted once for all users."""
+    if isinstance(payload, msgspec.Struct):
+        payload = to_payload(payload)
+    for user_id in user_ids:
+        publish_event(user_id, payload)
+
+
+# --------------------------------------------------------------------
+# Replay – gap between the client's cursor and the stream head
+# --------------------------------------------------------------------
+def replay_events(user_id, last_event_id):
+    """
+    Return the events the user missed after `last_event_id`, oldest first.
+
+    Returns None when the gap cannot be served from the stream (the cursor
+    is malformed, the stream expired, or it was trimmed past the cursor);
+    the client must then do a full resync.
+    """
+    cursor = _parse_event_id(last_event_id)
+    if cursor is None:
+        return None
+
+    key = stream_key(user_id)
+
+    first = redis_client.xrange(key, count=1)
+    if not first:
+        # Stream expired / never existed – we can't prove nothing was missed
+        return None
+
+    first_id, _ = first[0]
+    if cursor < _parse_event_id(first_id):
+        # The cursor entry itself was trimmed, so older events are gone
+        return None
+
+    events = []
+    start = f"({last_event_id}"
+    while True:
+        batch = redis_client.xrange(key, min=start, count=REPLAY_BATCH_SIZE)
+        for event_id, fields in batch:
+            try:
+                data = json.loads(fields.get('data') or '{}')
+            except ValueError:
+                continue
+            data['eventId'] = event_id
+            events.append(data)
+
+        if len(batch) < REPLAY_BATCH_SIZE:
+            break
+        start = f"({batch[-1][0]}"
+
+    return events
+
+
+def is_newer(event_id, than_id):
+    """True if stream id `event_id` sorts after `than_id`."""
+    a = _parse_event_id(event_id)
+    b = _parse_event_id(than_id)
+    if a is None or b is None:
+        return True
+    return a > b
@@ -0,0 +1,43 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from chat import archive
+
+
+class Command(BaseCommand):
+    help = "Move chat / DM messages older than the cutoff into compressed archive segments"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--older-than-days",
+            type=int,
+            default=archive.ARCHIVE_AFTER_DAYS,
+            help="Archive messages older than this many days (default: CHAT_ARCHIVE_AFTER_DAYS)",
+        )
+        parser.add_argument("--kind", action="append", choices=sorted(archive.KINDS))
+        parser.add_argument("--dry-run", action="store_true", help="Only list conversations that would be archived")
+
+    def handle(self, *args, **options):
+        if not archive.ZSTD_AVAILABLE:
+            raise CommandError("zstandard is not installed")
+        if options["older_than_days"] < 1:
+            raise CommandError("--older-than-days must be at least 1")
+
+        cutoff = timezone.now() - timedelta(days=options["older_than_days"])
+        self.stdout.write(f"Archiving messages older than {cutoff.isoformat()}")
+
+        for kind in options["kind"] or sorted(archive.KINDS):
+            conv_ids = list(archive.conversations_to_archive(kind, cutoff))
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{kind}: {len(conv_ids)} conversations"))
+            if options["dry_run"]:
+                continue
+
+            total = 0
+            for conv_id in conv_ids:
+                moved = archive.archive_conversation(kind, conv_id, cutoff)
+                total += moved
+                if moved:
+                    self.stdout.write(f"  {conv_id}: {moved} messages")
+            self.stdout.write(self.style.SUCCESS(f"  {total} messages archived"))
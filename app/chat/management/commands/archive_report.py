@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Count, Sum
+
+from chat.archive import KINDS
+from chat.models import ArchiveSegment
+
+
+class Command(BaseCommand):
+    help = "Report hot (primary database) vs cold (archive segment) message storage"
+
+    def handle(self, *args, **options):
+        for kind, (model, _) in sorted(KINDS.items()):
+            table = model._meta.db_table
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT pg_total_relation_size(%s), "
+                    "(SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass)",
+                    [table, table],
+                )
+                hot_bytes, hot_rows = cursor.fetchone()
+
+            cold = ArchiveSegment.objects.filter(kind=kind).aggregate(
+                segments=Count("id"),
+                rows=Sum("message_count"),
+                size=Sum("size_bytes"),
+            )
+            cold_rows = cold["rows"] or 0
+            cold_bytes = cold["size"] or 0
+
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{kind} ({table})"))
+            self.stdout.write(f"  hot   rows~{max(hot_rows, 0):>12}  bytes={hot_bytes:>14}  ({_human(hot_bytes)})")
+            self.stdout.write(
+                f"  cold  rows={cold_rows:>12}  bytes={cold_bytes:>14}  ({_human(cold_bytes)})"
+                f"  segments={cold['segments']}"
+            )
+            if hot_rows > 0 and cold_rows:
+                hot_per_row = hot_bytes / hot_rows
+                cold_per_row = cold_bytes / cold_rows
+                self.stdout.write(
+                    f"  bytes/row hot={hot_per_row:.0f} cold={cold_per_row:.0f} "
+                    f"(x{hot_per_row / cold_per_row:.1f} smaller archived)"
+                )
+
+
+def _human(n):
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if n < 1024:
+            return f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} TiB"
@@ -0,0 +1,79 @@
+import os
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from chat.message_store import MESSAGE_STORES, MongoBucketMessageStore, get_message_store
+from chat.models import Conversation
+
+
+class Command(BaseCommand):
+    help = "Compare message-store backends: append throughput and history page latency"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--backend",
+            action="append",
+            choices=sorted(MESSAGE_STORES),
+            help="Backend(s) to run (default: all)",
+        )
+        parser.add_argument("--messages", type=int, default=5000)
+        parser.add_argument("--payload-bytes", type=int, default=256)
+        parser.add_argument("--page-size", type=int, default=50)
+        parser.add_argument("--pages", type=int, default=200)
+
+    def handle(self, *args, **options):
+        backends = options["backend"] or sorted(MESSAGE_STORES)
+        payload = os.urandom(options["payload_bytes"])
+
+        self.stdout.write(
+            f"{options['messages']} messages x {options['payload_bytes']} bytes, "
+            f"{options['pages']} pages of {options['page_size']}"
+        )
+
+        for name in backends:
+            store = get_message_store(name)
+            if isinstance(store, MongoBucketMessageStore):
+                store.ensure_indexes()
+
+            # scratch conversation – Postgres rows need the FK
+            conv = Conversation.objects.create(is_group=True, name="bench_message_store")
+            try:
+                self._run(store, conv.id, payload, options)
+            finally:
+                store.delete_conversation(conv.id)
+                conv.delete()
+
+    def _run(self, store, conv_id, payload, options):
+        count = options["messages"]
+
+        started = time.perf_counter()
+        for i in range(count):
+            store.append(
+                conv_id,
+                sender_id=str(i % 20),
+                sender_username=f"bench{i % 20}",
+                ciphertext=payload,
+                metadata={"n": i},
+            )
+        append_s = time.perf_counter() - started
+
+        # newest page, then walk backwards page by page
+        latencies = []
+        before = None
+        for _ in range(options["pages"]):
+            t0 = time.perf_counter()
+            rows, has_more = store.history(conv_id, options["page_size"], before=before)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            if not has_more or not rows:
+                before = None
+            else:
+                before = (rows[0].timestamp, rows[0].id)
+
+        latencies.sort()
+        p95 = latencies[int(len(latencies) * 0.95) - 1] if len(latencies) > 1 else latencies[0]
+        self.stdout.write(self.style.MIGRATE_HEADING(store.name))
+        self.stdout.write(f"  append        {count / append_s:10.0f} msg/s")
+        self.stdout.write(f"  history p50   {statistics.median(latencies):10.2f} ms")
+        self.stdout.write(f"  history p95   {p95:10.2f} ms")
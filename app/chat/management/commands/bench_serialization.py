@@ -0,0 +1,83 @@
+import base64
+import json
+import os
+import time
+import uuid
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from chat.models import Conversation, Message
+from chat.schemas import MessageOut, MessagePage
+from common import codecs
+
+
+def _legacy_page(messages):
+    """Dict building + json.dumps as the history view did it before schemas."""
+    return json.dumps({
+        'messages': [
+            {
+                'id': str(m.id),
+                'sender_id': m.sender_id,
+                'sender_username': m.sender_username,
+                'ciphertext': base64.b64encode(bytes(m.ciphertext)).decode(),
+                'metadata': m.metadata,
+                'timestamp': m.timestamp.isoformat(),
+            }
+            for m in messages
+        ],
+        'has_more': False,
+    }).encode()
+
+
+def _schema_page(messages, codec):
+    page = MessagePage(messages=[MessageOut.from_model(m) for m in messages], has_more=False)
+    return codecs.encode(codec, page)
+
+
+class Command(BaseCommand):
+    help = "Benchmark history page serialization: dict + json.dumps vs msgspec schemas"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--messages", type=int, default=1000)
+        parser.add_argument("--payload-bytes", type=int, default=256)
+        parser.add_argument("--rounds", type=int, default=50)
+
+    def handle(self, *args, **options):
+        count = options["messages"]
+        rounds = options["rounds"]
+
+        # Unsaved instances – no database needed
+        conv = Conversation(id=uuid.uuid4())
+        now = timezone.now()
+        messages = [
+            Message(
+                id=uuid.uuid4(),
+                conversation=conv,
+                sender_id=str(i % 50),
+                sender_username=f"user{i % 50}",
+                ciphertext=os.urandom(options["payload_bytes"]),
+                metadata={"v": 1, "kid": "k1"},
+                timestamp=now - timedelta(seconds=i),
+            )
+            for i in range(count)
+        ]
+
+        cases = [("dict + json.dumps", _legacy_page)]
+        for codec in (codecs.JSON, codecs.MSGPACK, codecs.CBOR):
+            if codecs.available(codec):
+                cases.append((f"msgspec {codec}", lambda msgs, c=codec: _schema_page(msgs, c)))
+
+        self.stdout.write(f"{count} messages, {options['payload_bytes']} byte payloads, {rounds} rounds")
+        baseline = None
+        for name, fn in cases:
+            size = len(fn(messages))
+            started = time.perf_counter()
+            for _ in range(rounds):
+                fn(messages)
+            per_page = (time.perf_counter() - started) / rounds * 1000
+            baseline = baseline or per_page
+            self.stdout.write(
+                f"  {name:<20} {per_page:8.2f} ms/page  {size:>9} bytes  x{baseline / per_page:.2f}"
+            )
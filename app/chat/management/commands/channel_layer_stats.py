@@ -0,0 +1,63 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from redis import Redis
+
+
+class Command(BaseCommand):
+    help = "Report per-shard channel-layer queue depth and group sizes"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--alias", default="default", help="CHANNEL_LAYERS alias")
+        parser.add_argument("--top", type=int, default=10, help="largest groups / queues to list per shard")
+
+    def handle(self, *args, **options):
+        layer = getattr(settings, "CHANNEL_LAYERS", {}).get(options["alias"])
+        if not layer:
+            raise CommandError(f"CHANNEL_LAYERS['{options['alias']}'] is not configured")
+
+        config = layer.get("CONFIG", {})
+        prefix = config.get("prefix", "asgi")
+        capacity = config.get("capacity", 100)
+        hosts = config.get("hosts") or []
+
+        self.stdout.write(f"backend={layer.get('BACKEND')} capacity={capacity} shards={len(hosts)}")
+
+        for index, host in enumerate(hosts):
+            url = host if isinstance(host, str) else host.get("address")
+            self.stdout.write(self.style.MIGRATE_HEADING(f"shard {index}: {url}"))
+            try:
+                stats = self.shard_stats(Redis.from_url(url, decode_responses=True), prefix)
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f"  unreachable: {e}"))
+                continue
+
+            queues, groups = stats
+            depth = sum(queues.values())
+            near_full = sum(1 for d in queues.values() if d >= capacity * 0.8)
+            self.stdout.write(
+                f"  channels={len(queues)} queued={depth} near_capacity={near_full} "
+                f"groups={len(groups)} group_members={sum(groups.values())}"
+            )
+            for name, size in sorted(groups.items(), key=lambda kv: -kv[1])[:options["top"]]:
+                self.stdout.write(f"  group {name:<40} {size}")
+            for name, size in sorted(queues.items(), key=lambda kv: -kv[1])[:options["top"]]:
+                if size:
+                    self.stdout.write(f"  queue {name:<40} {size}")
+
+    def shard_stats(self, conn, prefix):
+        """({channel_key: depth}, {group_name: members}) for one Redis shard."""
+        group_prefix = f"{prefix}:group:"
+        queues = {}
+        groups = {}
+
+        for key in conn.scan_iter(match=f"{prefix}*", count=1000):
+            kind = conn.type(key)
+            if key.startswith(group_prefix):
+                if kind == "zset":
+                    groups[key[len(group_prefix):]] = conn.zcard(key)
+            elif kind == "zset":
+                queues[key] = conn.zcard(key)
+            elif kind == "list":
+                queues[key] = conn.llen(key)
+
+        return queues, groups
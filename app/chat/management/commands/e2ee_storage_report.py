@@ -0,0 +1,93 @@
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from common.binary_codec import bytes_to_b64
+
+
+TABLES = {
+    # table: (payload columns, conversation fk column)
+    'chat_message': (['ciphertext'], 'conversation_id'),
+    'secure_dm_dmmessage': (['nonce', 'ciphertext'], 'conversation_id'),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure E2EE message storage (table size, payload bytes) and history "
+        "read time. Works on both the base64-text and the binary schema, so run "
+        "it before and after the binary migrations and compare."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=50, help='messages per history page')
+        parser.add_argument('--conversations', type=int, default=20, help='busiest conversations to sample')
+        parser.add_argument('--iterations', type=int, default=5)
+
+    def handle(self, *args, **options):
+        for table, (columns, fk) in TABLES.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(table))
+            self.report_size(table, columns)
+            self.report_reads(table, columns, fk, options)
+
+    def report_size(self, table, columns):
+        payload = ' + '.join(f'COALESCE(octet_length({c}), 0)' for c in columns)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT pg_total_relation_size(%s), pg_relation_size(%s), "
+                f"count(*), COALESCE(sum({payload}), 0) FROM {table}",
+                [table, table],
+            )
+            total, heap, rows, payload_bytes = cursor.fetchone()
+
+        self.stdout.write(f"  rows={rows} total_size={total} heap_size={heap} payload_bytes={payload_bytes}")
+        if rows:
+            self.stdout.write(f"  avg_payload_bytes={payload_bytes / rows:.1f}")
+
+    def report_reads(self, table, columns, fk, options):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT {fk} FROM {table} GROUP BY {fk} ORDER BY count(*) DESC LIMIT %s",
+                [options['conversations']],
+            )
+            conv_ids = [row[0] for row in cursor.fetchall()]
+
+        if not conv_ids:
+            self.stdout.write("  no messages to sample")
+            return
+
+        select = ', '.join(['id', 'timestamp', *columns])
+        timings = []
+        for _ in range(options['iterations']):
+            for conv_id in conv_ids:
+                start = time.perf_counter()
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        f"SELECT {select} FROM {table} WHERE {fk} = %s "
+                        f"ORDER BY timestamp DESC LIMIT %s",
+                        [conv_id, options['limit']],
+                    )
+                    rows = cursor.fetchall()
+                # what the JSON endpoint pays: decode rows + produce base64 text
+                page = [
+                    [str(r[0]), r[1].isoformat(), *[_wire(v) for v in r[2:]]]
+                    for r in rows
+                ]
+                json.dumps(page)
+                timings.append((time.perf_counter() - start) * 1000)
+
+        timings.sort()
+        p95 = timings[int(len(timings) * 0.95) - 1] if len(timings) >= 20 else timings[-1]
+        self.stdout.write(
+            f"  history page (limit={options['limit']}): "
+            f"median={statistics.median(timings):.2f}ms p95={p95:.2f}ms samples={len(timings)}"
+        )
+
+
+def _wire(value):
+    if isinstance(value, (bytes, memoryview)):
+        return bytes_to_b64(value)
+    return value
@@ -0,0 +1,54 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from chat.secure_dm.models import E2EEIdentity
+from common.identity_keys import seed_identities
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-seed the shared E2EE identity directory from E2EEIdentity (e.g. after a Redis "
+        "flush), first copying legacy User.public_key values that have no identity row"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument(
+            "--overwrite",
+            action="store_true",
+            help="Replace directory entries instead of only filling missing ones",
+        )
+
+    def backfill_legacy_keys(self, batch_size):
+        """User.public_key set but no E2EEIdentity row: keys registered before the table was canonical."""
+        qs = (
+            get_user_model().objects
+            .exclude(public_key__isnull=True)
+            .exclude(public_key="")
+            .values_list("id", "public_key")
+            .order_by("id")
+        )
+        rows = []
+        for user_id, public_key in qs.iterator(chunk_size=batch_size):
+            rows.append(E2EEIdentity(user_id=str(user_id), public_key=public_key))
+            if len(rows) >= batch_size:
+                E2EEIdentity.objects.bulk_create(rows, ignore_conflicts=True)
+                rows = []
+        E2EEIdentity.objects.bulk_create(rows, ignore_conflicts=True)
+
+    def handle(self, *args, **options):
+        self.backfill_legacy_keys(options["batch_size"])
+
+        qs = E2EEIdentity.objects.values_list("user_id", "public_key").order_by("id")
+
+        batch, total = {}, 0
+        for user_id, public_key in qs.iterator(chunk_size=options["batch_size"]):
+            batch[user_id] = public_key
+            if len(batch) >= options["batch_size"]:
+                seed_identities(batch, overwrite=options["overwrite"])
+                total += len(batch)
+                batch = {}
+        seed_identities(batch, overwrite=options["overwrite"])
+        total += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f"Seeded {total} identity keys"))
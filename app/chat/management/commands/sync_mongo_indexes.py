@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from chat.db.indexes import INDEXES, diff_indexes, sync_indexes
+
+
+class Command(BaseCommand):
+    help = "Diff declared Mongo indexes (chat/db/indexes.py) against the server and build what's missing"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--collection", action="append", choices=sorted(INDEXES))
+        parser.add_argument("--dry-run", action="store_true", help="Only show the plan")
+        parser.add_argument(
+            "--drop-extra",
+            action="store_true",
+            help="Also drop indexes that exist on the server but are not declared",
+        )
+
+    def handle(self, *args, **options):
+        collections = options["collection"]
+
+        if options["dry_run"]:
+            plan = diff_indexes(collections=collections)
+            for coll_name, changes in sorted(plan.items()):
+                self.stdout.write(self.style.MIGRATE_HEADING(coll_name))
+                for model in changes["missing"]:
+                    name = model.document["name"]
+                    action = "rebuild" if name in changes["changed"] else "create"
+                    self.stdout.write(f"  {action:<8} {name}")
+                for name in changes["extra"]:
+                    self.stdout.write(f"  extra    {name}")
+                if not changes["missing"] and not changes["extra"]:
+                    self.stdout.write("  up to date")
+            return
+
+        self.stdout.write("Syncing Mongo indexes (background builds):")
+        sync_indexes(collections=collections, drop_extra=options["drop_extra"], stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS("Done"))
@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from chat.directory import sync_replica
+from chat.renames import RENAME_BATCH_SIZE, propagate_renames
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay the accounts user-directory feed into chat's DirectoryUser replica "
+        "and propagate username changes to denormalized chat copies"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Catch up (directory and renames) and exit")
+        parser.add_argument("--interval", type=float, default=1.0, help="Seconds between polls when idle")
+        parser.add_argument(
+            "--rename-rows-per-poll",
+            type=int,
+            default=RENAME_BATCH_SIZE * 10,
+            help="Rename rows rewritten before the directory feed is polled again",
+        )
+
+    def handle(self, *args, **options):
+        warned = False
+        while True:
+            applied, gap = sync_replica()
+            if gap and not warned:
+                self.stderr.write(self.style.WARNING(
+                    "directory stream was trimmed past the replica position – "
+                    "run `manage.py publish_user_directory` on the auth service"
+                ))
+                warned = True
+            if applied:
+                self.stdout.write(f"  applied {applied} directory changes")
+
+            renamed = propagate_renames(max_rows=None if options["once"] else options["rename_rows_per_poll"])
+            if renamed:
+                self.stdout.write(f"  rewrote {renamed} rows for renamed users")
+
+            if options["once"]:
+                break
+            if not applied and not renamed:
+                time.sleep(options["interval"])
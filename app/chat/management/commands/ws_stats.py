@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from chat.outbound import read_node_stats
+
+
+class Command(BaseCommand):
+    help = "Show per-node WebSocket outbound queue depth and drop counters"
+
+    def handle(self, *args, **options):
+        stats = read_node_stats()
+        if not stats:
+            self.stdout.write("No node has reported stats recently.")
+            return
+
+        for node_id, values in sorted(stats.items()):
+            self.stdout.write(self.style.MIGRATE_HEADING(node_id))
+            for name in sorted(values):
+                self.stdout.write(f"  {name:<20} {values[name]}")
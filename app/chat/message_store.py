@@ -0,0 +1,373 @@
+"""
+Message store interface for chat history.
+
+The views only talk to `get_message_store()`; which backend sits behind it
+is picked by settings.CHAT_MESSAGE_STORE:
+
+  "postgres" – the `Message` table (default)
+  "mongo"    – MongoDB bucket pattern: one document per conversation per
+               time bucket holding up to CHAT_MONGO_BUCKET_MAX_MESSAGES
+               messages, so a history page is one or two document reads
+               instead of one index entry + heap fetch per message.
+
+Backends return objects with the `Message` attributes the schemas read
+(id, conversation_id, sender_id, sender_username, ciphertext, metadata,
+timestamp, sender_key_id).
+"""
+import abc
+import uuid
+from datetime import datetime, timezone as dt_timezone
+from typing import Any, Optional
+
+import msgspec
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from . import archive
+from .models import Message
+from .sync import latest_per_conversation
+
+
+MESSAGE_STORE = getattr(settings, 'CHAT_MESSAGE_STORE', 'postgres')
+MONGO_BUCKET_SECONDS = getattr(settings, 'CHAT_MONGO_BUCKET_SECONDS', 3600)
+MONGO_BUCKET_MAX_MESSAGES = getattr(settings, 'CHAT_MONGO_BUCKET_MAX_MESSAGES', 200)
+
+
+class StoredMessage(msgspec.Struct):
+    """Backend-neutral message row (what non-ORM backends hand back)."""
+    id: str
+    conversation_id: str
+    sender_id: str
+    sender_username: str
+    ciphertext: bytes
+    metadata: Optional[dict[str, Any]]
+    timestamp: datetime
+    sender_key_id: Optional[int] = None
+
+
+class MessageStore(abc.ABC):
+    name = None
+
+    @abc.abstractmethod
+    def append(self, conversation_id, *, sender_id, sender_username, ciphertext,
+               metadata=None, sender_key_id=None):
+        """Persist one message and return it."""
+
+    @abc.abstractmethod
+    def history(self, conversation_id, limit, before=None):
+        """
+        (newest `limit` messages older than `before`, oldest first; has_more).
+        `before` is the (timestamp, id) of the oldest message already held,
+        so equal timestamps never make a page skip or repeat rows.
+        """
+
+    @abc.abstractmethod
+    def latest(self, conversation_ids, cap, since=None):
+        """{conversation_id: (rows_oldest_first, has_more)} – newest `cap` per conversation."""
+
+    @abc.abstractmethod
+    def head(self, conversation_id):
+        """
+        (timestamp, version) of the newest stored message, or None – one
+        index probe, used to version the newest history page (ETag).
+        """
+
+    @abc.abstractmethod
+    def delete_conversation(self, conversation_id):
+        """Drop every stored message of the conversation."""
+
+    @abc.abstractmethod
+    def rename_sender(self, sender_id, username, limit, after=None):
+        """
+        Rewrite sender_username on up to `limit` of the sender's messages
+        past the keyset position `after`. Returns (rows_updated, next_after);
+        next_after is None once the sender's messages are exhausted.
+        """
+
+
+# --------------------------------------------------------------------
+# Postgres
+# --------------------------------------------------------------------
+class PostgresMessageStore(MessageStore):
+    name = 'postgres'
+
+    def append(self, conversation_id, *, sender_id, sender_username, ciphertext,
+               metadata=None, sender_key_id=None):
+        return Message.objects.create(
+            conversation_id=conversation_id,
+            sender_id=sender_id,
+            sender_username=sender_username,
+            ciphertext=ciphertext,
+            sender_key_id=sender_key_id,
+            metadata=metadata or {},
+        )
+
+    def history(self, conversation_id, limit, before=None):
+        qs = Message.objects.filter(conversation_id=conversation_id)
+        if before:
+            ts, msg_id = before
+            qs = qs.filter(Q(timestamp__lt=ts) | Q(timestamp=ts, id__lt=msg_id))
+        rows = list(qs.order_by('-timestamp', '-id')[:limit + 1])
+        if len(rows) > limit:
+            return rows[:limit][::-1], True
+
+        # hot rows ran out – continue transparently into archived segments
+        rows = rows[::-1]
+        older_than = (rows[0].timestamp, rows[0].id) if rows else before
+        need = limit - len(rows)
+        if need == 0:
+            return rows, archive.has_archived('chat', conversation_id, older_than)
+        archived, has_more = archive.read_archived('chat', conversation_id, need, older_than)
+        return archived + rows, has_more
+
+    def head(self, conversation_id):
+        return (
+            Message.objects.filter(conversation_id=conversation_id)
+            .order_by('-timestamp', '-id')
+            .values_list('timestamp', 'id')
+            .first()
+        )
+
+    def latest(self, conversation_ids, cap, since=None):
+        qs = Message.objects.filter(conversation_id__in=conversation_ids)
+        if since:
+            qs = qs.filter(timestamp__gt=since)
+        return latest_per_conversation(qs, cap)
+
+    def delete_conversation(self, conversation_id):
+        Message.objects.filter(conversation_id=conversation_id).delete()
+
+    def rename_sender(self, sender_id, username, limit, after=None):
+        # (sender_id, id) index: each batch is one range scan from `after`
+        qs = Message.objects.filter(sender_id=sender_id)
+        if after:
+            qs = qs.filter(id__gt=after)
+        ids = list(qs.order_by('id').values_list('id', flat=True)[:limit])
+        if not ids:
+            return 0, None
+        updated = (
+            Message.objects.filter(id__in=ids)
+            .exclude(sender_username=username)
+            .update(sender_username=username)
+        )
+        return updated, (str(ids[-1]) if len(ids) == limit else None)
+
+
+# --------------------------------------------------------------------
+# MongoDB – time-bucketed documents
+# --------------------------------------------------------------------
+def _aware(value):
+    # pymongo hands back naive UTC datetimes unless the client is tz_aware
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=dt_timezone.utc)
+    return value
+
+
+class MongoBucketMessageStore(MessageStore):
+    """
+    message_buckets document:
+
+      { conversationId, bucket (bucket start), first, last, count,
+        messages: [ { id, senderId, senderUsername, ciphertext (bin),
+                      metadata, keyId, ts }, ... ] }
+
+    Appends $push into the open bucket while count < max, otherwise the
+    upsert starts a sibling document for the same bucket. Indexed on
+    (conversationId, bucket desc) – see db/indexes.py.
+    """
+    name = 'mongo'
+    collection_name = 'message_buckets'
+
+    def __init__(self, db=None):
+        self._db = db
+
+    @property
+    def buckets(self):
+        if self._db is None:
+            from .db.mongo import get_db
+            self._db = get_db()
+        return self._db[self.collection_name]
+
+    def ensure_indexes(self):
+        from .db.indexes import sync_indexes
+        sync_indexes(self.buckets.database, collections=[self.collection_name])
+
+    @staticmethod
+    def bucket_start(ts):
+        epoch = int(ts.timestamp()) // MONGO_BUCKET_SECONDS * MONGO_BUCKET_SECONDS
+        return datetime.fromtimestamp(epoch, tz=dt_timezone.utc)
+
+    def append(self, conversation_id, *, sender_id, sender_username, ciphertext,
+               metadata=None, sender_key_id=None):
+        now = timezone.now()
+        # BSON dates are millisecond precision – match what reads will return
+        now = now.replace(microsecond=now.microsecond // 1000 * 1000)
+        msg = StoredMessage(
+            id=str(uuid.uuid4()),
+            conversation_id=str(conversation_id),
+            sender_id=sender_id,
+            sender_username=sender_username,
+            ciphertext=bytes(ciphertext),
+            metadata=metadata or {},
+            timestamp=now,
+            sender_key_id=sender_key_id,
+        )
+        self.buckets.update_one(
+            {
+                'conversationId': msg.conversation_id,
+                'bucket': self.bucket_start(now),
+                'count': {'$lt': MONGO_BUCKET_MAX_MESSAGES},
+            },
+            {
+                '$push': {'messages': {
+                    'id': msg.id,
+                    'senderId': msg.sender_id,
+                    'senderUsername': msg.sender_username,
+                    'ciphertext': msg.ciphertext,
+                    'metadata': msg.metadata,
+                    'keyId': msg.sender_key_id,
+                    'ts': now,
+                }},
+                '$inc': {'count': 1},
+                '$min': {'first': now},
+                '$max': {'last': now},
+            },
+            upsert=True,
+        )
+        return msg
+
+    def _from_doc(self, conversation_id, m):
+        return StoredMessage(
+            id=m['id'],
+            conversation_id=conversation_id,
+            sender_id=m['senderId'],
+            sender_username=m['senderUsername'],
+            ciphertext=bytes(m['ciphertext']),
+            metadata=m.get('metadata'),
+            timestamp=_aware(m['ts']),
+            sender_key_id=m.get('keyId'),
+        )
+
+    def _newest(self, conversation_id, limit, before=None, since=None):
+        conversation_id = str(conversation_id)
+        query = {'conversationId': conversation_id}
+        if before:
+            before_ts, before_id = before
+            before = (before_ts, str(before_id))
+            query['first'] = {'$lte': before_ts}
+        if since:
+            query['last'] = {'$gt': since}
+
+        rows, current_bucket = [], None
+        for doc in self.buckets.find(query).sort('bucket', -1):
+            # buckets don't overlap in time, so once we hold more than
+            # `limit` rows and move to an older bucket we're done
+            if doc['bucket'] != current_bucket and len(rows) > limit:
+                break
+            current_bucket = doc['bucket']
+            for m in doc['messages']:
+                ts = _aware(m['ts'])
+                if (before and (ts, m['id']) >= before) or (since and ts <= since):
+                    continue
+                rows.append(self._from_doc(conversation_id, m))
+
+        rows.sort(key=lambda r: (r.timestamp, r.id), reverse=True)
+        return rows[:limit][::-1], len(rows) > limit
+
+    def history(self, conversation_id, limit, before=None):
+        return self._newest(conversation_id, limit, before=before)
+
+    def head(self, conversation_id):
+        # newest bucket; siblings of one bucket sort by their `last` stamp
+        doc = self.buckets.find_one(
+            {'conversationId': str(conversation_id)},
+            {'last': 1, 'count': 1},
+            sort=[('bucket', -1), ('last', -1)],
+        )
+        if not doc:
+            return None
+        return _aware(doc['last']), f"{doc['_id']}.{doc['count']}"
+
+    def latest(self, conversation_ids, cap, since=None):
+        """
+        One aggregation for every conversation: per conversation keep the
+        newest buckets until they hold more than `cap` messages, unwind
+        only those and take the top cap + 1 by (ts, id). Needs MongoDB 5.2
+        ($setWindowFields / $topN).
+        """
+        ids = [str(c) for c in conversation_ids]
+        if not ids:
+            return {}
+        match = {'conversationId': {'$in': ids}}
+        if since:
+            match['last'] = {'$gt': since}
+        pipeline = [
+            {'$match': match},
+            {'$setWindowFields': {
+                'partitionBy': '$conversationId',
+                'sortBy': {'bucket': -1, 'last': -1},
+                'output': {'held': {'$sum': '$count', 'window': {'documents': ['unbounded', 'current']}}},
+            }},
+            # messages held by newer buckets of the same conversation
+            {'$match': {'$expr': {'$lte': [{'$subtract': ['$held', '$count']}, cap]}}},
+            {'$unwind': '$messages'},
+        ]
+        if since:
+            pipeline.append({'$match': {'messages.ts': {'$gt': since}}})
+        pipeline.append({'$group': {
+            '_id': '$conversationId',
+            'rows': {'$topN': {
+                'n': cap + 1,
+                'sortBy': {'messages.ts': -1, 'messages.id': -1},
+                'output': '$messages',
+            }},
+        }})
+
+        result = {}
+        for doc in self.buckets.aggregate(pipeline):
+            conversation_id = doc['_id']
+            rows = [self._from_doc(conversation_id, m) for m in doc['rows'][:cap]]
+            result[conversation_id] = (rows[::-1], len(doc['rows']) > cap)
+        return result
+
+    def delete_conversation(self, conversation_id):
+        self.buckets.delete_many({'conversationId': str(conversation_id)})
+
+    def rename_sender(self, sender_id, username, limit, after=None):
+        # `limit` counts bucket documents here, not messages
+        from bson import ObjectId
+
+        query = {'messages.senderId': sender_id}
+        if after:
+            query['_id'] = {'$gt': ObjectId(after)}
+        ids = [d['_id'] for d in self.buckets.find(query, {'_id': 1}).sort('_id', 1).limit(limit)]
+        if not ids:
+            return 0, None
+        result = self.buckets.update_many(
+            {'_id': {'$in': ids}},
+            {'$set': {'messages.$[m].senderUsername': username}},
+            array_filters=[{'m.senderId': sender_id}],
+        )
+        return result.modified_count, (str(ids[-1]) if len(ids) == limit else None)
+
+
+MESSAGE_STORES = {
+    PostgresMessageStore.name: PostgresMessageStore,
+    MongoBucketMessageStore.name: MongoBucketMessageStore,
+}
+
+_store = None
+
+
+def get_message_store(name=None):
+    """Configured store (shared instance), or a fresh one for `name`."""
+    global _store
+    if name is not None:
+        return MESSAGE_STORES[name]()
+    if _store is None:
+        try:
+            _store = MESSAGE_STORES[MESSAGE_STORE]()
+        except KeyError:
+            raise ValueError(f"Unknown CHAT_MESSAGE_STORE {MESSAGE_STORE!r}")
+    return _store
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-19 11:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0002_sync_columns'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='message',
+            name='ciphertext_bin',
+            field=models.BinaryField(null=True),
+        ),
+    ]
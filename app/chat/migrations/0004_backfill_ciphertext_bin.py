@@ -0,0 +1,73 @@
+import base64
+import binascii
+
+from django.db import migrations, transaction
+
+
+BATCH_SIZE = 2000
+
+
+# Frozen copy of the conversion at the time of this migration – migrations
+# must not follow later changes to app code.
+def _legacy_text_to_bytes(value):
+    """Rows written before binary storage; non-base64 values keep their UTF-8 bytes."""
+    if not value:
+        return b""
+    value = value.strip()
+    padded = value + "=" * (-len(value) % 4)
+    if "-" in value or "_" in value:
+        padded = padded.translate(str.maketrans("-_", "+/"))
+    try:
+        return base64.b64decode(padded, validate=True)
+    except (binascii.Error, ValueError):
+        return value.encode()
+
+
+def _backfill(model, field_map):
+    """
+    Copy text columns into their binary twins in keyset-ordered batches.
+    Only rows whose binary columns are still NULL are touched and every
+    batch commits on its own, so an interrupted run resumes where it stopped.
+    """
+    text_fields = list(field_map)
+    binary_fields = list(field_map.values())
+    pending = model.objects.filter(**{f"{binary_fields[0]}__isnull": True})
+
+    last_pk = None
+    while True:
+        qs = pending.order_by("pk")
+        if last_pk is not None:
+            qs = qs.filter(pk__gt=last_pk)
+        rows = list(qs.values("pk", *text_fields)[:BATCH_SIZE])
+        if not rows:
+            break
+
+        objs = []
+        for row in rows:
+            obj = model(pk=row["pk"])
+            for text_field, binary_field in field_map.items():
+                setattr(obj, binary_field, _legacy_text_to_bytes(row[text_field]))
+            objs.append(obj)
+
+        with transaction.atomic():
+            model.objects.bulk_update(objs, binary_fields)
+        last_pk = rows[-1]["pk"]
+
+
+def forwards(apps, schema_editor):
+    Message = apps.get_model('chat', 'Message')
+    _backfill(Message, {'ciphertext': 'ciphertext_bin'})
+
+
+class Migration(migrations.Migration):
+    # Each batch commits separately; rerunning `migrate` resumes from the
+    # first row whose ciphertext_bin is still NULL.
+    atomic = False
+
+    dependencies = [
+        ('chat', '0003_message_ciphertext_bin'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.9 on 2026-10-19 11:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0004_backfill_ciphertext_bin'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='message',
+            name='ciphertext',
+        ),
+        migrations.RenameField(
+            model_name='message',
+            old_name='ciphertext_bin',
+            new_name='ciphertext',
+        ),
+        migrations.AlterField(
+            model_name='message',
+            name='ciphertext',
+            field=models.BinaryField(),
+        ),
+    ]
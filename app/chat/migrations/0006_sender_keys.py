@@ -0,0 +1,34 @@
+# Generated by Django 5.2.9 on 2026-10-19 12:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0005_message_ciphertext_binary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='message',
+            name='sender_key_id',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='SenderKeyEnvelope',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sender_id', models.CharField(max_length=100)),
+                ('key_id', models.PositiveIntegerField()),
+                ('recipient_id', models.CharField(max_length=100)),
+                ('envelope', models.BinaryField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('conversation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sender_keys', to='chat.conversation')),
+            ],
+            options={
+                'unique_together': {('conversation', 'recipient_id', 'sender_id', 'key_id')},
+            },
+        ),
+    ]
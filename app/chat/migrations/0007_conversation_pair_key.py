@@ -0,0 +1,49 @@
+# Generated by Django 5.2.9 on 2026-10-19 14:00
+
+from django.db import migrations, models
+
+
+def backfill_pair_key(apps, schema_editor):
+    """
+    Existing 1-1 conversations with exactly two members get their pair key.
+    Where duplicates already piled up, only the oldest one is keyed (the
+    rest keep working by id, they just stop being the "open chat" target).
+    """
+    Conversation = apps.get_model("chat", "Conversation")
+    ConversationMember = apps.get_model("chat", "ConversationMember")
+
+    members = {}
+    for conv_id, user_id in (
+        ConversationMember.objects.filter(conversation__is_group=False)
+        .values_list("conversation_id", "user_id")
+        .iterator()
+    ):
+        members.setdefault(conv_id, []).append(str(user_id))
+
+    seen = set()
+    for conv in Conversation.objects.filter(is_group=False).order_by("created_at").only("id").iterator():
+        ids = members.get(conv.id, [])
+        if len(ids) != 2 or ids[0] == ids[1]:
+            continue
+        u1, u2 = sorted(ids)
+        key = f"{u1}:{u2}"
+        if key in seen:
+            continue
+        seen.add(key)
+        Conversation.objects.filter(id=conv.id).update(pair_key=key)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0006_sender_keys'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='pair_key',
+            field=models.CharField(blank=True, max_length=201, null=True, unique=True),
+        ),
+        migrations.RunPython(backfill_pair_key, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.9 on 2026-10-19 15:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0007_conversation_pair_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchiveSegment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('chat', 'Chat message'), ('dm', 'E2EE DM message')], max_length=10)),
+                ('conversation_id', models.UUIDField()),
+                ('first_ts', models.DateTimeField()),
+                ('last_ts', models.DateTimeField()),
+                ('message_count', models.PositiveIntegerField()),
+                ('size_bytes', models.BigIntegerField()),
+                ('path', models.CharField(max_length=500)),
+                ('frames', models.JSONField(default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['kind', 'conversation_id', '-last_ts'], name='chat_archive_conv_idx')],
+            },
+        ),
+    ]
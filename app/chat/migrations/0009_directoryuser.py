@@ -0,0 +1,23 @@
+# Generated by Django 5.2.9 on 2026-10-19 16:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0008_archivesegment'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DirectoryUser',
+            fields=[
+                ('user_id', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('username', models.CharField(max_length=150)),
+                ('username_normalized', models.CharField(db_index=True, max_length=150)),
+                ('avatar', models.URLField(blank=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
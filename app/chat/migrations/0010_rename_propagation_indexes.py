@@ -0,0 +1,26 @@
+# Generated by Django 5.2.9 on 2026-10-19 17:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0009_directoryuser'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='conversation',
+            name='created_by_id',
+            field=models.CharField(blank=True, db_index=True, max_length=100, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='conversationmember',
+            index=models.Index(fields=['user_id', 'id'], name='chat_member_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['sender_id', 'id'], name='chat_msg_sender_idx'),
+        ),
+    ]
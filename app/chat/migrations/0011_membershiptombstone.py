@@ -0,0 +1,26 @@
+# Generated by Django 5.2.9 on 2026-10-19 18:00
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0010_rename_propagation_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MembershipTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('conversation_id', models.UUIDField()),
+                ('user_id', models.CharField(max_length=100)),
+                ('removed_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user_id', 'removed_at'], name='chat_tombstone_user_idx')],
+            },
+        ),
+    ]
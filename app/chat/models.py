@@ -7,9 +7,15 @@ class Conversation(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     is_group = models.BooleanField(default=False)
     name = models.CharField(max_length=255, blank=True, null=True)
-    created_by_id = models.CharField(max_length=100, blank=True, null=True)  # auth server user id
+    created_by_id = models.CharField(max_length=100, blank=True, null=True, db_index=True)  # auth server user id
     created_by_username = models.CharField(max_length=150, blank=True, null=True)
+    # 1-1 only: canonical "<id>:<id>" of the two members (NULL for groups) –
+    # one conversation per pair, looked up through chat.pairs
+    pair_key = models.CharField(max_length=201, blank=True, null=True, unique=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # bumped on membership changes – drives /chat/sync/ deltas (read state
+    # rides on the member row's own updated_at)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return f"{'Group' if self.is_group else 'DM'} - {self.id}"
@@ -27,14 +33,41 @@ class ConversationMember(models.Model):
     username = models.CharField(max_length=150)
     joined_at = models.DateTimeField(auto_now_add=True)
     is_admin = models.BooleanField(default=False)
+    # read watermark: everything up to this timestamp has been read
+    last_read_at = models.DateTimeField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         unique_together = ('conversation', 'user_id')
+        indexes = [
+            # rename propagation walks a user's memberships (chat/renames.py)
+            models.Index(fields=['user_id', 'id'], name='chat_member_user_idx'),
+        ]
 
     def __str__(self):
         return f"{self.username} in {self.conversation.id}"
 
 
+class MembershipTombstone(models.Model):
+    """
+    A user left / was removed from a conversation (written by
+    chat/signals.py on every member-row delete). /chat/sync/ reports these
+    as `removed_conversations` so clients drop the conversation.
+    No FK: the conversation itself may be gone.
+    """
+    conversation_id = models.UUIDField()
+    user_id = models.CharField(max_length=100)
+    removed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user_id', 'removed_at'], name='chat_tombstone_user_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} left {self.conversation_id}"
+
+
 class Message(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     conversation = models.ForeignKey(
@@ -44,7 +77,9 @@ class Message(models.Model):
     )
     sender_id = models.CharField(max_length=100)
     sender_username = models.CharField(max_length=150)
-    ciphertext = models.TextField()  # Encrypted payload
+    ciphertext = models.BinaryField()  # Encrypted payload (raw bytes, base64 on the JSON wire)
+    # group E2EE: which of the sender's sender keys encrypted this message
+    sender_key_id = models.PositiveIntegerField(blank=True, null=True)
     metadata = models.JSONField(blank=True, null=True)
     timestamp = models.DateTimeField(default=timezone.now)
     delivered_to = models.JSONField(default=list, blank=True)
@@ -52,6 +87,80 @@ class Message(models.Model):
 
     class Meta:
         ordering = ['timestamp']
+        indexes = [
+            models.Index(fields=['conversation', 'timestamp'], name='chat_msg_conv_ts_idx'),
+            models.Index(fields=['sender_id', 'id'], name='chat_msg_sender_idx'),
+        ]
 
     def __str__(self):
         return f"Message {self.id} by {self.sender_username} in {self.conversation_id}"
+
+
+class SenderKeyEnvelope(models.Model):
+    """
+    A member's group sender key, encrypted once for one recipient.
+
+    Uploaded only when the sender rotates its key (or a member joins), so
+    each group message is encrypted and stored once regardless of group
+    size – the message just names its `sender_key_id`.
+    """
+    conversation = models.ForeignKey(
+        Conversation,
+        on_delete=models.CASCADE,
+        related_name='sender_keys'
+    )
+    sender_id = models.CharField(max_length=100)
+    key_id = models.PositiveIntegerField()
+    recipient_id = models.CharField(max_length=100)
+    envelope = models.BinaryField()  # sender key sealed to the recipient's identity key
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('conversation', 'recipient_id', 'sender_id', 'key_id')
+
+    def __str__(self):
+        return f"SenderKey {self.sender_id}#{self.key_id} -> {self.recipient_id} in {self.conversation_id}"
+
+
+class ArchiveSegment(models.Model):
+    """
+    One compressed NDJSON segment of archived history (see chat/archive.py).
+    `frames` is the sparse index: [[first_ts_iso, offset, length, count], ...]
+    """
+    KIND_CHOICES = [
+        ('chat', 'Chat message'),
+        ('dm', 'E2EE DM message'),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    conversation_id = models.UUIDField()
+    first_ts = models.DateTimeField()
+    last_ts = models.DateTimeField()
+    message_count = models.PositiveIntegerField()
+    size_bytes = models.BigIntegerField()
+    path = models.CharField(max_length=500)
+    frames = models.JSONField(default=list)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['kind', 'conversation_id', '-last_ts'], name='chat_archive_conv_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} segment {self.conversation_id} {self.first_ts:%Y-%m-%d}..{self.last_ts:%Y-%m-%d}"
+
+
+class DirectoryUser(models.Model):
+    """
+    Chat's read replica of the accounts user directory, fed by the
+    directory:users stream (see chat/directory.py). Never written by views.
+    """
+    user_id = models.CharField(max_length=64, primary_key=True)
+    username = models.CharField(max_length=150)
+    username_normalized = models.CharField(max_length=150, db_index=True)
+    avatar = models.URLField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.username} ({self.user_id})"
@@ -0,0 +1,247 @@
+import asyncio
+import os
+import socket
+import time
+import weakref
+from collections import deque
+
+from django.conf import settings
+
+
+WS_QUEUE_SIZE = getattr(settings, 'CHAT_WS_QUEUE_SIZE', 256)
+WS_COALESCE_MAX_EVENTS = getattr(settings, 'CHAT_WS_COALESCE_MAX_EVENTS', 100)
+WS_EPHEMERAL_TYPES = frozenset(getattr(settings, 'CHAT_WS_EPHEMERAL_TYPES', ['typing', 'presence']))
+WS_COALESCE_TYPES = frozenset(getattr(settings, 'CHAT_WS_COALESCE_TYPES', ['message', 'e2ee_message']))
+# what to do once ephemeral drops + coalescing can't make room:
+#   "disconnect"  – close the socket with a resume hint (client resumes via eventId)
+#   "drop_oldest" – drop the oldest queued frame and keep going
+WS_OVERFLOW_POLICY = getattr(settings, 'CHAT_WS_OVERFLOW_POLICY', 'disconnect')
+# opt-in multi-event frames (?batch=1): collect for up to WINDOW_MS or MAX_EVENTS
+WS_BATCH_WINDOW_MS = getattr(settings, 'CHAT_WS_BATCH_WINDOW_MS', 5)
+WS_BATCH_MAX_WINDOW_MS = getattr(settings, 'CHAT_WS_BATCH_MAX_WINDOW_MS', 50)
+WS_BATCH_MAX_EVENTS = getattr(settings, 'CHAT_WS_BATCH_MAX_EVENTS', 50)
+WS_STATS_FLUSH_INTERVAL = getattr(settings, 'CHAT_WS_STATS_FLUSH_INTERVAL', 10)
+WS_STATS_TTL = 120
+
+SLOW_CONSUMER_CLOSE_CODE = 4008
+BATCH_TYPE = 'batch'
+
+NODE_ID = f"{socket.gethostname()}:{os.getpid()}"
+STATS_KEY_PREFIX = 'ws:stats:'
+
+
+# --------------------------------------------------------------------
+# Per-node counters (this worker process)
+# --------------------------------------------------------------------
+class NodeStats:
+    COUNTERS = (
+        'enqueued',
+        'sent',
+        'dropped_ephemeral',
+        'dropped_overflow',
+        'coalesced',
+        'slow_disconnects',
+    )
+
+    def __init__(self):
+        self.counters = dict.fromkeys(self.COUNTERS, 0)
+        self.queues = weakref.WeakSet()
+        self._last_flush = 0.0
+
+    def incr(self, name, amount=1):
+        self.counters[name] += amount
+
+    def snapshot(self):
+        depths = [len(q) for q in list(self.queues)]
+        return {
+            **self.counters,
+            'connections': len(depths),
+            'queue_depth': sum(depths),
+            'max_queue_depth': max(depths, default=0),
+            'updated_at': int(time.time()),
+        }
+
+    def flush_due(self):
+        return time.monotonic() - self._last_flush >= WS_STATS_FLUSH_INTERVAL
+
+    def flush(self):
+        """Publish the snapshot to Redis so `manage.py ws_stats` can read every node."""
+        from common.redis_service import redis_client
+
+        self._last_flush = time.monotonic()
+        key = f"{STATS_KEY_PREFIX}{NODE_ID}"
+        pipe = redis_client.pipeline()
+        pipe.hset(key, mapping=self.snapshot())
+        pipe.expire(key, WS_STATS_TTL)
+        pipe.execute()
+
+
+node_stats = NodeStats()
+
+
+def read_node_stats():
+    """{node_id: {counter: int}} for every node that flushed recently."""
+    from common.redis_service import redis_client
+
+    result = {}
+    for key in redis_client.scan_iter(match=f"{STATS_KEY_PREFIX}*"):
+        values = redis_client.hgetall(key)
+        if values:
+            result[key[len(STATS_KEY_PREFIX):]] = {k: int(v) for k, v in values.items()}
+    return result
+
+
+# --------------------------------------------------------------------
+# Bounded per-connection outbound queue
+# --------------------------------------------------------------------
+class OutboundQueue:
+    """
+    Bounded FIFO of frames waiting to be written to one WebSocket.
+
+    When full, load is shed in this order: ephemeral events are dropped,
+    runs of message events are coalesced into `batch` frames, then the
+    overflow policy applies. `put()` returns False when the consumer
+    should be disconnected.
+    """
+
+    def __init__(self, max_size=WS_QUEUE_SIZE, policy=WS_OVERFLOW_POLICY, stats=node_stats):
+        self.max_size = max_size
+        self.policy = policy
+        self.stats = stats
+        self._items = deque()
+        self._ready = asyncio.Event()
+        stats.queues.add(self)
+
+    def __len__(self):
+        return len(self._items)
+
+    def put(self, data):
+        if len(self._items) >= self.max_size and not self._make_room(data):
+            if data.get('type') in WS_EPHEMERAL_TYPES:
+                self.stats.incr('dropped_ephemeral')
+                return True
+            if self.policy != 'drop_oldest':
+                return False
+            self._items.popleft()
+            self.stats.incr('dropped_overflow')
+
+        self._items.append(data)
+        self.stats.incr('enqueued')
+        self._ready.set()
+        return True
+
+    async def get(self):
+        while not self._items:
+            self._ready.clear()
+            await self._ready.wait()
+        self.stats.incr('sent')
+        return self._items.popleft()
+
+    async def get_batch(self, max_events, window):
+        """
+        Wait for the first frame, then keep collecting until `window`
+        seconds pass or `max_events` events are gathered. Coalesced batch
+        frames are flattened so the result is a plain, ordered event list.
+        """
+        loop = asyncio.get_running_loop()
+        events = _events(await self.get())
+        deadline = loop.time() + window
+
+        while len(events) < max_events:
+            if not self._items:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                self._ready.clear()
+                try:
+                    await asyncio.wait_for(self._ready.wait(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                continue
+            self.stats.incr('sent')
+            events.extend(_events(self._items.popleft()))
+
+        return events
+
+    def clear(self):
+        self._items.clear()
+
+    # ---------- shedding ----------
+    def _make_room(self, incoming):
+        if incoming.get('type') in WS_EPHEMERAL_TYPES:
+            return False
+
+        for i, item in enumerate(self._items):
+            if item.get('type') in WS_EPHEMERAL_TYPES:
+                del self._items[i]
+                self.stats.incr('dropped_ephemeral')
+                return True
+
+        self._coalesce()
+        return len(self._items) < self.max_size
+
+    def _coalesce(self):
+        merged = deque()
+        for item in self._items:
+            prev = merged[-1] if merged else None
+            if (
+                prev is not None
+                and _coalescible(prev)
+                and _coalescible(item)
+                and _event_count(prev) + _event_count(item) <= WS_COALESCE_MAX_EVENTS
+            ):
+                merged[-1] = {'type': BATCH_TYPE, 'events': _events(prev) + _events(item)}
+                self.stats.incr('coalesced')
+            else:
+                merged.append(item)
+        self._items = merged
+
+
+def _coalescible(item):
+    return item.get('type') in WS_COALESCE_TYPES or item.get('type') == BATCH_TYPE
+
+
+def _events(item):
+    return list(item['events']) if item.get('type') == BATCH_TYPE else [item]
+
+
+def _event_count(item):
+    return len(item['events']) if item.get('type') == BATCH_TYPE else 1
+
+
+def batch_options(query):
+    """
+    Parse the connect-time batching opt-in:
+    ?batch=1[&batchMs=<window>][&batchMax=<events>]
+    Returns (window_seconds, max_events) or None when batching is off.
+    """
+    if query.get('batch', ['0'])[0] not in ('1', 'true'):
+        return None
+
+    try:
+        window_ms = int(query.get('batchMs', [WS_BATCH_WINDOW_MS])[0])
+    except ValueError:
+        window_ms = WS_BATCH_WINDOW_MS
+    try:
+        max_events = int(query.get('batchMax', [WS_BATCH_MAX_EVENTS])[0])
+    except ValueError:
+        max_events = WS_BATCH_MAX_EVENTS
+
+    window_ms = max(0, min(window_ms, WS_BATCH_MAX_WINDOW_MS))
+    max_events = max(1, min(max_events, WS_BATCH_MAX_EVENTS))
+    return window_ms / 1000.0, max_events
+
+
+def last_event_id(frame):
+    """eventId of the newest event inside a (possibly batched) frame."""
+    if isinstance(frame, list):
+        for event in reversed(frame):
+            if event.get('eventId'):
+                return event['eventId']
+        return None
+    if frame.get('type') == BATCH_TYPE:
+        for event in reversed(frame['events']):
+            if event.get('eventId'):
+                return event['eventId']
+        return None
+    return frame.get('eventId')
@@ -0,0 +1,39 @@
+"""
+Pair-keyed lookup for 1-1 conversations (chat Conversation and E2EE DMs).
+
+Both models carry an indexed, unique canonical `pair_key` column; a Redis
+hash per model maps pair_key -> conversation id in front of it, so
+"open chat with X" is one HGET on the hot path.
+"""
+from common.redis_service import redis_client
+
+
+CHAT_PAIRS = "chat:pairs"
+DM_PAIRS = "dm:pairs"
+
+
+def pair_key(a, b):
+    """Order-independent key for two user ids."""
+    u1, u2 = sorted([str(a), str(b)])
+    return f"{u1}:{u2}"
+
+
+def cached_pair(hash_name, key):
+    try:
+        return redis_client.hget(hash_name, key)
+    except Exception:
+        return None
+
+
+def cache_pair(hash_name, key, conv_id):
+    try:
+        redis_client.hset(hash_name, key, str(conv_id))
+    except Exception:
+        pass
+
+
+def forget_pair(hash_name, key):
+    try:
+        redis_client.hdel(hash_name, key)
+    except Exception:
+        pass
@@ -0,0 +1,182 @@
+"""
+Username-change propagation to chat's denormalized name copies.
+
+ConversationMember.username, Conversation.created_by_username and the
+message store's sender_username are copied at write time. A `user.renamed`
+entry on the directory feed queues the new name here (one hash field per
+user, so back-to-back renames collapse); `sync_user_directory` then drains
+the queue in keyset batches of CHAT_RENAME_BATCH_SIZE rows, paced to
+CHAT_RENAME_ROWS_PER_SECOND, and records per-target progress so an
+interrupted run resumes instead of rescanning.
+
+Until a rename has fully propagated – and forever for archived segments,
+which are immutable – read paths overlay the current name from the
+directory replica (current_sender_names).
+"""
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from common.codecs import version_etag
+from common.redis_service import redis_client
+from common.user_directory import USER_RENAMED
+from .directory import display_names
+from .message_store import get_message_store
+from .models import Conversation, ConversationMember
+
+
+PENDING_HASH = "chat:renames:pending"    # user_id -> new username
+PROGRESS_HASH = "chat:renames:progress"  # "<user_id>|<target>" -> keyset position / "done"
+RENAME_BATCH_SIZE = getattr(settings, 'CHAT_RENAME_BATCH_SIZE', 500)
+RENAME_ROWS_PER_SECOND = getattr(settings, 'CHAT_RENAME_ROWS_PER_SECOND', 5000)
+
+DONE = "done"
+
+# compare-and-delete: a newer rename queued mid-run keeps its entry
+_FINISH = redis_client.register_script("""
+if redis.call('HGET', KEYS[1], ARGV[1]) == ARGV[2] then
+    redis.call('HDEL', KEYS[1], ARGV[1])
+    return 1
+end
+return 0
+""")
+
+
+def _progress_field(user_id, target):
+    return f"{user_id}|{target}"
+
+
+def queue_renames(changes):
+    """Queue every user.renamed entry of a directory-feed batch."""
+    renames = {
+        event['id']: event.get('username', '')
+        for _, event in changes
+        if event.get('type') == USER_RENAMED and event.get('id')
+    }
+    if not renames:
+        return 0
+    pipe = redis_client.pipeline()
+    pipe.hset(PENDING_HASH, mapping=renames)
+    # a new name restarts every target for that user
+    pipe.hdel(PROGRESS_HASH, *[_progress_field(uid, t) for uid in renames for t in TARGETS])
+    pipe.execute()
+    return len(renames)
+
+
+# --------------------------------------------------------------------
+# Targets – each renames one keyset batch and returns (rows, next_after)
+# --------------------------------------------------------------------
+def _rename_members(user_id, username, limit, after):
+    qs = ConversationMember.objects.filter(user_id=user_id)
+    if after:
+        qs = qs.filter(id__gt=int(after))
+    rows = list(qs.order_by('id').values_list('id', 'conversation_id')[:limit])
+    if not rows:
+        return 0, None
+    now = timezone.now()
+    with transaction.atomic():
+        updated = (
+            ConversationMember.objects.filter(id__in=[pk for pk, _ in rows])
+            .exclude(username=username)
+            .update(username=username, updated_at=now)
+        )
+        if updated:
+            # member lists ride along in /chat/sync/ deltas
+            Conversation.objects.filter(id__in={cid for _, cid in rows}).update(updated_at=now)
+    return updated, (str(rows[-1][0]) if len(rows) == limit else None)
+
+
+def _rename_created_by(user_id, username, limit, after):
+    qs = Conversation.objects.filter(created_by_id=user_id)
+    if after:
+        qs = qs.filter(id__gt=after)
+    ids = list(qs.order_by('id').values_list('id', flat=True)[:limit])
+    if not ids:
+        return 0, None
+    updated = (
+        Conversation.objects.filter(id__in=ids)
+        .exclude(created_by_username=username)
+        .update(created_by_username=username)
+    )
+    return updated, (str(ids[-1]) if len(ids) == limit else None)
+
+
+def _rename_messages(user_id, username, limit, after):
+    return get_message_store().rename_sender(user_id, username, limit, after)
+
+
+TARGETS = {
+    'members': _rename_members,
+    'created_by': _rename_created_by,
+    'messages': _rename_messages,
+}
+
+
+# --------------------------------------------------------------------
+# Worker
+# --------------------------------------------------------------------
+class _Pacer:
+    """Sleeps just enough to keep the running average under `rate` rows/s."""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.started = time.monotonic()
+        self.rows = 0
+
+    def tick(self, rows):
+        self.rows += rows
+        if not self.rate:
+            return
+        ahead = self.rows / self.rate - (time.monotonic() - self.started)
+        if ahead > 0:
+            time.sleep(ahead)
+
+
+def propagate_renames(max_rows=None, batch_size=None, rows_per_second=None):
+    """
+    Drain queued renames. Stops early once `max_rows` rows were rewritten
+    so the caller's loop stays responsive; progress is kept in Redis.
+    Returns the number of rows rewritten.
+    """
+    batch_size = batch_size or RENAME_BATCH_SIZE
+    pacer = _Pacer(RENAME_ROWS_PER_SECOND if rows_per_second is None else rows_per_second)
+    total = 0
+
+    for user_id, username in redis_client.hgetall(PENDING_HASH).items():
+        for target, rename in TARGETS.items():
+            field = _progress_field(user_id, target)
+            after = redis_client.hget(PROGRESS_HASH, field)
+            while after != DONE:
+                if max_rows is not None and total >= max_rows:
+                    return total
+                updated, after = rename(user_id, username, batch_size, after)
+                after = after or DONE
+                redis_client.hset(PROGRESS_HASH, field, after)
+                total += updated
+                pacer.tick(updated)
+
+        if _FINISH(keys=[PENDING_HASH], args=[user_id, username]):
+            redis_client.hdel(PROGRESS_HASH, *[_progress_field(user_id, t) for t in TARGETS])
+    return total
+
+
+def pending_renames():
+    return redis_client.hlen(PENDING_HASH)
+
+
+# --------------------------------------------------------------------
+# Read-time overlay
+# --------------------------------------------------------------------
+def names_version(user_ids):
+    """Version of the names current_sender_names would overlay for these users."""
+    return version_etag(*sorted(display_names(user_ids).items()))
+
+
+def current_sender_names(messages):
+    """Swap in current usernames (schema Structs, mutated in place)."""
+    names = display_names({m.sender_id for m in messages})
+    for m in messages:
+        m.sender_username = names.get(m.sender_id, m.sender_username)
+    return messages
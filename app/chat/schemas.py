@@ -0,0 +1,228 @@
+"""Typed request / response payloads for the chat API (msgspec Structs)"""
+from typing import Any, Optional, Union
+
+import msgspec
+
+from common.codecs import Base64Bytes
+
+
+# --------------------------------------------------------------------
+# Requests
+# --------------------------------------------------------------------
+class Participant(msgspec.Struct):
+    id: Union[str, int, None] = None
+    user_id: Union[str, int, None] = None
+    username: Optional[str] = None
+
+
+# participants / members may be {"id", "username"} objects or bare ids/usernames
+ParticipantRef = Union[str, int, Participant]
+
+
+class CreateConversationRequest(msgspec.Struct):
+    participants: list[ParticipantRef] = msgspec.field(default_factory=list)
+    is_group: bool = False
+    name: Optional[str] = None
+
+
+class CreateGroupRequest(msgspec.Struct):
+    name: Optional[str] = None
+    members: list[ParticipantRef] = msgspec.field(default_factory=list)
+
+
+class AddMembersRequest(msgspec.Struct):
+    members: list[ParticipantRef] = msgspec.field(default_factory=list)
+
+
+class SendMessageRequest(msgspec.Struct):
+    # base64 text in JSON bodies, raw bin in MessagePack / CBOR
+    ciphertext: Base64Bytes = b''
+    metadata: Optional[dict[str, Any]] = None
+    # group E2EE: id of the sender key the ciphertext was encrypted with
+    sender_key_id: Optional[int] = None
+
+
+class SenderKeyEnvelopeIn(msgspec.Struct):
+    recipient_id: Union[str, int]
+    envelope: Base64Bytes
+
+
+class UploadSenderKeyRequest(msgspec.Struct):
+    key_id: int
+    envelopes: list[SenderKeyEnvelopeIn] = msgspec.field(default_factory=list)
+
+
+class SenderKeyRef(msgspec.Struct):
+    sender_id: Union[str, int]
+    key_id: int
+
+
+class FetchSenderKeysRequest(msgspec.Struct):
+    # empty -> latest key of every sender in the conversation
+    keys: list[SenderKeyRef] = msgspec.field(default_factory=list)
+
+
+def participant_ref(p):
+    """(id, username) from a ParticipantRef; either may be None."""
+    if isinstance(p, Participant):
+        pid = p.id if p.id is not None else p.user_id
+        return (str(pid) if pid is not None else None), p.username
+    return str(p), str(p)
+
+
+# --------------------------------------------------------------------
+# Responses / events
+# --------------------------------------------------------------------
+class MessageOut(msgspec.Struct):
+    id: str
+    sender_id: str
+    sender_username: str
+    ciphertext: bytes
+    metadata: Optional[dict[str, Any]]
+    timestamp: str
+    sender_key_id: Optional[int] = None
+
+    @classmethod
+    def from_model(cls, m):
+        return cls(
+            id=str(m.id),
+            sender_id=m.sender_id,
+            sender_username=m.sender_username,
+            ciphertext=bytes(m.ciphertext),
+            metadata=m.metadata,
+            timestamp=m.timestamp.isoformat(),
+            sender_key_id=m.sender_key_id,
+        )
+
+
+class MessageEvent(msgspec.Struct, kw_only=True):
+    """WS payload for a new chat message (frontend data.type === "message")."""
+    type: str = 'message'
+    conversationId: str
+    id: str
+    sender_id: str
+    sender_username: str
+    ciphertext: bytes
+    sender_key_id: Optional[int] = None
+    metadata: dict[str, Any]
+    timestamp: str
+    status: str = 'sent'
+
+    @classmethod
+    def from_model(cls, m):
+        return cls(
+            conversationId=str(m.conversation_id),
+            id=str(m.id),
+            sender_id=m.sender_id,
+            sender_username=m.sender_username,
+            ciphertext=bytes(m.ciphertext),
+            sender_key_id=m.sender_key_id,
+            metadata=m.metadata or {},
+            timestamp=m.timestamp.isoformat(),
+        )
+
+
+class ConversationOut(msgspec.Struct):
+    id: str
+    is_group: bool
+    name: Optional[str]
+    created_at: str
+
+    @classmethod
+    def from_model(cls, c):
+        return cls(
+            id=str(c.id),
+            is_group=c.is_group,
+            name=c.name,
+            created_at=c.created_at.isoformat(),
+        )
+
+
+class ConversationCreatedEvent(msgspec.Struct, kw_only=True):
+    type: str = 'conversation_created'
+    conversation: ConversationOut
+
+
+class MemberOut(msgspec.Struct):
+    username: str
+    user_id: str
+    is_admin: bool
+
+    @classmethod
+    def from_model(cls, m):
+        return cls(username=m.username, user_id=m.user_id, is_admin=m.is_admin)
+
+
+class SyncConversationOut(msgspec.Struct):
+    """ConversationOut + full member list (membership changes ride along)."""
+    id: str
+    is_group: bool
+    name: Optional[str]
+    created_at: str
+    updated_at: str
+    members: list[MemberOut]
+
+    @classmethod
+    def from_model(cls, c):
+        return cls(
+            id=str(c.id),
+            is_group=c.is_group,
+            name=c.name,
+            created_at=c.created_at.isoformat(),
+            updated_at=c.updated_at.isoformat(),
+            members=[MemberOut.from_model(m) for m in c.members.all()],
+        )
+
+
+class MessagePage(msgspec.Struct):
+    messages: list[MessageOut]
+    has_more: bool
+
+
+class SenderKeyEnvelopeOut(msgspec.Struct):
+    sender_id: str
+    key_id: int
+    envelope: bytes
+
+    @classmethod
+    def from_model(cls, e):
+        return cls(sender_id=e.sender_id, key_id=e.key_id, envelope=bytes(e.envelope))
+
+
+class SenderKeyEvent(msgspec.Struct, kw_only=True):
+    """Pushed to one recipient with its own envelope when a sender rotates."""
+    type: str = 'sender_key'
+    conversationId: str
+    sender_id: str
+    key_id: int
+    envelope: bytes
+
+    @classmethod
+    def from_model(cls, e):
+        return cls(
+            conversationId=str(e.conversation_id),
+            sender_id=e.sender_id,
+            key_id=e.key_id,
+            envelope=bytes(e.envelope),
+        )
+
+
+class SenderKeysStaleEvent(msgspec.Struct, kw_only=True):
+    """Membership shrank – every sender must rotate before sending again."""
+    type: str = 'sender_keys_stale'
+    conversationId: str
+    removed_user_id: str
+
+
+class ReadWatermarkOut(msgspec.Struct):
+    conversation_id: str
+    user_id: str
+    last_read_at: str
+
+    @classmethod
+    def from_model(cls, m):
+        return cls(
+            conversation_id=str(m.conversation_id),
+            user_id=m.user_id,
+            last_read_at=m.last_read_at.isoformat(),
+        )
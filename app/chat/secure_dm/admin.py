@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import E2EEIdentity, DMConversation, DMMessage
+from .models import E2EEIdentity, DMConversation, DMMessage, OneTimePreKey, SignedPreKey
 
 
 @admin.register(E2EEIdentity)
@@ -8,6 +8,18 @@ class E2EEIdentityAdmin(admin.ModelAdmin):
     search_fields = ("user_id",)
 
 
+@admin.register(SignedPreKey)
+class SignedPreKeyAdmin(admin.ModelAdmin):
+    list_display = ("user_id", "key_id", "created_at")
+    search_fields = ("user_id",)
+
+
+@admin.register(OneTimePreKey)
+class OneTimePreKeyAdmin(admin.ModelAdmin):
+    list_display = ("user_id", "key_id", "created_at")
+    search_fields = ("user_id",)
+
+
 @admin.register(DMConversation)
 class DMConversationAdmin(admin.ModelAdmin):
     list_display = ("id", "user1_id", "user2_id", "created_at")
@@ -3,4 +3,5 @@ from django.apps import AppConfig
 
 class SecureDmConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
-    name = "app.secure_dm"
+    name = "chat.secure_dm"
+    label = "secure_dm"
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.9 on 2026-10-19 10:00
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('secure_dm', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dmconversation',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='dmmessage',
+            index=models.Index(fields=['conversation', 'timestamp'], name='dm_msg_conv_ts_idx'),
+        ),
+    ]
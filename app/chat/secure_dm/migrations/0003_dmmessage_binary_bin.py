@@ -0,0 +1,23 @@
+# Generated by Django 5.2.9 on 2026-10-19 11:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('secure_dm', '0002_sync_columns'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dmmessage',
+            name='nonce_bin',
+            field=models.BinaryField(null=True),
+        ),
+        migrations.AddField(
+            model_name='dmmessage',
+            name='ciphertext_bin',
+            field=models.BinaryField(null=True),
+        ),
+    ]
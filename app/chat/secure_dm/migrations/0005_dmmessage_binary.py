@@ -0,0 +1,41 @@
+# Generated by Django 5.2.9 on 2026-10-19 11:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('secure_dm', '0004_backfill_dmmessage_binary'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='dmmessage',
+            name='nonce',
+        ),
+        migrations.RemoveField(
+            model_name='dmmessage',
+            name='ciphertext',
+        ),
+        migrations.RenameField(
+            model_name='dmmessage',
+            old_name='nonce_bin',
+            new_name='nonce',
+        ),
+        migrations.RenameField(
+            model_name='dmmessage',
+            old_name='ciphertext_bin',
+            new_name='ciphertext',
+        ),
+        migrations.AlterField(
+            model_name='dmmessage',
+            name='nonce',
+            field=models.BinaryField(),
+        ),
+        migrations.AlterField(
+            model_name='dmmessage',
+            name='ciphertext',
+            field=models.BinaryField(),
+        ),
+    ]
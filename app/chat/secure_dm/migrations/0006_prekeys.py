@@ -0,0 +1,42 @@
+# Generated by Django 5.2.9 on 2026-10-19 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('secure_dm', '0005_dmmessage_binary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SignedPreKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_id', models.CharField(max_length=100)),
+                ('key_id', models.PositiveIntegerField()),
+                ('public_key', models.BinaryField()),
+                ('signature', models.BinaryField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user_id', '-created_at'], name='dm_spk_user_created_idx')],
+                'unique_together': {('user_id', 'key_id')},
+            },
+        ),
+        migrations.CreateModel(
+            name='OneTimePreKey',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('user_id', models.CharField(max_length=100)),
+                ('key_id', models.PositiveIntegerField()),
+                ('public_key', models.BinaryField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user_id', 'id'], name='dm_otpk_user_id_idx')],
+                'unique_together': {('user_id', 'key_id')},
+            },
+        ),
+    ]
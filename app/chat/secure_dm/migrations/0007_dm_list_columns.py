@@ -0,0 +1,57 @@
+# Generated by Django 5.2.9 on 2026-10-19 13:00
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_last_message(apps, schema_editor):
+    DMConversation = apps.get_model("secure_dm", "DMConversation")
+    DMMessage = apps.get_model("secure_dm", "DMMessage")
+
+    latest = DMMessage.objects.filter(conversation=OuterRef("pk")).order_by("-timestamp")
+    DMConversation.objects.update(
+        last_message_id=Subquery(latest.values("id")[:1]),
+        last_activity_at=Coalesce(Subquery(latest.values("timestamp")[:1]), "created_at"),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('secure_dm', '0006_prekeys'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dmconversation',
+            name='last_message',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='secure_dm.dmmessage'),
+        ),
+        migrations.AddField(
+            model_name='dmconversation',
+            name='last_activity_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='dmconversation',
+            name='user1_unread',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='dmconversation',
+            name='user2_unread',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_last_message, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='dmconversation',
+            index=models.Index(fields=['user1_id', '-last_activity_at', '-id'], name='dm_conv_u1_activity_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dmconversation',
+            index=models.Index(fields=['user2_id', '-last_activity_at', '-id'], name='dm_conv_u2_activity_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.9 on 2026-10-19 14:00
+
+from django.db import migrations, models
+from django.db.models import Value
+from django.db.models.functions import Concat
+
+
+def backfill_pair_key(apps, schema_editor):
+    DMConversation = apps.get_model("secure_dm", "DMConversation")
+    # user1_id < user2_id already (sorted on create)
+    DMConversation.objects.update(pair_key=Concat("user1_id", Value(":"), "user2_id"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('secure_dm', '0007_dm_list_columns'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dmconversation',
+            name='pair_key',
+            field=models.CharField(blank=True, max_length=201, null=True),
+        ),
+        migrations.RunPython(backfill_pair_key, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='dmconversation',
+            name='pair_key',
+            field=models.CharField(max_length=201, unique=True),
+        ),
+    ]
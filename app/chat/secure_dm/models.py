@@ -2,6 +2,8 @@ import uuid
 from django.db import models
 from django.utils import timezone
 
+from chat.pairs import pair_key
+
 
 class E2EEIdentity(models.Model):
     """
@@ -16,6 +18,47 @@ class E2EEIdentity(models.Model):
         return f"E2EEIdentity({self.user_id})"
 
 
+class SignedPreKey(models.Model):
+    """
+    Medium-term signed prekey. Client rotate karta hai; latest wala bundle me
+    jaata hai, pichhle kuch rakhe jaate hai taaki in-flight sessions na tootein.
+    """
+    user_id = models.CharField(max_length=100)
+    key_id = models.PositiveIntegerField()
+    public_key = models.BinaryField()
+    signature = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ("user_id", "key_id")
+        indexes = [
+            models.Index(fields=["user_id", "-created_at"], name="dm_spk_user_created_idx"),
+        ]
+
+    def __str__(self):
+        return f"SignedPreKey({self.user_id}#{self.key_id})"
+
+
+class OneTimePreKey(models.Model):
+    """
+    One-time prekeys: har claim ek row delete karta hai (FOR UPDATE SKIP LOCKED).
+    """
+    id = models.BigAutoField(primary_key=True)
+    user_id = models.CharField(max_length=100)
+    key_id = models.PositiveIntegerField()
+    public_key = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ("user_id", "key_id")
+        indexes = [
+            models.Index(fields=["user_id", "id"], name="dm_otpk_user_id_idx"),
+        ]
+
+    def __str__(self):
+        return f"OneTimePreKey({self.user_id}#{self.key_id})"
+
+
 class DMConversation(models.Model):
     """
     1-1 DM conversation. user1_id < user2_id (sorted) store karenge
@@ -24,10 +67,44 @@ class DMConversation(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user1_id = models.CharField(max_length=100)
     user2_id = models.CharField(max_length=100)
+    # "<user1_id>:<user2_id>" – canonical pair, chat.pairs cache isi pe key hota hai
+    pair_key = models.CharField(max_length=201, unique=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    # Denormalized on send (DM list = ek indexed scan, koi subquery nahi)
+    last_message = models.ForeignKey(
+        "DMMessage",
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name="+",
+    )
+    last_activity_at = models.DateTimeField(default=timezone.now)
+    user1_unread = models.PositiveIntegerField(default=0)
+    user2_unread = models.PositiveIntegerField(default=0)
 
     class Meta:
         unique_together = ("user1_id", "user2_id")
+        indexes = [
+            models.Index(fields=["user1_id", "-last_activity_at", "-id"], name="dm_conv_u1_activity_idx"),
+            models.Index(fields=["user2_id", "-last_activity_at", "-id"], name="dm_conv_u2_activity_idx"),
+        ]
+
+    def save(self, *args, **kwargs):
+        # every create path (views, admin, shell) gets the canonical key
+        self.pair_key = pair_key(self.user1_id, self.user2_id)
+        update_fields = kwargs.get("update_fields")
+        if update_fields and {"user1_id", "user2_id"} & set(update_fields):
+            kwargs["update_fields"] = set(update_fields) | {"pair_key"}
+        super().save(*args, **kwargs)
+
+    def unread_field(self, uid):
+        """Column holding `uid`'s unread count."""
+        return "user1_unread" if uid == self.user1_id else "user2_unread"
+
+    def unread_for(self, uid):
+        return getattr(self, self.unread_field(uid))
 
     def __str__(self):
         return f"DM({self.user1_id}, {self.user2_id})"
@@ -46,14 +123,18 @@ class DMMessage(models.Model):
     sender_id = models.CharField(max_length=100)
 
     # E2EE fields
-    nonce = models.TextField()       # base64 nonce
-    ciphertext = models.TextField()  # base64 ciphertext
+    # raw bytes; base64 sirf JSON wire pe
+    nonce = models.BinaryField()
+    ciphertext = models.BinaryField()
 
     metadata = models.JSONField(blank=True, null=True)
     timestamp = models.DateTimeField(default=timezone.now)
 
     class Meta:
         ordering = ["timestamp"]
+        indexes = [
+            models.Index(fields=["conversation", "timestamp"], name="dm_msg_conv_ts_idx"),
+        ]
 
     def __str__(self):
         return f"DMMessage({self.id}) in {self.conversation_id}"
@@ -0,0 +1,118 @@
+"""
+Prekey store: bulk upload, signed-prekey rotation and atomic one-time claims.
+
+A claim is a single DELETE ... RETURNING over the (user_id, id) index with
+FOR UPDATE SKIP LOCKED, so concurrent claimers never get the same key and
+never wait on each other.
+"""
+from django.conf import settings
+from django.db import connection, transaction
+
+from chat.events import publish_event
+from common.redis_service import redis_client
+from .models import OneTimePreKey, SignedPreKey
+
+
+PREKEY_UPLOAD_MAX = getattr(settings, "E2EE_PREKEY_UPLOAD_MAX", 1000)
+PREKEY_LOW_WATERMARK = getattr(settings, "E2EE_PREKEY_LOW_WATERMARK", 20)
+PREKEY_NOTIFY_INTERVAL = getattr(settings, "E2EE_PREKEY_NOTIFY_INTERVAL", 300)
+SIGNED_PREKEYS_KEPT = getattr(settings, "E2EE_SIGNED_PREKEYS_KEPT", 2)
+
+
+# ---------- upload / rotate ----------
+def upload_one_time_prekeys(user_id, prekeys):
+    """Bulk insert; key ids the user already uploaded are skipped."""
+    objs = [
+        OneTimePreKey(user_id=user_id, key_id=k.key_id, public_key=k.public_key)
+        for k in prekeys
+    ]
+    OneTimePreKey.objects.bulk_create(objs, batch_size=500, ignore_conflicts=True)
+    # Refilled – next low-watermark dip may notify again
+    try:
+        redis_client.delete(_notify_key(user_id))
+    except Exception:
+        pass
+
+
+def rotate_signed_prekey(user_id, spk):
+    """New signed prekey becomes current; only the newest few are kept."""
+    with transaction.atomic():
+        SignedPreKey.objects.update_or_create(
+            user_id=user_id,
+            key_id=spk.key_id,
+            defaults={"public_key": spk.public_key, "signature": spk.signature},
+        )
+        stale = SignedPreKey.objects.filter(user_id=user_id).order_by("-created_at", "-id")[SIGNED_PREKEYS_KEPT:]
+        SignedPreKey.objects.filter(id__in=list(stale.values_list("id", flat=True))).delete()
+
+
+def current_signed_prekey(user_id):
+    return SignedPreKey.objects.filter(user_id=user_id).order_by("-created_at", "-id").first()
+
+
+def remaining_prekeys(user_id, limit=None):
+    """Count of unclaimed one-time prekeys (bounded by `limit` if given)."""
+    qs = OneTimePreKey.objects.filter(user_id=user_id)
+    if limit is not None:
+        return len(qs.values_list("id", flat=True)[:limit])
+    return qs.count()
+
+
+# ---------- claim ----------
+def claim_one_time_prekey(user_id):
+    """
+    Atomically take the oldest unclaimed prekey of `user_id`.
+    Returns (key_id, public_key bytes) or None when the pool is empty.
+    """
+    table = OneTimePreKey._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            DELETE FROM {table}
+            WHERE id = (
+                SELECT id FROM {table}
+                WHERE user_id = %s
+                ORDER BY id
+                LIMIT 1
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING key_id, public_key
+            """,
+            [user_id],
+        )
+        row = cursor.fetchone()
+
+    if row is None:
+        _notify_low(user_id, 0)
+        return None
+
+    remaining = remaining_prekeys(user_id, limit=PREKEY_LOW_WATERMARK)
+    if remaining < PREKEY_LOW_WATERMARK:
+        _notify_low(user_id, remaining)
+    return row[0], bytes(row[1])
+
+
+# ---------- low-watermark notification ----------
+def _notify_key(user_id):
+    return f"e2ee:prekeys_low:{user_id}"
+
+
+def _notify_low(user_id, remaining):
+    """
+    Tell the owner's devices to refill in the background. Throttled per user
+    so a burst of claims sends one event, not one per claim.
+    """
+    try:
+        if not redis_client.set(_notify_key(user_id), 1, nx=True, ex=PREKEY_NOTIFY_INTERVAL):
+            return
+    except Exception:
+        pass
+
+    try:
+        publish_event(user_id, {
+            "type": "prekeys_low",
+            "remaining": remaining,
+            "watermark": PREKEY_LOW_WATERMARK,
+        })
+    except Exception:
+        pass
@@ -0,0 +1,170 @@
+"""Typed request / response payloads for the E2EE DM API (msgspec Structs)"""
+from typing import Any, Optional, Union
+
+import msgspec
+
+from common.codecs import Base64Bytes
+
+
+# -------------------------------------------------------------------
+# Requests
+# -------------------------------------------------------------------
+class RegisterIdentityRequest(msgspec.Struct):
+    public_key: str = ""
+
+
+class IdentityBatchRequest(msgspec.Struct):
+    user_ids: list[Union[str, int]] = msgspec.field(default_factory=list)
+
+
+class OneTimePreKeyIn(msgspec.Struct):
+    key_id: int
+    public_key: Base64Bytes
+
+
+class SignedPreKeyIn(msgspec.Struct):
+    key_id: int
+    public_key: Base64Bytes
+    signature: Base64Bytes
+
+
+class UploadPreKeysRequest(msgspec.Struct):
+    signed_prekey: Optional[SignedPreKeyIn] = None
+    one_time_prekeys: list[OneTimePreKeyIn] = msgspec.field(default_factory=list)
+
+
+class CreateDMRequest(msgspec.Struct):
+    user_id: Union[str, int, None] = None
+
+
+class SendDMRequest(msgspec.Struct):
+    # base64 text in JSON bodies, raw bin in MessagePack / CBOR
+    nonce: Base64Bytes = b""
+    ciphertext: Base64Bytes = b""
+    metadata: Optional[dict[str, Any]] = None
+
+
+# -------------------------------------------------------------------
+# Responses / events
+# -------------------------------------------------------------------
+class IdentityResponse(msgspec.Struct, kw_only=True):
+    success: bool = True
+    user_id: str
+    public_key: str
+
+
+class IdentityBatchResponse(msgspec.Struct, kw_only=True):
+    success: bool = True
+    keys: dict[str, str]  # { "<user_id>": "<public_key>" }
+    missing: list[str]
+
+
+class PreKeyCountResponse(msgspec.Struct, kw_only=True):
+    success: bool = True
+    remaining: int
+    watermark: int
+    signed_prekey_id: Optional[int]
+
+
+class OneTimePreKeyOut(msgspec.Struct):
+    key_id: int
+    public_key: bytes
+
+
+class SignedPreKeyOut(msgspec.Struct):
+    key_id: int
+    public_key: bytes
+    signature: bytes
+
+    @classmethod
+    def from_model(cls, spk):
+        return cls(key_id=spk.key_id, public_key=bytes(spk.public_key), signature=bytes(spk.signature))
+
+
+class PreKeyBundleResponse(msgspec.Struct, kw_only=True):
+    """one_time_prekey None = pool khaali, client signed prekey se hi session banaye."""
+    success: bool = True
+    user_id: str
+    identity_key: str
+    signed_prekey: SignedPreKeyOut
+    one_time_prekey: Optional[OneTimePreKeyOut]
+
+
+class DMMessageOut(msgspec.Struct):
+    id: str
+    sender_id: str
+    nonce: bytes
+    ciphertext: bytes
+    metadata: Optional[dict[str, Any]]
+    timestamp: str
+
+    @classmethod
+    def from_model(cls, m):
+        return cls(
+            id=str(m.id),
+            sender_id=m.sender_id,
+            nonce=bytes(m.nonce),
+            ciphertext=bytes(m.ciphertext),
+            metadata=m.metadata,
+            timestamp=m.timestamp.isoformat(),
+        )
+
+
+class DMConversationOut(msgspec.Struct):
+    id: str
+    user1_id: str
+    user2_id: str
+    other_user_id: str
+    created_at: str
+    last_activity_at: str
+    last_message: Optional[DMMessageOut]
+    unread_count: int
+
+    @classmethod
+    def from_model(cls, dm, uid):
+        """`dm` should come with select_related("last_message")."""
+        return cls(
+            id=str(dm.id),
+            user1_id=dm.user1_id,
+            user2_id=dm.user2_id,
+            other_user_id=dm.user2_id if dm.user1_id == uid else dm.user1_id,
+            created_at=dm.created_at.isoformat(),
+            last_activity_at=dm.last_activity_at.isoformat(),
+            last_message=DMMessageOut.from_model(dm.last_message) if dm.last_message_id else None,
+            unread_count=dm.unread_for(uid),
+        )
+
+
+class DMListPage(msgspec.Struct, kw_only=True):
+    success: bool = True
+    conversations: list[DMConversationOut]
+    next_cursor: Optional[str]
+
+
+class DMMessagePage(msgspec.Struct):
+    messages: list[DMMessageOut]
+    has_more: bool
+
+
+class DMMessageEvent(msgspec.Struct, kw_only=True):
+    """WS payload (frontend data.type === "e2ee_message")."""
+    type: str = "e2ee_message"
+    conversationId: str
+    id: str
+    sender_id: str
+    nonce: bytes
+    ciphertext: bytes
+    metadata: Optional[dict[str, Any]]
+    timestamp: str
+
+    @classmethod
+    def from_model(cls, m):
+        return cls(
+            conversationId=str(m.conversation_id),
+            id=str(m.id),
+            sender_id=m.sender_id,
+            nonce=bytes(m.nonce),
+            ciphertext=bytes(m.ciphertext),
+            metadata=m.metadata,
+            timestamp=m.timestamp.isoformat(),
+        )
@@ -3,7 +3,11 @@ from . import views
 
 urlpatterns = [
     path("identity/", views.register_identity, name="register_identity"),
+    path("identity/batch/", views.get_identities_batch, name="get_identities_batch"),
     path("identity/<str:user_id>/", views.get_identity, name="get_identity"),
+    path("prekeys/", views.prekeys_upload, name="prekeys_upload"),
+    path("prekeys/<str:user_id>/claim/", views.prekey_bundle_claim, name="prekey_bundle_claim"),
     path("dm/", views.dm_list_create, name="dm_list_create"),
     path("dm/<uuid:conv_id>/messages/", views.dm_messages, name="dm_messages"),
+    path("dm/<uuid:conv_id>/read/", views.dm_mark_read, name="dm_mark_read"),
 ]
@@ -1,18 +1,49 @@
-import json
+from datetime import datetime
 
-from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.shortcuts import get_object_or_404
 from django.conf import settings
 from django.db import transaction
-from django.db.models import Q
+from django.db.models import Case, F, Q, When
+from django.utils import timezone
 
 import requests
-from asgiref.sync import async_to_sync
-from channels.layers import get_channel_layer
 
+from chat.archive import has_archived, read_archived
+from chat.events import publish_to_users
+from chat.pairs import DM_PAIRS, cache_pair, cached_pair, pair_key
+from common.codecs import not_modified, parse_body, respond, version_etag
+from common.cursors import decode_cursor, encode_cursor
+from common.identity_keys import get_identities, key_etag, keys_etag, store_identity
+from common.redis_service import rate_limit
 from .models import E2EEIdentity, DMConversation, DMMessage
+from .prekeys import (
+    PREKEY_LOW_WATERMARK,
+    PREKEY_UPLOAD_MAX,
+    claim_one_time_prekey,
+    current_signed_prekey,
+    remaining_prekeys,
+    rotate_signed_prekey,
+    upload_one_time_prekeys,
+)
+from .schemas import (
+    CreateDMRequest,
+    DMConversationOut,
+    DMListPage,
+    DMMessageEvent,
+    DMMessageOut,
+    IdentityBatchRequest,
+    IdentityBatchResponse,
+    IdentityResponse,
+    OneTimePreKeyOut,
+    PreKeyBundleResponse,
+    PreKeyCountResponse,
+    RegisterIdentityRequest,
+    SendDMRequest,
+    SignedPreKeyOut,
+    UploadPreKeysRequest,
+)
 
 
 # -------------------------------------------------------------------
@@ -62,6 +93,15 @@ def introspect_token(request):
 # -------------------------------------------------------------------
 # E2EE Identity API
 # -------------------------------------------------------------------
+IDENTITY_BATCH_MAX = getattr(settings, "E2EE_IDENTITY_BATCH_MAX", 500)
+
+
+def load_identities(user_ids):
+    """DB fallback for directory misses – ek hi IN query."""
+    return dict(
+        E2EEIdentity.objects.filter(user_id__in=user_ids).values_list("user_id", "public_key")
+    )
+
 
 @csrf_exempt
 @require_http_methods(["POST"])
@@ -73,25 +113,24 @@ def register_identity(request):
     """
     user = introspect_token(request)
     if not user:
-        return JsonResponse({"success": False, "error": "Authentication required"}, status=401)
+        return respond(request, {"success": False, "error": "Authentication required"}, status=401)
 
     try:
-        body = json.loads(request.body.decode() or "{}")
-    except Exception:
-        return JsonResponse({"success": False, "error": "Invalid JSON"}, status=400)
+        body = parse_body(request, RegisterIdentityRequest)
+    except ValueError as e:
+        return respond(request, {"success": False, "error": f"Invalid request body: {e}"}, status=400)
 
-    public_key = body.get("public_key")
+    public_key = body.public_key
     if not public_key:
-        return JsonResponse({"success": False, "error": "public_key required"}, status=400)
+        return respond(request, {"success": False, "error": "public_key required"}, status=400)
 
     obj, _ = E2EEIdentity.objects.update_or_create(
         user_id=str(user["id"]),
         defaults={"public_key": public_key},
     )
+    store_identity(obj.user_id, obj.public_key)
 
-    return JsonResponse(
-        {"success": True, "user_id": obj.user_id, "public_key": obj.public_key}
-    )
+    return respond(request, IdentityResponse(user_id=obj.user_id, public_key=obj.public_key))
 
 
 @csrf_exempt
@@ -101,97 +140,269 @@ def get_identity(request, user_id):
     GET /e2ee/identity/<user_id>/
     Kisi user ki E2EE public key laane ke liye.
     """
-    try:
-        ident = E2EEIdentity.objects.get(user_id=str(user_id))
-    except E2EEIdentity.DoesNotExist:
+    user_id = str(user_id)
+    public_key = get_identities([user_id], load_identities).get(user_id)
+    if not public_key:
         # ✅ JSON 404 instead of Django HTML page
-        return JsonResponse(
+        return respond(
+            request,
             {"success": False, "error": "identity_not_found"},
             status=404,
         )
 
-    return JsonResponse(
-        {
-            "success": True,
-            "user_id": ident.user_id,
-            "public_key": ident.public_key,
-        }
+    etag = key_etag(public_key)
+    cached = not_modified(request, etag, cache="identity")
+    if cached:
+        return cached
+
+    return respond(
+        request,
+        IdentityResponse(user_id=user_id, public_key=public_key),
+        etag=etag,
+        cache="identity",
+    )
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def get_identities_batch(request):
+    """
+    POST /e2ee/identity/batch/
+    Body: { "user_ids": ["1", "2", ...] }
+    Ek request me bahut saare users ki public keys. Response ka ETag
+    poore result set pe hai, to If-None-Match bhejo -> unchanged = 304.
+    """
+    try:
+        body = parse_body(request, IdentityBatchRequest)
+    except ValueError as e:
+        return respond(request, {"success": False, "error": f"Invalid request body: {e}"}, status=400)
+
+    user_ids = [str(u) for u in dict.fromkeys(body.user_ids)]
+    if not user_ids:
+        return respond(request, {"success": False, "error": "user_ids required"}, status=400)
+    if len(user_ids) > IDENTITY_BATCH_MAX:
+        return respond(
+            request,
+            {"success": False, "error": f"At most {IDENTITY_BATCH_MAX} user_ids per request"},
+            status=400,
+        )
+
+    keys = get_identities(user_ids, load_identities)
+    missing = [u for u in user_ids if u not in keys]
+
+    etag = keys_etag({u: keys.get(u) for u in user_ids})
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+
+    return respond(request, IdentityBatchResponse(keys=keys, missing=missing), etag=etag)
+
+
+# -------------------------------------------------------------------
+# Prekeys (one-time + signed)
+# -------------------------------------------------------------------
+PREKEY_CLAIM_LIMIT = getattr(settings, "E2EE_PREKEY_CLAIM_LIMIT", 30)  # per claimer/target/minute
+
+
+def prekey_count_response(request, uid):
+    spk = current_signed_prekey(uid)
+    return respond(
+        request,
+        PreKeyCountResponse(
+            remaining=remaining_prekeys(uid),
+            watermark=PREKEY_LOW_WATERMARK,
+            signed_prekey_id=spk.key_id if spk else None,
+        ),
+    )
+
+
+@csrf_exempt
+@require_http_methods(["GET", "POST"])
+def prekeys_upload(request):
+    """
+    GET  /e2ee/prekeys/  -> apne bache hue one-time prekeys ka count
+    POST /e2ee/prekeys/
+    Body: {
+      "signed_prekey": { "key_id": 7, "public_key": "<b64>", "signature": "<b64>" },   # optional, rotation
+      "one_time_prekeys": [ { "key_id": 101, "public_key": "<b64>" }, ... ]
+    }
+    """
+    user = introspect_token(request)
+    if not user:
+        return respond(request, {"success": False, "error": "Authentication required"}, status=401)
+
+    uid = str(user["id"])
+
+    if request.method == "GET":
+        return prekey_count_response(request, uid)
+
+    try:
+        body = parse_body(request, UploadPreKeysRequest)
+    except ValueError as e:
+        return respond(request, {"success": False, "error": f"Invalid request body: {e}"}, status=400)
+
+    if not body.signed_prekey and not body.one_time_prekeys:
+        return respond(
+            request,
+            {"success": False, "error": "signed_prekey or one_time_prekeys required"},
+            status=400,
+        )
+    if len(body.one_time_prekeys) > PREKEY_UPLOAD_MAX:
+        return respond(
+            request,
+            {"success": False, "error": f"At most {PREKEY_UPLOAD_MAX} one_time_prekeys per request"},
+            status=400,
+        )
+    if any(not k.public_key for k in body.one_time_prekeys):
+        return respond(request, {"success": False, "error": "public_key required for every prekey"}, status=400)
+
+    if body.signed_prekey:
+        if not body.signed_prekey.public_key or not body.signed_prekey.signature:
+            return respond(
+                request,
+                {"success": False, "error": "signed_prekey needs public_key and signature"},
+                status=400,
+            )
+        rotate_signed_prekey(uid, body.signed_prekey)
+
+    if body.one_time_prekeys:
+        upload_one_time_prekeys(uid, body.one_time_prekeys)
+
+    return prekey_count_response(request, uid)
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def prekey_bundle_claim(request, user_id):
+    """
+    POST /e2ee/prekeys/<user_id>/claim/
+    Session shuru karne ke liye bundle: identity key + current signed prekey
+    + ek one-time prekey (jo claim hote hi delete ho jaata hai).
+    """
+    user = introspect_token(request)
+    if not user:
+        return respond(request, {"success": False, "error": "Authentication required"}, status=401)
+
+    target = str(user_id)
+    if not rate_limit(f"e2ee:prekey_claim:{user['id']}:{target}", PREKEY_CLAIM_LIMIT, 60):
+        return respond(request, {"success": False, "error": "Too many prekey claims"}, status=429)
+
+    identity_key = get_identities([target], load_identities).get(target)
+    spk = current_signed_prekey(target)
+    if not identity_key or not spk:
+        return respond(request, {"success": False, "error": "prekey_bundle_not_found"}, status=404)
+
+    claimed = claim_one_time_prekey(target)
+
+    return respond(
+        request,
+        PreKeyBundleResponse(
+            user_id=target,
+            identity_key=identity_key,
+            signed_prekey=SignedPreKeyOut.from_model(spk),
+            one_time_prekey=OneTimePreKeyOut(key_id=claimed[0], public_key=claimed[1]) if claimed else None,
+        ),
     )
 
 
 # -------------------------------------------------------------------
 # DM list + create
 # -------------------------------------------------------------------
+DM_LIST_PAGE_SIZE = 50
+DM_LIST_MAX_PAGE_SIZE = 200
+
 
 @csrf_exempt
 @require_http_methods(["GET", "POST"])
 def dm_list_create(request):
     """
-    GET  /e2ee/dm/               -> current user ke saare DM list
+    GET  /e2ee/dm/?limit=50&cursor=<next_cursor>
+                                 -> DM list, latest activity pehle, last message + unread count ke saath
     POST /e2ee/dm/ { user_id }   -> iss user ke sath DM create / fetch
     """
     user = introspect_token(request)
     if not user:
-        return JsonResponse({"success": False, "error": "Authentication required"}, status=401)
+        return respond(request, {"success": False, "error": "Authentication required"}, status=401)
 
     uid = str(user["id"])
 
     # ---------- LIST ----------
     if request.method == "GET":
-        dms = DMConversation.objects.filter(
-            Q(user1_id=uid) | Q(user2_id=uid)
-        ).order_by("-created_at")
-
-        conversations = []
-        for dm in dms:
-            other_id = dm.user2_id if dm.user1_id == uid else dm.user1_id
-            conversations.append(
-                {
-                    "id": str(dm.id),
-                    "user1_id": dm.user1_id,
-                    "user2_id": dm.user2_id,
-                    "other_user_id": other_id,
-                    "created_at": dm.created_at.isoformat(),
-                }
-            )
-
-        return JsonResponse({"success": True, "conversations": conversations})
+        try:
+            limit = int(request.GET.get("limit", DM_LIST_PAGE_SIZE))
+            cursor = decode_cursor(request.GET.get("cursor"))
+        except ValueError as e:
+            return respond(request, {"success": False, "error": str(e)}, status=400)
+        limit = max(1, min(limit, DM_LIST_MAX_PAGE_SIZE))
+
+        # har side (user1 / user2) apne (userN, last_activity_at, id) index pe
+        # ordered + limited scan; UNION ALL karke merge – OR + global ORDER BY
+        # pe Postgres user ke saare DMs sort karta
+        sides = []
+        for field in ("user1_id", "user2_id"):
+            side = DMConversation.objects.filter(**{field: uid})
+            if cursor:
+                at, last_id = cursor
+                side = side.filter(Q(last_activity_at__lt=at) | Q(last_activity_at=at, id__lt=last_id))
+            sides.append(side.order_by("-last_activity_at", "-id").values_list("last_activity_at", "id")[:limit + 1])
+
+        heads = sorted(sides[0].union(sides[1], all=True), reverse=True)[:limit + 1]
+        has_more = len(heads) > limit
+        # sirf page ki rows last message ke saath load (denormalized columns se)
+        by_id = DMConversation.objects.select_related("last_message").in_bulk([dm_id for _, dm_id in heads[:limit]])
+        page = [by_id[dm_id] for _, dm_id in heads[:limit] if dm_id in by_id]
+
+        return respond(
+            request,
+            DMListPage(
+                conversations=[DMConversationOut.from_model(dm, uid) for dm in page],
+                next_cursor=encode_cursor(page[-1].last_activity_at, page[-1].id) if has_more else None,
+            ),
+        )
 
     # ---------- CREATE ----------
     try:
-        body = json.loads(request.body.decode() or "{}")
-    except Exception:
-        return JsonResponse({"success": False, "error": "Invalid JSON"}, status=400)
+        body = parse_body(request, CreateDMRequest)
+    except ValueError as e:
+        return respond(request, {"success": False, "error": f"Invalid request body: {e}"}, status=400)
 
-    other_id = body.get("user_id")
-    if not other_id:
-        return JsonResponse({"success": False, "error": "user_id required"}, status=400)
+    other_id = body.user_id
+    if other_id is None or other_id == "":
+        return respond(request, {"success": False, "error": "user_id required"}, status=400)
 
     other_id = str(other_id)
 
     if other_id == uid:
-        return JsonResponse({"success": False, "error": "Cannot create DM with yourself"}, status=400)
+        return respond(request, {"success": False, "error": "Cannot create DM with yourself"}, status=400)
 
     # sorted store
     u1, u2 = sorted([uid, other_id])
-
-    with transaction.atomic():
+    key = pair_key(u1, u2)
+
+    # fast path: pair -> id cache hit = koi DB query nahi
+    dm_id = cached_pair(DM_PAIRS, key)
+    created = False
+    if not dm_id:
+        # unique pair_key pe get_or_create – race me dusra insert IntegrityError
+        # se get pe gir jaata hai, duplicate nahi banta
         dm, created = DMConversation.objects.get_or_create(
-            user1_id=u1,
-            user2_id=u2,
+            pair_key=key,
+            defaults={"user1_id": u1, "user2_id": u2},
         )
+        dm_id = str(dm.id)
+        cache_pair(DM_PAIRS, key, dm_id)
 
     # dono users ki public keys bhej dete hai (agar registered)
-    identities = E2EEIdentity.objects.filter(user_id__in=[uid, other_id])
-    key_map = {i.user_id: i.public_key for i in identities}
+    key_map = get_identities([uid, other_id], load_identities)
 
-    return JsonResponse(
+    return respond(
+        request,
         {
             "success": True,
             "conversation": {
-                "id": str(dm.id),
-                "user1_id": dm.user1_id,
-                "user2_id": dm.user2_id,
+                "id": dm_id,
+                "user1_id": u1,
+                "user2_id": u2,
             },
             "keys": key_map,  # { "<user_id>": "<public_key>" }
             "created": created,
@@ -208,88 +419,127 @@ def user_can_access_dm(uid: str, dm: DMConversation) -> bool:
     return uid in {dm.user1_id, dm.user2_id}
 
 
+def record_dm_message(dm: DMConversation, msg: DMMessage):
+    """
+    DM list ke denormalized columns update karo: last message / activity
+    (sirf agar ye message naya hai – concurrent sends out of order commit
+    ho sakte hai) + receiver ka unread count.
+    """
+    other_unread = dm.unread_field(dm.user2_id if msg.sender_id == dm.user1_id else dm.user1_id)
+    is_newest = Q(last_activity_at__lte=msg.timestamp) | Q(last_message__isnull=True)
+    DMConversation.objects.filter(id=dm.id).update(
+        last_message_id=Case(When(is_newest, then=msg.id), default=F("last_message_id")),
+        last_activity_at=Case(When(is_newest, then=msg.timestamp), default=F("last_activity_at")),
+        updated_at=timezone.now(),
+        **{other_unread: F(other_unread) + 1},
+    )
+
+
+DM_HISTORY_PAGE_SIZE = 50
+DM_HISTORY_MAX_PAGE_SIZE = 200
+
+
+def dm_history(dm, limit, before=None):
+    """
+    (newest `limit` messages older than `before` = (timestamp, id), oldest
+    first; has_more) – PostgresMessageStore.history jaisa: pehle hot rows,
+    kam pade to sirf utne archived rows jitne chahiye.
+    """
+    qs = DMMessage.objects.filter(conversation=dm)
+    if before:
+        ts, msg_id = before
+        qs = qs.filter(Q(timestamp__lt=ts) | Q(timestamp=ts, id__lt=msg_id))
+    rows = list(qs.order_by("-timestamp", "-id")[:limit + 1])
+    if len(rows) > limit:
+        return rows[:limit][::-1], True
+
+    rows = rows[::-1]
+    older_than = (rows[0].timestamp, rows[0].id) if rows else before
+    need = limit - len(rows)
+    if need == 0:
+        return rows, has_archived("dm", dm.id, older_than)
+    archived, has_more = read_archived("dm", dm.id, need, older_than)
+    return archived + rows, has_more
+
+
 @csrf_exempt
 @require_http_methods(["GET", "POST"])
 def dm_messages(request, conv_id):
     """
-    GET  /e2ee/dm/<conv_id>/messages/        -> ciphertext list
+    GET  /e2ee/dm/<conv_id>/messages/?limit=50&cursor=<next_cursor>
+                                             -> ciphertext page, oldest first
     POST /e2ee/dm/<conv_id>/messages/        -> ciphertext create + WS broadcast
     Body (POST): { "nonce": "...", "ciphertext": "...", "metadata": {...} }
     """
     user = introspect_token(request)
     if not user:
-        return JsonResponse({"success": False, "error": "Authentication required"}, status=401)
+        return respond(request, {"success": False, "error": "Authentication required"}, status=401)
 
     uid = str(user["id"])
     dm = get_object_or_404(DMConversation, id=conv_id)
 
     if not user_can_access_dm(uid, dm):
-        return JsonResponse({"success": False, "error": "Not a participant"}, status=403)
+        return respond(request, {"success": False, "error": "Not a participant"}, status=403)
 
     # ---------- LIST ----------
     if request.method == "GET":
-        msgs = DMMessage.objects.filter(conversation=dm).order_by("timestamp")
-        data = [
-            {
-                "id": str(m.id),
-                "sender_id": m.sender_id,
-                "nonce": m.nonce,
-                "ciphertext": m.ciphertext,
-                "metadata": m.metadata,
-                "timestamp": m.timestamp.isoformat(),
-            }
-            for m in msgs
-        ]
-        return JsonResponse({"success": True, "messages": data})
+        try:
+            limit = int(request.GET.get("limit", DM_HISTORY_PAGE_SIZE))
+            before = decode_cursor(request.GET.get("cursor"))
+            if before and not (isinstance(before[0], datetime) and before[0].tzinfo):
+                raise ValueError("invalid cursor")
+        except ValueError:
+            return respond(request, {"success": False, "error": "Invalid limit or cursor"}, status=400)
+        limit = max(1, min(limit, DM_HISTORY_MAX_PAGE_SIZE))
+
+        # har naye message pe record_dm_message updated_at badhata hai –
+        # wahi version hai, body load karne se pehle 304 check
+        etag = version_etag(dm.id, limit, *(before or ()), dm.updated_at)
+        cached = not_modified(request, etag, dm.updated_at, cache="history")
+        if cached:
+            return cached
+
+        msgs, has_more = dm_history(dm, limit, before)
+        data = [DMMessageOut.from_model(m) for m in msgs]
+        next_cursor = encode_cursor(msgs[0].timestamp, msgs[0].id) if has_more and msgs else None
+        return respond(
+            request,
+            {"success": True, "messages": data, "has_more": has_more, "next_cursor": next_cursor},
+            etag=etag,
+            last_modified=dm.updated_at,
+            cache="history",
+        )
 
     # ---------- SEND ----------
     try:
-        body = json.loads(request.body.decode() or "{}")
-    except Exception:
-        return JsonResponse({"success": False, "error": "Invalid JSON"}, status=400)
+        body = parse_body(request, SendDMRequest)
+    except ValueError as e:
+        return respond(request, {"success": False, "error": f"Invalid request body: {e}"}, status=400)
 
-    nonce = body.get("nonce")
-    ciphertext = body.get("ciphertext")
-    metadata = body.get("metadata") or {}
-
-    if not nonce or not ciphertext:
-        return JsonResponse(
+    if not body.nonce or not body.ciphertext:
+        return respond(
+            request,
             {"success": False, "error": "nonce and ciphertext required"},
             status=400,
         )
 
-    msg = DMMessage.objects.create(
-        conversation=dm,
-        sender_id=uid,
-        nonce=nonce,
-        ciphertext=ciphertext,
-        metadata=metadata,
-    )
+    with transaction.atomic():
+        msg = DMMessage.objects.create(
+            conversation=dm,
+            sender_id=uid,
+            nonce=body.nonce,
+            ciphertext=body.ciphertext,
+            metadata=body.metadata or {},
+        )
+        record_dm_message(dm, msg)
 
-    # WS broadcast to both DM participants
-    channel_layer = get_channel_layer()
-
-    payload = {
-        "type": "e2ee_message",           # 👈 frontend data.type === "e2ee_message"
-        "conversationId": str(dm.id),
-        "id": str(msg.id),
-        "sender_id": uid,
-        "nonce": msg.nonce,
-        "ciphertext": msg.ciphertext,
-        "metadata": msg.metadata,
-        "timestamp": msg.timestamp.isoformat(),
-    }
+    # WS broadcast to both DM participants (+ per-user event log for resume)
+    payload = DMMessageEvent.from_model(msg)
 
-    for target_id in [dm.user1_id, dm.user2_id]:
-        async_to_sync(channel_layer.group_send)(
-            f"user_{target_id}",          # same pattern: user_<auth_user_id>
-            {
-                "type": "chat.message",   # Channels consumer method
-                "data": payload,
-            },
-        )
+    publish_to_users([dm.user1_id, dm.user2_id], payload)
 
-    return JsonResponse(
+    return respond(
+        request,
         {
             "success": True,
             "message_id": str(msg.id),
@@ -297,3 +547,27 @@ def dm_messages(request, conv_id):
         },
         status=201,
     )
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def dm_mark_read(request, conv_id):
+    """
+    POST /e2ee/dm/<conv_id>/read/  -> apna unread count 0
+    """
+    user = introspect_token(request)
+    if not user:
+        return respond(request, {"success": False, "error": "Authentication required"}, status=401)
+
+    uid = str(user["id"])
+    dm = get_object_or_404(DMConversation, id=conv_id)
+
+    if not user_can_access_dm(uid, dm):
+        return respond(request, {"success": False, "error": "Not a participant"}, status=403)
+
+    DMConversation.objects.filter(id=dm.id).update(
+        updated_at=timezone.now(),
+        **{dm.unread_field(uid): 0},
+    )
+
+    return respond(request, {"success": True, "unread_count": 0})
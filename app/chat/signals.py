@@ -0,0 +1,26 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .models import Conversation, ConversationMember, MembershipTombstone
+from .pairs import CHAT_PAIRS, DM_PAIRS, forget_pair
+from .secure_dm.models import DMConversation
+
+
+@receiver(post_delete, sender=ConversationMember)
+def member_removed(sender, instance, **kwargs):
+    # every path (leave, admin, conversation delete) leaves a tombstone for /chat/sync/
+    MembershipTombstone.objects.create(
+        conversation_id=instance.conversation_id,
+        user_id=instance.user_id,
+    )
+
+
+@receiver(post_delete, sender=Conversation)
+def conversation_deleted(sender, instance, **kwargs):
+    if instance.pair_key:
+        forget_pair(CHAT_PAIRS, instance.pair_key)
+
+
+@receiver(post_delete, sender=DMConversation)
+def dm_deleted(sender, instance, **kwargs):
+    forget_pair(DM_PAIRS, instance.pair_key)
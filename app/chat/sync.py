@@ -0,0 +1,73 @@
+import base64
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+
+SYNC_MESSAGES_PER_CONVERSATION = getattr(settings, 'CHAT_SYNC_MESSAGES_PER_CONVERSATION', 50)
+SYNC_MAX_MESSAGES_PER_CONVERSATION = 200
+
+# Rows get their timestamps before commit, so a row stamped just before the
+# token can become visible just after it. The token is rewound by this much
+# and clients dedupe by id.
+SYNC_TOKEN_OVERLAP = timedelta(seconds=getattr(settings, 'CHAT_SYNC_TOKEN_OVERLAP_SECONDS', 2))
+
+_TOKEN_VERSION = 'v1'
+
+
+# --------------------------------------------------------------------
+# Opaque sync token
+# --------------------------------------------------------------------
+def encode_sync_token(now):
+    watermark = now - SYNC_TOKEN_OVERLAP
+    micros = int(watermark.timestamp() * 1_000_000)
+    raw = f"{_TOKEN_VERSION}:{micros}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_sync_token(token):
+    """
+    Returns the aware datetime encoded in `token`, or None for an empty
+    token (cold start). Raises ValueError on a malformed token.
+    """
+    if not token:
+        return None
+    padded = token + '=' * (-len(token) % 4)
+    try:
+        version, _, micros = base64.urlsafe_b64decode(padded).decode().partition(':')
+        micros = int(micros)
+    except Exception:
+        raise ValueError('invalid sync token')
+    if version != _TOKEN_VERSION:
+        raise ValueError('unsupported sync token')
+    return datetime.fromtimestamp(micros / 1_000_000, tz=dt_timezone.utc)
+
+
+# --------------------------------------------------------------------
+# Newest-N-per-conversation in one query
+# --------------------------------------------------------------------
+def latest_per_conversation(qs, cap):
+    """
+    Returns {conversation_id: (rows_oldest_first, has_more)} for `qs`,
+    keeping at most `cap` newest rows per conversation. Uses a single
+    ROW_NUMBER() window query over the (conversation, timestamp) index.
+    """
+    ranked = qs.annotate(
+        rn=Window(
+            expression=RowNumber(),
+            partition_by=[F('conversation_id')],
+            order_by=F('timestamp').desc(),
+        )
+    ).filter(rn__lte=cap + 1).order_by('conversation_id', 'timestamp')
+
+    grouped = {}
+    for row in ranked:
+        grouped.setdefault(row.conversation_id, []).append(row)
+
+    result = {}
+    for conv_id, rows in grouped.items():
+        has_more = len(rows) > cap
+        result[conv_id] = (rows[-cap:] if has_more else rows, has_more)
+    return result
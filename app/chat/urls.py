@@ -1,4 +1,4 @@
-from django.urls import path
+from django.urls import include, path
 from . import views
 
 app_name = 'chat'
@@ -12,4 +12,9 @@ urlpatterns = [
     path('conversations/<uuid:conv_id>/participants/', views.get_participants, name='participants'),
     path('groups/create/', views.create_group, name='create_group'),
     path('conversations/<uuid:conv_id>/add-bot/', views.add_bot_to_conversation, name='add_bot'),
+    path('conversations/<uuid:conv_id>/read/', views.conversation_mark_read, name='mark_read'),
+    path('conversations/<uuid:conv_id>/sender-keys/', views.sender_key_upload, name='sender_key_upload'),
+    path('conversations/<uuid:conv_id>/sender-keys/fetch/', views.sender_key_fetch, name='sender_key_fetch'),
+    path('sync/', views.sync, name='sync'),
+    path('communities/', include('chat.communities.urls')),
 ]
\ No newline at end of file
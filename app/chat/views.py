@@ -1,21 +1,58 @@
-import json
+from datetime import datetime
+
 import requests
 
-from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.shortcuts import get_object_or_404
 from django.conf import settings
-from django.db import transaction
-from django.db.models import Q
-
-from asgiref.sync import async_to_sync
-from channels.layers import get_channel_layer
-
-from .models import Conversation, ConversationMember, Message
-
-
-AUTH_USERS_URL = settings.AUTH_USERS_URL + '/users/'
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+
+from common.codecs import not_modified, parse_body, respond, version_etag
+from common.cursors import decode_cursor, encode_cursor
+from .directory import directory, display_names
+from .events import publish_to_users
+from .pairs import CHAT_PAIRS, cache_pair, cached_pair, forget_pair, pair_key
+from .renames import current_sender_names, names_version
+from .message_store import get_message_store
+from .models import Conversation, ConversationMember, MembershipTombstone, SenderKeyEnvelope
+from .schemas import (
+    AddMembersRequest,
+    ConversationCreatedEvent,
+    ConversationOut,
+    CreateConversationRequest,
+    CreateGroupRequest,
+    FetchSenderKeysRequest,
+    MemberOut,
+    MessageEvent,
+    MessageOut,
+    MessagePage,
+    ReadWatermarkOut,
+    SendMessageRequest,
+    SenderKeyEnvelopeOut,
+    SenderKeyEvent,
+    SenderKeysStaleEvent,
+    SyncConversationOut,
+    UploadSenderKeyRequest,
+    participant_ref,
+)
+from .secure_dm.models import DMConversation, DMMessage
+from .secure_dm.schemas import DMConversationOut, DMMessageOut, DMMessagePage
+from .sync import (
+    SYNC_MESSAGES_PER_CONVERSATION,
+    SYNC_MAX_MESSAGES_PER_CONVERSATION,
+    SYNC_TOKEN_OVERLAP,
+    encode_sync_token,
+    decode_sync_token,
+    latest_per_conversation,
+)
+
+
+USER_LIST_MAX_PAGE_SIZE = 100
+HISTORY_MAX_PAGE_SIZE = 200
+SENDER_KEY_FETCH_MAX = getattr(settings, 'CHAT_SENDER_KEY_FETCH_MAX', 500)
 
 
 # --------------------------------------------------------------------
@@ -91,6 +128,28 @@ def ensure_member(user, conversation):
     return False
 
 
+def member_q(uid, uname, prefix=''):
+    """Same id / username / legacy matching that ensure_member uses."""
+    return (
+        Q(**{f'{prefix}user_id': uid}) |
+        Q(**{f'{prefix}username': uname}) |
+        Q(**{f'{prefix}user_id': uname})
+    )
+
+
+def touch_conversation(conv_id):
+    """Bump updated_at so /sync/ reports the conversation as changed."""
+    Conversation.objects.filter(id=conv_id).update(updated_at=timezone.now())
+
+
+def unpair(conv):
+    """A 1-1 whose membership changed is no longer "the" chat for that pair."""
+    if conv.pair_key:
+        Conversation.objects.filter(id=conv.id).update(pair_key=None)
+        forget_pair(CHAT_PAIRS, conv.pair_key)
+        conv.pair_key = None
+
+
 # --------------------------------------------------------------------
 # Conversation list & create (DM / 1-1, but supports is_group flag)
 # --------------------------------------------------------------------
@@ -99,7 +158,8 @@ def ensure_member(user, conversation):
 def conversation_list_create(request):
     user = introspect_token(request)
     if not user:
-        return JsonResponse(
+        return respond(
+            request,
             {'success': False, 'error': 'Authentication required'},
             status=401
         )
@@ -117,99 +177,102 @@ def conversation_list_create(request):
             Q(created_by_username=uname)
         ).distinct()
 
-        data = [
-            {
-                'id': str(c.id),
-                'is_group': c.is_group,
-                'name': c.name,
-                'created_at': c.created_at.isoformat(),
-            }
-            for c in convs
-        ]
-        return JsonResponse({'success': True, 'conversations': data})
+        data = [ConversationOut.from_model(c) for c in convs]
+        return respond(request, {'success': True, 'conversations': data})
 
     # ---------- CREATE CONVERSATION ----------
     try:
-        body = json.loads(request.body.decode() or "{}")
-    except Exception:
-        return JsonResponse({'success': False, 'error': 'Invalid JSON'}, status=400)
+        body = parse_body(request, CreateConversationRequest)
+    except ValueError as e:
+        return respond(request, {'success': False, 'error': f'Invalid request body: {e}'}, status=400)
 
-    raw_participants = body.get('participants') or []
-    is_group = bool(body.get('is_group', False))
-    name = body.get('name') if is_group else None
+    is_group = body.is_group
+    name = body.name if is_group else None
 
     # Map of user_id -> username
     members_map = {uid: uname}  # current user always included
+    refs = [participant_ref(p) for p in body.participants]
+    known = display_names([pid for pid, _ in refs if pid])
 
-    for p in raw_participants:
-        if isinstance(p, dict):
-            pid = p.get('id') or p.get('user_id')
-            puname = p.get('username')
-        else:
-            # fallback – treat value as username and id same as username
-            pid = str(p)
-            puname = str(p)
+    for pid, puname in refs:
+        # bare values: treat value as username and id same as username
 
         if not pid:
             continue
 
-        pid = str(pid)
-
         # don't re-add self
         if pid == uid:
             continue
 
-        if not puname:
-            puname = f"user_{pid}"
+        # directory replica wins over whatever name the client sent
+        puname = known.get(pid) or puname or f"user_{pid}"
 
         members_map[pid] = puname
 
     if len(members_map) < 2:
-        return JsonResponse(
+        return respond(
+            request,
             {'success': False, 'error': 'At least one other participant required'},
             status=400
         )
 
-    with transaction.atomic():
-        conv = Conversation.objects.create(
-            is_group=is_group,
-            name=name or '',
-            created_by_id=uid,
-            created_by_username=uname,
-        )
+    # ---------- 1-1: one conversation per pair ----------
+    key = None
+    if not is_group and len(members_map) == 2:
+        key = pair_key(*members_map)
+        existing_id = cached_pair(CHAT_PAIRS, key)
+        if not existing_id:
+            existing_id = Conversation.objects.filter(pair_key=key).values_list('id', flat=True).first()
+            if existing_id:
+                cache_pair(CHAT_PAIRS, key, existing_id)
+        if existing_id:
+            return respond(
+                request,
+                {'success': True, 'conversation_id': str(existing_id), 'created': False},
+                status=200
+            )
 
-        for member_id, member_username in members_map.items():
-            ConversationMember.objects.create(
-                conversation=conv,
-                user_id=str(member_id),      # ALWAYS auth id / stable id
-                username=member_username,
-                is_admin=(member_id == uid),
+    try:
+        with transaction.atomic():
+            conv = Conversation.objects.create(
+                is_group=is_group,
+                name=name or '',
+                created_by_id=uid,
+                created_by_username=uname,
+                pair_key=key,
             )
 
+            for member_id, member_username in members_map.items():
+                ConversationMember.objects.create(
+                    conversation=conv,
+                    user_id=str(member_id),      # ALWAYS auth id / stable id
+                    username=member_username,
+                    is_admin=(member_id == uid),
+                )
+    except IntegrityError:
+        # lost a race on the same pair – hand back the winner
+        if not key:
+            raise
+        existing_id = Conversation.objects.filter(pair_key=key).values_list('id', flat=True).first()
+        if not existing_id:
+            raise
+        cache_pair(CHAT_PAIRS, key, existing_id)
+        return respond(
+            request,
+            {'success': True, 'conversation_id': str(existing_id), 'created': False},
+            status=200
+        )
+
+    if key:
+        cache_pair(CHAT_PAIRS, key, conv.id)
+
     # 🔔 broadcast "conversation_created" to all members
-    channel_layer = get_channel_layer()
     members = ConversationMember.objects.filter(conversation=conv)
 
-    payload = {
-        "type": "conversation_created",
-        "conversation": {
-            "id": str(conv.id),
-            "is_group": conv.is_group,
-            "name": conv.name,
-            "created_at": conv.created_at.isoformat(),
-        },
-    }
+    payload = ConversationCreatedEvent(conversation=ConversationOut.from_model(conv))
+    publish_to_users([m.user_id for m in members], payload)
 
-    for m in members:
-        async_to_sync(channel_layer.group_send)(
-            f"user_{m.user_id}",
-            {
-                "type": "chat.message",
-                "data": payload,
-            },
-        )
-
-    return JsonResponse({'success': True, 'conversation_id': str(conv.id)}, status=201)
+    return respond(request, {'success': True, 'conversation_id': str(conv.id), 'created': True}, status=201)
 
 
 # --------------------------------------------------------------------
@@ -220,74 +283,82 @@ def conversation_list_create(request):
 def messages_list_send(request, conv_id):
     user = introspect_token(request)
     if not user:
-        return JsonResponse({'success': False, 'error': 'Authentication required'}, status=401)
+        return respond(request, {'success': False, 'error': 'Authentication required'}, status=401)
 
     conv = get_object_or_404(Conversation, id=conv_id)
 
     if not ensure_member(user, conv):
-        return JsonResponse({'success': False, 'error': 'Not a participant'}, status=403)
+        return respond(request, {'success': False, 'error': 'Not a participant'}, status=403)
 
     # ---------- LIST MESSAGES ----------
     if request.method == 'GET':
-        limit = int(request.GET.get('limit', 50))
-        messages = Message.objects.filter(conversation=conv).order_by('-timestamp')[:limit]
-        msgs = []
-        for m in reversed(messages):
-            msgs.append({
-                'id': str(m.id),
-                'sender_id': m.sender_id,
-                'sender_username': m.sender_username,
-                'ciphertext': m.ciphertext,
-                'metadata': m.metadata,
-                'timestamp': m.timestamp.isoformat(),
-            })
-        return JsonResponse({'success': True, 'messages': msgs})
+        try:
+            limit = max(1, min(int(request.GET.get('limit', 50)), HISTORY_MAX_PAGE_SIZE))
+            before = decode_cursor(request.GET.get('cursor'))
+            if before and not (isinstance(before[0], datetime) and before[0].tzinfo):
+                raise ValueError('invalid cursor')
+        except ValueError:
+            return respond(request, {'success': False, 'error': 'Invalid limit or cursor'}, status=400)
+
+        store = get_message_store()
+        settled = before and before[0] <= timezone.now() - SYNC_TOKEN_OVERLAP
+        if settled:
+            # a page older than a settled cursor holds fixed messages (late
+            # commits land within SYNC_TOKEN_OVERLAP) – only the names
+            # overlaid on them change, so its own senders' names version it
+            # (ex-members included)
+            messages, has_more = store.history(conv.id, limit, before)
+            etag = version_etag(conv.id, limit, *before, names_version({m.sender_id for m in messages}))
+            last_modified, policy = None, 'history_page'
+        else:
+            # versioned by the newest message + conversation updated_at
+            # (renames bump it) without loading the page
+            head = store.head(conv.id) or ()
+            last_modified = max([conv.updated_at, *head[:1]])
+            etag = version_etag(conv.id, limit, *(before or ()), conv.updated_at, *head)
+            policy = 'history'
+        cached = not_modified(request, etag, last_modified, cache=policy)
+        if cached:
+            return cached
+
+        if not settled:
+            messages, has_more = store.history(conv.id, limit, before)
+        msgs = current_sender_names([MessageOut.from_model(m) for m in messages])
+        next_cursor = encode_cursor(messages[0].timestamp, messages[0].id) if has_more and messages else None
+        return respond(
+            request,
+            {'success': True, 'messages': msgs, 'has_more': has_more, 'next_cursor': next_cursor},
+            etag=etag,
+            last_modified=last_modified,
+            cache=policy,
+        )
 
     # ---------- SEND MESSAGE ----------
     try:
-        body = json.loads(request.body.decode() or "{}")
-    except Exception:
-        return JsonResponse({'success': False, 'error': 'Invalid JSON'}, status=400)
+        body = parse_body(request, SendMessageRequest)
+    except ValueError as e:
+        return respond(request, {'success': False, 'error': f'Invalid request body: {e}'}, status=400)
 
-    ciphertext = body.get('ciphertext')
-    metadata = body.get('metadata')
-    if not ciphertext:
-        return JsonResponse({'success': False, 'error': 'ciphertext required'}, status=400)
+    if not body.ciphertext:
+        return respond(request, {'success': False, 'error': 'ciphertext required'}, status=400)
 
-    msg = Message.objects.create(
-        conversation=conv,
+    msg = get_message_store().append(
+        conv.id,
         sender_id=str(user['id']),
         sender_username=user['username'],
-        ciphertext=ciphertext,
-        metadata=metadata or {}
+        ciphertext=body.ciphertext,
+        sender_key_id=body.sender_key_id,
+        metadata=body.metadata or {}
     )
 
-    # 🔔 REALTIME BROADCAST via Channels
-    channel_layer = get_channel_layer()
-
-    payload = {
-        "type": "message",  # frontend data.type === "message"
-        "conversationId": str(conv.id),
-        "id": str(msg.id),
-        "sender_id": str(user['id']),
-        "sender_username": user['username'],
-        "ciphertext": msg.ciphertext,
-        "metadata": msg.metadata or {},
-        "timestamp": msg.timestamp.isoformat(),
-        "status": "sent",
-    }
+    # 🔔 REALTIME BROADCAST via Channels (+ per-user event log for resume)
+    payload = MessageEvent.from_model(msg)
 
     members = ConversationMember.objects.filter(conversation=conv)
-    for m in members:
-        async_to_sync(channel_layer.group_send)(
-            f"user_{m.user_id}",
-            {
-                "type": "chat.message",
-                "data": payload,
-            },
-        )
+    publish_to_users([m.user_id for m in members], payload)
 
-    return JsonResponse(
+    return respond(
+        request,
         {
             'success': True,
             'message_id': str(msg.id),
@@ -298,69 +369,60 @@ def messages_list_send(request, conv_id):
 
 
 # --------------------------------------------------------------------
-# Users list (proxy to auth server) + bot
+# Users list (local directory replica) + bot
 # --------------------------------------------------------------------
 @csrf_exempt
 @require_http_methods(['GET'])
 def user_list(request):
     user = introspect_token(request)
     if not user:
-        return JsonResponse(
+        return respond(
+            request,
             {'success': False, 'error': 'Authentication required'},
             status=401
         )
 
     search = request.GET.get('search', '')
-    page = request.GET.get('page', 1)
-    page_size = request.GET.get('page_size', 20)
+    cursor = request.GET.get('cursor', '')
+    try:
+        page_size = int(request.GET.get('page_size', 20))
+    except ValueError:
+        page_size = 20
+    page_size = max(1, min(page_size, USER_LIST_MAX_PAGE_SIZE))
 
+    # served from chat's own replica – no auth-server hop per keystroke
     try:
-        resp = requests.get(
-            AUTH_USERS_URL,
-            params={
-                'search': search,
-                'page': page,
-                'page_size': page_size,
-            },
-            headers={
-                'Authorization': request.META.get('HTTP_AUTHORIZATION', ''),
-            },
-            timeout=5,
-        )
-        if resp.status_code != 200:
-            return JsonResponse(
-                {'success': False, 'error': 'Auth server error'},
-                status=502
-            )
-        data = resp.json()
-    except Exception:
-        return JsonResponse(
-            {'success': False, 'error': 'Auth server unreachable'},
-            status=502
+        entries, next_cursor = directory.search(search, page_size, cursor)
+    except ValueError:
+        return respond(
+            request,
+            {'success': False, 'error': 'invalid cursor'},
+            status=400
         )
 
     results = []
-    for u in data.get('results', []):
+    for e in entries:
         results.append({
-            "id": str(u.get('id') or u.get('user_id')),
-            "username": u.get('username'),
+            "id": e.user_id,
+            "username": e.username,
+            "avatar": e.avatar,
             "is_bot": False,
         })
 
     # add chatbot entry only on first page & no search
-    if str(page) == '1' and not search:
+    if not cursor and not search:
         results.append({
             "id": "aibot",
             "username": "aibot",
             "is_bot": True,
         })
 
-    return JsonResponse({
+    return respond(request, {
         "success": True,
         "results": results,
-        "page": data.get('page', int(page)),
-        "page_size": data.get('page_size', int(page_size)),
-        "has_next": data.get('has_next', False),
+        "page_size": page_size,
+        "has_next": next_cursor is not None,
+        "next_cursor": next_cursor,
     })
 
 
@@ -372,7 +434,7 @@ def user_list(request):
 def conversation_add_member(request, conv_id):
     user = introspect_token(request)
     if not user:
-        return JsonResponse({'success': False, 'error': 'Authentication required'}, status=401)
+        return respond(request, {'success': False, 'error': 'Authentication required'}, status=401)
 
     conv = get_object_or_404(Conversation, id=conv_id)
 
@@ -386,33 +448,25 @@ def conversation_add_member(request, conv_id):
         Q(user_id=uid) | Q(username=uname) | Q(user_id=uname),
         is_admin=True
     ).exists():
-        return JsonResponse({'success': False, 'error': 'Admin required to add members'}, status=403)
+        return respond(request, {'success': False, 'error': 'Admin required to add members'}, status=403)
 
     try:
-        body = json.loads(request.body.decode() or "{}")
-    except Exception:
-        return JsonResponse({'success': False, 'error': 'Invalid JSON'}, status=400)
+        body = parse_body(request, AddMembersRequest)
+    except ValueError as e:
+        return respond(request, {'success': False, 'error': f'Invalid request body: {e}'}, status=400)
 
-    new_members = body.get('members', [])
-    if not new_members:
-        return JsonResponse({'success': False, 'error': 'members list required'}, status=400)
+    if not body.members:
+        return respond(request, {'success': False, 'error': 'members list required'}, status=400)
 
     added = []
+    refs = [participant_ref(m) for m in body.members]
+    known = display_names([mid for mid, _ in refs if mid])
 
-    for m in new_members:
-        if isinstance(m, dict):
-            mid = m.get('id') or m.get('user_id')
-            musername = m.get('username')
-        else:
-            mid = str(m)
-            musername = str(m)
-
+    for mid, musername in refs:
         if not mid:
             continue
 
-        mid = str(mid)
-        if not musername:
-            musername = f"user_{mid}"
+        musername = known.get(mid) or musername or f"user_{mid}"
 
         obj, created = ConversationMember.objects.get_or_create(
             conversation=conv,
@@ -422,7 +476,12 @@ def conversation_add_member(request, conv_id):
         if created:
             added.append(musername)
 
-    return JsonResponse({'success': True, 'added': added})
+    if added:
+        # a third member turns a 1-1 into a group
+        unpair(conv)
+        touch_conversation(conv.id)
+
+    return respond(request, {'success': True, 'added': added})
 
 
 # --------------------------------------------------------------------
@@ -433,7 +492,7 @@ def conversation_add_member(request, conv_id):
 def conversation_leave(request, conv_id):
     user = introspect_token(request)
     if not user:
-        return JsonResponse({'success': False, 'error': 'Authentication required'}, status=401)
+        return respond(request, {'success': False, 'error': 'Authentication required'}, status=401)
 
     conv = get_object_or_404(Conversation, id=conv_id)
 
@@ -445,8 +504,22 @@ def conversation_leave(request, conv_id):
     ).filter(
         Q(user_id=uid) | Q(username=uname) | Q(user_id=uname)
     ).delete()
+    touch_conversation(conv.id)
+
+    unpair(conv)
+
+    # group E2EE: the leaver still holds everyone's current sender keys
+    if conv.is_group:
+        SenderKeyEnvelope.objects.filter(conversation=conv).filter(
+            Q(sender_id=uid) | Q(recipient_id=uid)
+        ).delete()
+        remaining = ConversationMember.objects.filter(conversation=conv)
+        publish_to_users(
+            [m.user_id for m in remaining],
+            SenderKeysStaleEvent(conversationId=str(conv.id), removed_user_id=uid),
+        )
 
-    return JsonResponse({'success': True, 'message': 'left'})
+    return respond(request, {'success': True, 'message': 'left'})
 
 
 # --------------------------------------------------------------------
@@ -457,23 +530,31 @@ def conversation_leave(request, conv_id):
 def get_participants(request, conv_id):
     user = introspect_token(request)
     if not user:
-        return JsonResponse({'success': False, 'error': 'Authentication required'}, status=401)
+        return respond(request, {'success': False, 'error': 'Authentication required'}, status=401)
 
     conv = get_object_or_404(Conversation, id=conv_id)
 
     if not ensure_member(user, conv):
-        return JsonResponse({'success': False, 'error': 'Not a participant'}, status=403)
+        return respond(request, {'success': False, 'error': 'Not a participant'}, status=403)
 
     members = ConversationMember.objects.filter(conversation=conv)
-    data = [
-        {
-            'username': m.username,
-            'user_id': m.user_id,
-            'is_admin': m.is_admin
-        }
-        for m in members
-    ]
-    return JsonResponse({'success': True, 'members': data})
+    # one aggregate instead of the rows: joins / renames bump a row's
+    # updated_at, a leave drops the count (and touches the conversation)
+    stamp = members.aggregate(count=Count('id'), changed=Max('updated_at'))
+    etag = version_etag(conv.id, stamp['count'], stamp['changed'])
+    last_modified = max(filter(None, [conv.updated_at, stamp['changed']]))
+    cached = not_modified(request, etag, last_modified, cache='participants')
+    if cached:
+        return cached
+
+    data = [MemberOut.from_model(m) for m in members]
+    return respond(
+        request,
+        {'success': True, 'members': data},
+        etag=etag,
+        last_modified=last_modified,
+        cache='participants',
+    )
 
 
 # --------------------------------------------------------------------
@@ -484,18 +565,18 @@ def get_participants(request, conv_id):
 def create_group(request):
     user = introspect_token(request)
     if not user:
-        return JsonResponse({'success': False, 'error': 'Authentication required'}, status=401)
+        return respond(request, {'success': False, 'error': 'Authentication required'}, status=401)
 
     try:
-        body = json.loads(request.body.decode() or "{}")
-    except Exception:
-        return JsonResponse({'success': False, 'error': 'Invalid JSON'}, status=400)
+        body = parse_body(request, CreateGroupRequest)
+    except ValueError as e:
+        return respond(request, {'success': False, 'error': f'Invalid request body: {e}'}, status=400)
 
-    name = body.get('name')
-    members_payload = body.get('members', [])
+    name = body.name
 
-    if not name or not members_payload:
-        return JsonResponse(
+    if not name or not body.members:
+        return respond(
+            request,
             {'success': False, 'error': 'name and members are required'},
             status=400
         )
@@ -504,38 +585,30 @@ def create_group(request):
     uname = user['username']
 
     members_map = {uid: uname}  # current user always included
+    refs = [participant_ref(m) for m in body.members]
+    known = display_names([mid for mid, _ in refs if mid])
 
-    for m in members_payload:
-        if isinstance(m, dict):
-            mid = m.get('id') or m.get('user_id')
-            musername = m.get('username')
-        else:
-            mid = None
-            musername = str(m)
-
+    for mid, musername in refs:
         if not musername and not mid:
             continue
 
         if not mid:
             mid = musername
 
-        mid = str(mid)
         if mid == uid:
             continue
 
-        if not musername:
-            musername = f"user_{mid}"
+        musername = known.get(mid) or musername or f"user_{mid}"
 
         members_map[mid] = musername
 
     if len(members_map) < 2:
-        return JsonResponse(
+        return respond(
+            request,
             {'success': False, 'error': 'Need at least 2 members for group'},
             status=400
         )
 
-    channel_layer = get_channel_layer()
-
     with transaction.atomic():
         conv = Conversation.objects.create(
             is_group=True,
@@ -552,26 +625,10 @@ def create_group(request):
                 is_admin=(member_id == uid),
             )
 
-    payload = {
-        "type": "conversation_created",
-        "conversation": {
-            "id": str(conv.id),
-            "is_group": conv.is_group,
-            "name": conv.name,
-            "created_at": conv.created_at.isoformat(),
-        },
-    }
-
-    for member_id in members_map.keys():
-        async_to_sync(channel_layer.group_send)(
-            f"user_{member_id}",
-            {
-                "type": "chat.message",
-                "data": payload,
-            },
-        )
+    payload = ConversationCreatedEvent(conversation=ConversationOut.from_model(conv))
+    publish_to_users(members_map.keys(), payload)
 
-    return JsonResponse({'success': True, 'conversation_id': str(conv.id)}, status=201)
+    return respond(request, {'success': True, 'conversation_id': str(conv.id)}, status=201)
 
 
 # --------------------------------------------------------------------
@@ -582,7 +639,7 @@ def create_group(request):
 def add_bot_to_conversation(request, conv_id):
     user = introspect_token(request)
     if not user:
-        return JsonResponse({'success': False, 'error': 'Authentication required'}, status=401)
+        return respond(request, {'success': False, 'error': 'Authentication required'}, status=401)
 
     conv = get_object_or_404(Conversation, id=conv_id)
 
@@ -595,13 +652,298 @@ def add_bot_to_conversation(request, conv_id):
         Q(user_id=uid) | Q(username=uname) | Q(user_id=uname),
         is_admin=True
     ).exists():
-        return JsonResponse({'success': False, 'error': 'Admin required to add bot'}, status=403)
+        return respond(request, {'success': False, 'error': 'Admin required to add bot'}, status=403)
 
     bot_username = 'aibot'
-    ConversationMember.objects.get_or_create(
+    _, created = ConversationMember.objects.get_or_create(
         conversation=conv,
         user_id=bot_username,
         defaults={'username': bot_username}
     )
+    if created:
+        unpair(conv)
+        touch_conversation(conv.id)
+
+    return respond(request, {'success': True, 'bot_added': bot_username})
+
+
+# --------------------------------------------------------------------
+# Group E2EE sender keys
+# --------------------------------------------------------------------
+_ENVELOPE_COLUMNS = ('conversation', 'sender_id', 'key_id', 'recipient_id', 'envelope', 'created_at')
+
+
+def insert_envelopes(objs, batch_size=500):
+    """
+    INSERT ... ON CONFLICT DO NOTHING RETURNING recipient_id: the envelopes
+    of one (conversation, sender, key_id) upload that were actually new.
+    A re-upload of the same key is skipped and must not be re-announced.
+    """
+    qn = connection.ops.quote_name
+    fields = [SenderKeyEnvelope._meta.get_field(name) for name in _ENVELOPE_COLUMNS]
+    columns = ', '.join(qn(f.column) for f in fields)
+    row = '(' + ', '.join(['%s'] * len(fields)) + ')'
+
+    inserted = set()
+    for start in range(0, len(objs), batch_size):
+        chunk = objs[start:start + batch_size]
+        params = [f.get_db_prep_save(f.pre_save(obj, True), connection) for obj in chunk for f in fields]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {qn(SenderKeyEnvelope._meta.db_table)} ({columns}) "
+                f"VALUES {', '.join([row] * len(chunk))} "
+                f"ON CONFLICT DO NOTHING RETURNING {qn('recipient_id')}",
+                params,
+            )
+            inserted.update(r[0] for r in cursor.fetchall())
+    return [obj for obj in objs if obj.recipient_id in inserted]
+
+
+@csrf_exempt
+@require_http_methods(['POST'])
+def sender_key_upload(request, conv_id):
+    """
+    POST /chat/conversations/<conv_id>/sender-keys/
+    Body: { "key_id": 3, "envelopes": [ { "recipient_id": "42", "envelope": "<b64>" }, ... ] }
+
+    Called when the sender rotates its key or a member joins – not per
+    message. Each recipient also gets its envelope pushed as a
+    `sender_key` event.
+    """
+    user = introspect_token(request)
+    if not user:
+        return respond(request, {'success': False, 'error': 'Authentication required'}, status=401)
 
-    return JsonResponse({'success': True, 'bot_added': bot_username})
+    conv = get_object_or_404(Conversation, id=conv_id)
+
+    if not ensure_member(user, conv):
+        return respond(request, {'success': False, 'error': 'Not a participant'}, status=403)
+
+    try:
+        body = parse_body(request, UploadSenderKeyRequest)
+    except ValueError as e:
+        return respond(request, {'success': False, 'error': f'Invalid request body: {e}'}, status=400)
+
+    uid = str(user['id'])
+    envelopes = {str(e.recipient_id): e.envelope for e in body.envelopes if e.envelope}
+    envelopes.pop(uid, None)
+    if not envelopes:
+        return respond(request, {'success': False, 'error': 'envelopes required'}, status=400)
+
+    members = set(
+        ConversationMember.objects.filter(conversation=conv, user_id__in=list(envelopes))
+        .values_list('user_id', flat=True)
+    )
+    not_members = sorted(set(envelopes) - members)
+    if not_members:
+        return respond(
+            request,
+            {'success': False, 'error': 'Recipients are not members', 'user_ids': not_members},
+            status=400,
+        )
+
+    objs = [
+        SenderKeyEnvelope(
+            conversation=conv,
+            sender_id=uid,
+            key_id=body.key_id,
+            recipient_id=recipient_id,
+            envelope=envelope,
+        )
+        for recipient_id, envelope in envelopes.items()
+    ]
+    inserted = insert_envelopes(objs)
+
+    for obj in inserted:
+        publish_to_users([obj.recipient_id], SenderKeyEvent.from_model(obj))
+
+    return respond(request, {'success': True, 'key_id': body.key_id, 'recipients': len(inserted)}, status=201)
+
+
+@csrf_exempt
+@require_http_methods(['POST'])
+def sender_key_fetch(request, conv_id):
+    """
+    POST /chat/conversations/<conv_id>/sender-keys/fetch/
+    Body: { "keys": [ { "sender_id": "7", "key_id": 3 }, ... ] }
+
+    Bulk fetch of the envelopes addressed to the caller – typically the
+    (sender, key id) pairs of messages it can't decrypt yet. An empty list
+    returns the latest key of every sender (new device / just joined).
+    """
+    user = introspect_token(request)
+    if not user:
+        return respond(request, {'success': False, 'error': 'Authentication required'}, status=401)
+
+    conv = get_object_or_404(Conversation, id=conv_id)
+
+    if not ensure_member(user, conv):
+        return respond(request, {'success': False, 'error': 'Not a participant'}, status=403)
+
+    try:
+        body = parse_body(request, FetchSenderKeysRequest)
+    except ValueError as e:
+        return respond(request, {'success': False, 'error': f'Invalid request body: {e}'}, status=400)
+
+    if len(body.keys) > SENDER_KEY_FETCH_MAX:
+        return respond(
+            request,
+            {'success': False, 'error': f'At most {SENDER_KEY_FETCH_MAX} keys per request'},
+            status=400,
+        )
+
+    qs = SenderKeyEnvelope.objects.filter(conversation=conv, recipient_id=str(user['id']))
+
+    if body.keys:
+        wanted = Q()
+        for ref in body.keys:
+            wanted |= Q(sender_id=str(ref.sender_id), key_id=ref.key_id)
+        qs = qs.filter(wanted)
+    else:
+        # Postgres DISTINCT ON: newest upload per sender (key ids may restart
+        # when a client reinstalls, so upload time decides, key_id breaks ties)
+        qs = qs.order_by('sender_id', '-created_at', '-key_id').distinct('sender_id')
+
+    data = [SenderKeyEnvelopeOut.from_model(e) for e in qs]
+    found = {(e.sender_id, e.key_id) for e in data}
+    missing = [
+        {'sender_id': str(ref.sender_id), 'key_id': ref.key_id}
+        for ref in body.keys
+        if (str(ref.sender_id), ref.key_id) not in found
+    ]
+
+    return respond(request, {'success': True, 'envelopes': data, 'missing': missing})
+
+
+# --------------------------------------------------------------------
+# Mark conversation read (read watermark)
+# --------------------------------------------------------------------
+@csrf_exempt
+@require_http_methods(['POST'])
+def conversation_mark_read(request, conv_id):
+    user = introspect_token(request)
+    if not user:
+        return respond(request, {'success': False, 'error': 'Authentication required'}, status=401)
+
+    conv = get_object_or_404(Conversation, id=conv_id)
+
+    if not ensure_member(user, conv):
+        return respond(request, {'success': False, 'error': 'Not a participant'}, status=403)
+
+    uid = str(user['id'])
+    now = timezone.now()
+
+    # watermark only moves forward; only the reader's member row changes,
+    # so /sync/ ships a read watermark instead of the whole conversation
+    ConversationMember.objects.filter(
+        conversation=conv, user_id=uid
+    ).filter(
+        Q(last_read_at__isnull=True) | Q(last_read_at__lt=now)
+    ).update(last_read_at=now, updated_at=now)
+
+    return respond(request, {'success': True, 'last_read_at': now.isoformat()})
+
+
+# --------------------------------------------------------------------
+# Sync – deltas across all conversations + DMs in one request
+# --------------------------------------------------------------------
+@csrf_exempt
+@require_http_methods(['GET'])
+def sync(request):
+    """
+    GET /chat/sync/?since=<token>&limit=<per-conversation cap>
+
+    Without `since` this is a cold start: every conversation, the newest
+    `limit` messages of each, and all read watermarks. With `since` only
+    rows changed after the token are returned, plus the conversations the
+    user left / was removed from since then (`removed_conversations`).
+    The response carries a new `sync_token` for the next call; clients
+    dedupe rows by id.
+    """
+    user = introspect_token(request)
+    if not user:
+        return respond(request, {'success': False, 'error': 'Authentication required'}, status=401)
+
+    uid = str(user['id'])
+    uname = user['username']
+
+    try:
+        since = decode_sync_token(request.GET.get('since'))
+    except ValueError as e:
+        return respond(request, {'success': False, 'error': str(e)}, status=400)
+
+    try:
+        cap = int(request.GET.get('limit', SYNC_MESSAGES_PER_CONVERSATION))
+    except ValueError:
+        return respond(request, {'success': False, 'error': 'Invalid limit'}, status=400)
+    cap = max(1, min(cap, SYNC_MAX_MESSAGES_PER_CONVERSATION))
+
+    # token is taken before reading so nothing committed meanwhile is skipped
+    now = timezone.now()
+
+    conv_ids = list(
+        ConversationMember.objects.filter(member_q(uid, uname))
+        .values_list('conversation_id', flat=True)
+        .distinct()
+    )
+
+    # ---------- conversations (+ full member list = membership changes) ----------
+    convs = Conversation.objects.filter(id__in=conv_ids).prefetch_related('members')
+    if since:
+        convs = convs.filter(updated_at__gt=since)
+
+    conversations = [SyncConversationOut.from_model(c) for c in convs]
+
+    # ---------- messages (newest `cap` per conversation) ----------
+    messages = {
+        str(conv_id): MessagePage(current_sender_names([MessageOut.from_model(m) for m in rows]), has_more)
+        for conv_id, (rows, has_more) in get_message_store().latest(conv_ids, cap, since=since).items()
+    }
+
+    # ---------- read watermarks ----------
+    reads = ConversationMember.objects.filter(
+        conversation_id__in=conv_ids, last_read_at__isnull=False
+    )
+    if since:
+        reads = reads.filter(updated_at__gt=since)
+
+    read_watermarks = [ReadWatermarkOut.from_model(r) for r in reads]
+
+    # ---------- left / removed (a cold start simply doesn't list them) ----------
+    removed = []
+    if since:
+        removed = list(
+            MembershipTombstone.objects.filter(user_id__in={uid, uname}, removed_at__gt=since)
+            .exclude(conversation_id__in=conv_ids)  # re-added since
+            .values_list('conversation_id', flat=True)
+            .distinct()
+        )
+
+    # ---------- E2EE DMs ----------
+    dms = DMConversation.objects.filter(Q(user1_id=uid) | Q(user2_id=uid)).select_related('last_message')
+    dm_ids = list(dms.values_list('id', flat=True))
+    if since:
+        dms = dms.filter(updated_at__gt=since)
+
+    dm_conversations = [DMConversationOut.from_model(dm, uid) for dm in dms]
+
+    dm_msg_qs = DMMessage.objects.filter(conversation_id__in=dm_ids)
+    if since:
+        dm_msg_qs = dm_msg_qs.filter(timestamp__gt=since)
+
+    dm_messages = {
+        str(conv_id): DMMessagePage([DMMessageOut.from_model(m) for m in rows], has_more)
+        for conv_id, (rows, has_more) in latest_per_conversation(dm_msg_qs, cap).items()
+    }
+
+    return respond(request, {
+        'success': True,
+        'sync_token': encode_sync_token(now),
+        'full': since is None,
+        'conversations': conversations,
+        'messages': messages,
+        'read_watermarks': read_watermarks,
+        'removed_conversations': [str(c) for c in removed],
+        'dm_conversations': dm_conversations,
+        'dm_messages': dm_messages,
+    })
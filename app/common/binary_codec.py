@@ -0,0 +1,33 @@
+import base64
+import binascii
+
+
+_URLSAFE_TO_STANDARD = str.maketrans("-_", "+/")
+
+
+# ---------- base64 <-> bytes ----------
+def b64_to_bytes(value: str) -> bytes:
+    """
+    Decode a client-supplied base64 string (standard or urlsafe, padding
+    optional). Raises ValueError for anything that isn't base64.
+    """
+    if not isinstance(value, str) or not value:
+        raise ValueError("base64 string required")
+    value = value.strip()
+    padded = value + "=" * (-len(value) % 4)
+    if "-" in value or "_" in value:
+        if "+" in value or "/" in value:
+            raise ValueError("invalid base64")
+        # urlsafe goes through the same strict decoder: junk is rejected, not skipped
+        padded = padded.translate(_URLSAFE_TO_STANDARD)
+    try:
+        return base64.b64decode(padded, validate=True)
+    except (binascii.Error, ValueError):
+        raise ValueError("invalid base64")
+
+
+def bytes_to_b64(value) -> str:
+    """BinaryField values come back as memoryview on Postgres."""
+    if value is None:
+        return None
+    return base64.b64encode(bytes(value)).decode()
@@ -0,0 +1,40 @@
+"""
+Bloom-filter sizing and hashing, shared by the Redis-bitmap username
+registry (accounts/usernames.py) and the in-process token revocation
+filter (accounts/revocation.py).
+"""
+import hashlib
+import math
+
+
+def bloom_size(capacity, error_rate):
+    """(bits, hash count) for `capacity` items at `error_rate` false positives."""
+    bits = int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+    hashes = max(1, int(round(bits / capacity * math.log(2))))
+    return bits, hashes
+
+
+def bloom_offsets(value, bits, hashes):
+    # double hashing: k positions from two 64-bit halves of one digest
+    digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+    h1 = int.from_bytes(digest[:8], 'big')
+    h2 = int.from_bytes(digest[8:], 'big') | 1
+    return [(h1 + i * h2) % bits for i in range(hashes)]
+
+
+class BloomFilter:
+    """In-memory filter over a bytearray; add-only, no false negatives."""
+
+    def __init__(self, capacity, error_rate):
+        self.bits, self.hashes = bloom_size(capacity, error_rate)
+        self._array = bytearray((self.bits + 7) // 8)
+
+    def add(self, value):
+        for offset in bloom_offsets(value, self.bits, self.hashes):
+            self._array[offset >> 3] |= 1 << (offset & 7)
+
+    def __contains__(self, value):
+        return all(
+            self._array[offset >> 3] & (1 << (offset & 7))
+            for offset in bloom_offsets(value, self.bits, self.hashes)
+        )
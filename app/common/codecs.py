@@ -0,0 +1,243 @@
+"""Content-negotiated wire codecs (JSON default, MessagePack / CBOR opt-in)
+
+Payloads are msgspec Structs (see */schemas.py) or plain dicts/lists of
+them; msgspec does the JSON and MessagePack encode/decode + validation in
+one pass. CBOR goes through cbor2 when it is installed.
+
+Read endpoints can also answer conditionally: `version_etag` builds an
+ETag from cheap version inputs (ids, updated_at, counters) so the check
+runs before the body is loaded, `not_modified` turns a matching
+If-None-Match / If-Modified-Since into a 304, and `cache=` names the
+endpoint's Cache-Control policy (HTTP_CACHE_CONTROL in settings).
+"""
+import hashlib
+from datetime import datetime
+
+import msgspec
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date, parse_etags, parse_http_date_safe, quote_etag
+
+from .binary_codec import b64_to_bytes
+
+try:
+    import cbor2
+    CBOR_AVAILABLE = True
+except ImportError:
+    CBOR_AVAILABLE = False
+
+
+JSON = 'json'
+MSGPACK = 'msgpack'
+CBOR = 'cbor'
+
+CONTENT_TYPES = {
+    JSON: 'application/json',
+    MSGPACK: 'application/msgpack',
+    CBOR: 'application/cbor',
+}
+
+_MEDIA_TYPES = {
+    'application/json': JSON,
+    'application/msgpack': MSGPACK,
+    'application/x-msgpack': MSGPACK,
+    'application/vnd.msgpack': MSGPACK,
+    'application/cbor': CBOR,
+}
+
+
+def available(codec):
+    if codec == CBOR:
+        return CBOR_AVAILABLE
+    return codec in (JSON, MSGPACK)
+
+
+def _media_codec(media_type):
+    return _MEDIA_TYPES.get(media_type.split(';')[0].strip().lower())
+
+
+# ---------- binary request fields ----------
+class Base64Bytes(bytes):
+    """
+    Binary field of a request schema. MessagePack / CBOR carry it raw; in
+    JSON it is base64 – standard or urlsafe, padding optional (msgspec's
+    own `bytes` only takes padded standard base64).
+    """
+
+
+def _dec_hook(type_, obj):
+    if type_ is Base64Bytes:
+        if isinstance(obj, (bytes, bytearray, memoryview)):
+            return Base64Bytes(obj)
+        if isinstance(obj, str):
+            # ValueError from b64_to_bytes surfaces as a ValidationError
+            return Base64Bytes(b64_to_bytes(obj)) if obj else Base64Bytes()
+        raise TypeError(f'Expected base64 str or bytes, got {type(obj).__name__}')
+    raise NotImplementedError
+
+
+def _enc_hook(obj):
+    if isinstance(obj, bytes):
+        return bytes(obj)
+    raise NotImplementedError
+
+
+# ---------- encode / decode ----------
+_json_encoder = msgspec.json.Encoder(enc_hook=_enc_hook)
+_msgpack_encoder = msgspec.msgpack.Encoder(enc_hook=_enc_hook)
+
+
+def encode(codec, data) -> bytes:
+    """bytes fields go out raw in MessagePack / CBOR and base64 in JSON."""
+    if codec == MSGPACK:
+        return _msgpack_encoder.encode(data)
+    if codec == CBOR:
+        return cbor2.dumps(msgspec.to_builtins(data, builtin_types=(bytes,), enc_hook=_enc_hook))
+    return _json_encoder.encode(data)
+
+
+def decode(codec, raw: bytes, schema=None):
+    """
+    Decode (and, with `schema`, validate into that Struct type).
+    Raises ValueError with msgspec's message for malformed / invalid bodies.
+    """
+    try:
+        if codec == MSGPACK:
+            return msgspec.msgpack.decode(raw, type=schema, dec_hook=_dec_hook) if schema else msgspec.msgpack.decode(raw)
+        if codec == CBOR:
+            obj = cbor2.loads(raw)
+            return msgspec.convert(obj, schema, dec_hook=_dec_hook) if schema else obj
+        return msgspec.json.decode(raw, type=schema, dec_hook=_dec_hook) if schema else msgspec.json.decode(raw)
+    except msgspec.MsgspecError as e:
+        raise ValueError(str(e))
+    except ValueError:
+        raise
+    except Exception as e:
+        raise ValueError(str(e))
+
+
+def to_payload(data):
+    """Struct -> plain JSON-safe dict (event log, channel layer)."""
+    return msgspec.to_builtins(data, enc_hook=_enc_hook)
+
+
+# ---------- HTTP negotiation ----------
+def negotiate(request):
+    """
+    Pick the response codec from the Accept header (q-values honoured).
+    Falls back to JSON when nothing binary is asked for or installed.
+    """
+    accept = request.META.get('HTTP_ACCEPT', '')
+    best, best_q = JSON, -1.0
+    for part in accept.split(','):
+        media, _, params = part.partition(';')
+        codec = _media_codec(media)
+        if not codec or not available(codec):
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if q <= 0:
+            # q=0 means "not acceptable", never a fallback choice
+            continue
+        if q > best_q:
+            best, best_q = codec, q
+    return best
+
+
+def parse_body(request, schema=None):
+    """
+    Decode the request body according to its Content-Type. An empty body
+    decodes as `{}` (so a schema with all-default fields validates).
+    Raises ValueError for malformed, invalid or unsupported bodies.
+    """
+    codec = _media_codec(request.META.get('CONTENT_TYPE', '') or '') or JSON
+    if not available(codec):
+        raise ValueError(f'{codec} not supported')
+    raw = request.body
+    if not raw:
+        return msgspec.convert({}, schema, dec_hook=_dec_hook) if schema else {}
+    return decode(codec, raw, schema)
+
+
+# ---------- conditional requests / caching ----------
+# Cache-Control per endpoint; settings.HTTP_CACHE_CONTROL overrides by name
+CACHE_POLICIES = {
+    'profile': 'private, no-cache',
+    'participants': 'private, no-cache',
+    'identity': 'public, no-cache',
+    'history': 'private, no-cache',
+    # messages behind a settled cursor never change; the sender names
+    # overlaid on them are in the ETag, so shared caches keep the page
+    # (per token, see CACHE_VARY) and revalidate it cheaply
+    'history_page': 'public, no-cache',
+}
+# extra Vary per policy: public responses to authenticated requests
+# must not be shared across users
+CACHE_VARY = {
+    'history_page': ('Authorization',),
+}
+
+
+def cache_policy(name):
+    overrides = getattr(settings, 'HTTP_CACHE_CONTROL', None) or {}
+    return overrides.get(name, CACHE_POLICIES.get(name))
+
+
+def version_etag(*parts):
+    """Opaque ETag from version inputs – never from the body itself."""
+    h = hashlib.blake2b(digest_size=12)
+    for part in parts:
+        if isinstance(part, datetime):
+            part = part.isoformat()
+        h.update(f'{part};'.encode())
+    return h.hexdigest()
+
+
+def _conditional_headers(response, codec, etag, last_modified, cache):
+    if etag:
+        # Same data, different codec -> different representation
+        response['ETag'] = quote_etag(f'{etag}-{codec}')
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    policy = cache_policy(cache) if cache else None
+    if policy:
+        response['Cache-Control'] = policy
+    patch_vary_headers(response, ('Accept', *CACHE_VARY.get(cache, ())))
+    return response
+
+
+def respond(request, data, status=200, etag=None, last_modified=None, cache=None):
+    """JSON by default, MessagePack / CBOR when negotiated."""
+    codec = negotiate(request)
+    response = HttpResponse(encode(codec, data), status=status, content_type=CONTENT_TYPES[codec])
+    return _conditional_headers(response, codec, etag, last_modified, cache)
+
+
+def not_modified(request, etag, last_modified=None, cache=None):
+    """
+    304 response if If-None-Match already names this representation (or,
+    without If-None-Match, If-Modified-Since is not older than
+    `last_modified`), else None. Works for POST lookups too (Django's own
+    helper would 412).
+    """
+    codec = negotiate(request)
+    tag = quote_etag(f'{etag}-{codec}')
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if header:
+        tags = parse_etags(header)
+        if '*' not in tags and tag not in tags and f'W/{tag}' not in tags:
+            return None
+    elif last_modified is not None:
+        since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE') or '')
+        if since is None or int(last_modified.timestamp()) > since:
+            return None
+    else:
+        return None
+    return _conditional_headers(HttpResponse(status=304), codec, etag, last_modified, cache)
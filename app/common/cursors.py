@@ -0,0 +1,34 @@
+"""
+Opaque keyset cursors: (sort value, tiebreaker id) packed into urlsafe base64.
+
+Lists sorted by a timestamp (or any scalar) + a unique id page with
+`WHERE (sort, id) < (cursor.sort, cursor.id)`, so a page is one index range
+scan no matter how deep the client scrolls.
+"""
+import base64
+import json
+from datetime import datetime
+
+
+def encode_cursor(value, tiebreak) -> str:
+    if isinstance(value, datetime):
+        value = {'t': value.isoformat()}
+    raw = json.dumps([value, str(tiebreak)], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Returns (value, tiebreak) or None for an empty cursor.
+    Raises ValueError on a malformed cursor.
+    """
+    if not cursor:
+        return None
+    padded = cursor + '=' * (-len(cursor) % 4)
+    try:
+        value, tiebreak = json.loads(base64.urlsafe_b64decode(padded))
+        if isinstance(value, dict):
+            value = datetime.fromisoformat(value['t'])
+    except Exception:
+        raise ValueError('invalid cursor')
+    return value, tiebreak
@@ -0,0 +1,78 @@
+"""
+Shared E2EE identity-key directory: one Redis hash, user_id -> public key.
+
+secure_dm.E2EEIdentity is the source of truth; the hash fronts it so a
+batch lookup is a single HMGET. Both write paths call store_identity():
+POST /e2ee/identity/ writes E2EEIdentity itself; the older
+POST /accounts/me/public-key/ writes User.public_key and publishes a
+`user.public_key` directory event that chat's sync_user_directory mirrors
+into E2EEIdentity. `manage.py sync_identity_keys` (chat) rebuilds the
+hash from the table.
+"""
+import hashlib
+
+from common.redis_service import redis_client
+
+
+IDENTITY_HASH = "e2ee:identities"
+
+
+def key_etag(public_key: str) -> str:
+    return hashlib.sha1(public_key.encode()).hexdigest()[:16]
+
+
+def keys_etag(keys: dict) -> str:
+    """Stable ETag for a {user_id: public_key} result set (missing ids included)."""
+    h = hashlib.sha1()
+    for user_id in sorted(keys):
+        h.update(f"{user_id}={key_etag(keys[user_id]) if keys[user_id] else '-'};".encode())
+    return h.hexdigest()[:24]
+
+
+def store_identity(user_id, public_key):
+    """Write-through on register – replaces whatever the directory had."""
+    try:
+        redis_client.hset(IDENTITY_HASH, str(user_id), public_key)
+    except Exception:
+        pass
+
+
+def seed_identities(mapping, overwrite=False):
+    """Bulk fill; by default only ids the directory doesn't know yet."""
+    if not mapping:
+        return
+    try:
+        if overwrite:
+            redis_client.hset(IDENTITY_HASH, mapping=mapping)
+        else:
+            pipe = redis_client.pipeline()
+            for user_id, public_key in mapping.items():
+                pipe.hsetnx(IDENTITY_HASH, user_id, public_key)
+            pipe.execute()
+    except Exception:
+        pass
+
+
+def get_identities(user_ids, load_missing):
+    """
+    {user_id: public_key} for every id that has a key.
+
+    Cache misses are handed to `load_missing(ids) -> {id: key}` in one call
+    and written back (HSETNX, so a concurrent register always wins).
+    """
+    ids = [str(u) for u in dict.fromkeys(user_ids)]
+    if not ids:
+        return {}
+
+    try:
+        cached = redis_client.hmget(IDENTITY_HASH, ids)
+    except Exception:
+        cached = [None] * len(ids)
+
+    keys = {user_id: key for user_id, key in zip(ids, cached) if key}
+    missing = [user_id for user_id in ids if user_id not in keys]
+    if missing:
+        loaded = load_missing(missing)
+        seed_identities(loaded)
+        keys.update(loaded)
+    return keys
@@ -0,0 +1,51 @@
+"""
+Path-scoped sessions and CSRF for the stateless JWT API.
+
+With API_STATELESS on, only paths under SESSION_PATH_PREFIXES (default
+/admin/) get a real session and CSRF protection. Every other request gets
+an empty session object that is never loaded or saved, so
+AuthenticationMiddleware resolves it to AnonymousUser without a query.
+API clients authenticate with the Bearer JWT instead.
+"""
+from django.conf import settings
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.middleware.csrf import CsrfViewMiddleware
+
+
+API_STATELESS = getattr(settings, 'API_STATELESS', True)
+SESSION_PATH_PREFIXES = tuple(getattr(settings, 'SESSION_PATH_PREFIXES', ('/admin/',)))
+
+
+def uses_session(request):
+    return not API_STATELESS or request.path_info.startswith(SESSION_PATH_PREFIXES)
+
+
+class PathScopedSessionMiddleware(SessionMiddleware):
+    def process_request(self, request):
+        if uses_session(request):
+            return super().process_request(request)
+        # no session key -> nothing is ever read from the session store
+        request.session = self.SessionStore(None)
+
+    def process_response(self, request, response):
+        if uses_session(request):
+            return super().process_response(request, response)
+        return response
+
+
+class PathScopedCsrfViewMiddleware(CsrfViewMiddleware):
+    # Bearer tokens aren't sent automatically by browsers, so the API has
+    # nothing for CSRF to protect
+    def process_request(self, request):
+        if uses_session(request):
+            return super().process_request(request)
+
+    def process_view(self, request, callback, callback_args, callback_kwargs):
+        if uses_session(request):
+            return super().process_view(request, callback, callback_args, callback_kwargs)
+        return None
+
+    def process_response(self, request, response):
+        if uses_session(request):
+            return super().process_response(request, response)
+        return response
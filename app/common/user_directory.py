@@ -0,0 +1,78 @@
+"""
+User-directory change feed: accounts -> chat.
+
+Accounts appends one entry per User change to a capped Redis stream; chat
+replays it into its own replica (chat.directory). Entries are full
+snapshots of the public fields, so applying one twice, or out of a
+resync, is harmless.
+"""
+from django.conf import settings
+
+from common.redis_service import redis_client
+
+
+DIRECTORY_STREAM = "directory:users"
+DIRECTORY_STREAM_MAXLEN = getattr(settings, "USER_DIRECTORY_STREAM_MAXLEN", 200000)
+
+USER_UPSERT = "user.upsert"
+USER_DELETED = "user.deleted"
+# upsert + old_username: chat rewrites its denormalized name copies
+USER_RENAMED = "user.renamed"
+# POST /accounts/me/public-key/ – chat mirrors it into secure_dm.E2EEIdentity.
+# Its own event, so a later username snapshot never carries a stale key over
+# one registered through /e2ee/identity/
+USER_PUBLIC_KEY = "user.public_key"
+
+
+def user_event(user):
+    return {
+        "type": USER_UPSERT,
+        "id": str(user.pk),
+        "username": user.username or "",
+        # accounts owns normalization (accounts.search) – replicas just copy it
+        "username_normalized": user.username_normalized or "",
+        "avatar": user.profile_image or "",
+    }
+
+
+def publish(events):
+    """XADD a batch of events; returns the last stream id (None if Redis is down)."""
+    if not events:
+        return None
+    try:
+        pipe = redis_client.pipeline()
+        for event in events:
+            pipe.xadd(DIRECTORY_STREAM, event, maxlen=DIRECTORY_STREAM_MAXLEN, approximate=True)
+        return pipe.execute()[-1]
+    except Exception:
+        return None
+
+
+def publish_user(user):
+    return publish([user_event(user)])
+
+
+def publish_user_renamed(user, old_username):
+    event = user_event(user)
+    event["type"] = USER_RENAMED
+    event["old_username"] = old_username or ""
+    return publish([event])
+
+
+def publish_public_key(user):
+    return publish([{"type": USER_PUBLIC_KEY, "id": str(user.pk), "public_key": user.public_key or ""}])
+
+
+def publish_user_deleted(user_id):
+    return publish([{"type": USER_DELETED, "id": str(user_id)}])
+
+
+def read_changes(after_id="0-0", count=1000):
+    """[(stream_id, event), ...] strictly after `after_id`, oldest first."""
+    return redis_client.xrange(DIRECTORY_STREAM, min=f"({after_id}", count=count)
+
+
+def oldest_change_id():
+    """Id of the oldest retained entry, or None for an empty / missing stream."""
+    first = redis_client.xrange(DIRECTORY_STREAM, count=1)
+    return first[0][0] if first else None
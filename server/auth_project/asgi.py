@@ -0,0 +1,21 @@
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'auth_project.settings')
+
+# Django setup pehle, phir routing import (consumers models use karte hai)
+django_asgi_app = get_asgi_application()
+
+from channels.routing import ProtocolTypeRouter, URLRouter
+
+from chat.directory import directory
+from chat.routing import websocket_urlpatterns
+
+# user directory background me load – pehli search request pe wait nahi
+directory.warm()
+
+application = ProtocolTypeRouter({
+    "http": django_asgi_app,
+    "websocket": URLRouter(websocket_urlpatterns),
+})
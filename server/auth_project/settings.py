@@ -25,6 +25,7 @@ DEBUG = os.getenv('DEBUG', 'True') == 'True'
 ALLOWED_HOSTS = os.getenv('ALLOWED_HOSTS', '127.0.0.1,localhost').split(',')
 
 INSTALLED_APPS = [
+    'daphne',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -34,8 +35,10 @@ INSTALLED_APPS = [
     'rest_framework',
     "rest_framework_simplejwt",
     'corsheaders',
+    'channels',
     'accounts',
     'chat',
+    'chat.secure_dm',
     'common',
     'django_rq',
     'django_celery_results',
@@ -44,9 +47,10 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    # sessions + CSRF only under SESSION_PATH_PREFIXES when API_STATELESS is on
+    'common.middleware.PathScopedSessionMiddleware',
     'django.middleware.common.CommonMiddleware',
-    'django.middleware.csrf.CsrfViewMiddleware',
+    'common.middleware.PathScopedCsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
@@ -71,6 +75,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'auth_project.wsgi.application'
+ASGI_APPLICATION = 'auth_project.asgi.application'
 
 DATABASES = {
     "default": {
@@ -110,6 +115,121 @@ CELERY_TASK_SERIALIZER = "json"
 CELERY_RESULT_SERIALIZER = "json"
 CELERY_TIMEZONE = "UTC"
 
+# Channels layer (realtime). Comma-separated CHANNEL_REDIS_URLS shards
+# channels and groups across hosts by consistent hashing; every worker
+# process must use the same list in the same order.
+CHANNEL_REDIS_URLS = [
+    url.strip()
+    for url in os.getenv("CHANNEL_REDIS_URLS", REDIS_URL or "redis://127.0.0.1:6379/1").split(",")
+    if url.strip()
+]
+
+CHANNEL_LAYERS = {
+    "default": {
+        "BACKEND": "channels_redis.core.RedisChannelLayer",
+        "CONFIG": {
+            "hosts": CHANNEL_REDIS_URLS,
+            "prefix": os.getenv("CHANNEL_LAYER_PREFIX", "asgi"),
+            # messages per channel before ChannelFull; consumers drain into
+            # their own bounded outbound queue so this stays small
+            "capacity": int(os.getenv("CHANNEL_LAYER_CAPACITY", 500)),
+            # undelivered message lifetime (s) – stale realtime events are useless,
+            # clients catch up via the event stream instead
+            "expiry": int(os.getenv("CHANNEL_LAYER_EXPIRY", 30)),
+            # group membership lifetime (s); longer than the longest socket
+            "group_expiry": int(os.getenv("CHANNEL_LAYER_GROUP_EXPIRY", 86400)),
+        },
+    },
+}
+
+# Chat realtime: bounded per-user event log (Redis Streams) for resume-on-reconnect
+CHAT_EVENT_STREAM_MAXLEN = int(os.getenv("CHAT_EVENT_STREAM_MAXLEN", 1000))
+CHAT_EVENT_STREAM_TTL = int(os.getenv("CHAT_EVENT_STREAM_TTL", 86400))
+
+# Chat WebSocket outbound queues (per connection) + slow-consumer policy
+CHAT_WS_QUEUE_SIZE = int(os.getenv("CHAT_WS_QUEUE_SIZE", 256))
+# cap on events merged into one `batch` frame when a full queue coalesces
+CHAT_WS_COALESCE_MAX_EVENTS = int(os.getenv("CHAT_WS_COALESCE_MAX_EVENTS", 100))
+CHAT_WS_EPHEMERAL_TYPES = os.getenv("CHAT_WS_EPHEMERAL_TYPES", "typing,presence").split(",")
+CHAT_WS_COALESCE_TYPES = os.getenv("CHAT_WS_COALESCE_TYPES", "message,e2ee_message").split(",")
+CHAT_WS_OVERFLOW_POLICY = os.getenv("CHAT_WS_OVERFLOW_POLICY", "disconnect")  # or "drop_oldest"
+CHAT_WS_STATS_FLUSH_INTERVAL = int(os.getenv("CHAT_WS_STATS_FLUSH_INTERVAL", 10))
+# Opt-in multi-event frames (clients connect with ?batch=1)
+CHAT_WS_BATCH_WINDOW_MS = int(os.getenv("CHAT_WS_BATCH_WINDOW_MS", 5))
+CHAT_WS_BATCH_MAX_WINDOW_MS = int(os.getenv("CHAT_WS_BATCH_MAX_WINDOW_MS", 50))
+CHAT_WS_BATCH_MAX_EVENTS = int(os.getenv("CHAT_WS_BATCH_MAX_EVENTS", 50))
+
+# Chat /sync/ endpoint
+CHAT_SYNC_MESSAGES_PER_CONVERSATION = int(os.getenv("CHAT_SYNC_MESSAGES_PER_CONVERSATION", 50))
+CHAT_SYNC_TOKEN_OVERLAP_SECONDS = int(os.getenv("CHAT_SYNC_TOKEN_OVERLAP_SECONDS", 2))
+
+# Group E2EE sender keys (POST .../sender-keys/fetch/)
+CHAT_SENDER_KEY_FETCH_MAX = int(os.getenv("CHAT_SENDER_KEY_FETCH_MAX", 500))
+
+# Chat message history backend: "postgres" (Message table) or "mongo" (bucketed documents)
+CHAT_MESSAGE_STORE = os.getenv("CHAT_MESSAGE_STORE", "postgres")
+CHAT_MONGO_BUCKET_SECONDS = int(os.getenv("CHAT_MONGO_BUCKET_SECONDS", 3600))
+CHAT_MONGO_BUCKET_MAX_MESSAGES = int(os.getenv("CHAT_MONGO_BUCKET_MAX_MESSAGES", 200))
+
+# Community / group / room listings (Mongo) – cached pages, invalidated on structural writes
+CHAT_COMMUNITY_LISTING_CACHE_TTL = int(os.getenv("CHAT_COMMUNITY_LISTING_CACHE_TTL", 30))
+
+# Message archival (manage.py archive_messages): zstd NDJSON segments on local disk or S3/R2
+CHAT_ARCHIVE_STORAGE = os.getenv("CHAT_ARCHIVE_STORAGE", "local")  # or "s3"
+CHAT_ARCHIVE_DIR = os.getenv("CHAT_ARCHIVE_DIR", str(BASE_DIR / "archive"))
+CHAT_ARCHIVE_BUCKET = os.getenv("CHAT_ARCHIVE_BUCKET")
+CHAT_ARCHIVE_AFTER_DAYS = int(os.getenv("CHAT_ARCHIVE_AFTER_DAYS", 180))
+
+# User-directory feed (accounts -> chat replica; manage.py sync_user_directory)
+USER_DIRECTORY_STREAM_MAXLEN = int(os.getenv("USER_DIRECTORY_STREAM_MAXLEN", 200000))
+CHAT_USER_DIRECTORY_REFRESH_SECONDS = float(os.getenv("CHAT_USER_DIRECTORY_REFRESH_SECONDS", 1.0))
+# Username-change propagation to chat's denormalized copies (same worker)
+CHAT_RENAME_BATCH_SIZE = int(os.getenv("CHAT_RENAME_BATCH_SIZE", 500))
+CHAT_RENAME_ROWS_PER_SECOND = int(os.getenv("CHAT_RENAME_ROWS_PER_SECOND", 5000))
+
+# Username availability Bloom filter (Redis bitmap; manage.py sync_username_registry)
+USERNAME_BLOOM_CAPACITY = int(os.getenv("USERNAME_BLOOM_CAPACITY", 2_000_000))
+USERNAME_BLOOM_ERROR_RATE = float(os.getenv("USERNAME_BLOOM_ERROR_RATE", 0.001))
+
+# Google sign-in: ID tokens verified against Google's cached signing keys
+GOOGLE_OAUTH_CLIENT_IDS = [c for c in os.getenv("GOOGLE_OAUTH_CLIENT_IDS", "").split(",") if c]
+GOOGLE_OAUTH_CERTS_URL = os.getenv("GOOGLE_OAUTH_CERTS_URL", "https://www.googleapis.com/oauth2/v3/certs")
+# DEBUG only: PEM path of a local stand-in issuer (tests/test_google_login.py)
+GOOGLE_ID_TOKEN_LOCAL_KEY = os.getenv("GOOGLE_ID_TOKEN_LOCAL_KEY")
+
+# Stateless JWT API: sessions / CSRF only for these path prefixes (common/middleware.py)
+API_STATELESS = os.getenv("API_STATELESS", "1") == "1"
+SESSION_PATH_PREFIXES = [p for p in os.getenv("SESSION_PATH_PREFIXES", "/admin/").split(",") if p]
+
+# JWT revocation (accounts/revocation.py): Redis set + per-process Bloom filter via pub/sub
+JWT_REVOCATION_BLOOM_CAPACITY = int(os.getenv("JWT_REVOCATION_BLOOM_CAPACITY", 200000))
+JWT_REVOCATION_BLOOM_ERROR_RATE = float(os.getenv("JWT_REVOCATION_BLOOM_ERROR_RATE", 0.001))
+JWT_REVOCATION_REBUILD_INTERVAL = int(os.getenv("JWT_REVOCATION_REBUILD_INTERVAL", 3600))
+
+# Cache-Control overrides per read endpoint; defaults live in
+# common/codecs.py CACHE_POLICIES. ETag / Last-Modified always sent
+HTTP_CACHE_CONTROL = {
+    name: os.environ[var]
+    for name, var in (
+        ("profile", "CACHE_CONTROL_PROFILE"),
+        ("participants", "CACHE_CONTROL_PARTICIPANTS"),
+        ("identity", "CACHE_CONTROL_IDENTITY"),
+        ("history", "CACHE_CONTROL_HISTORY"),
+        ("history_page", "CACHE_CONTROL_HISTORY_PAGE"),
+    )
+    if os.getenv(var)
+}
+
+# E2EE identity lookups (POST /e2ee/identity/batch/)
+E2EE_IDENTITY_BATCH_MAX = int(os.getenv("E2EE_IDENTITY_BATCH_MAX", 500))
+
+# E2EE prekeys
+E2EE_PREKEY_UPLOAD_MAX = int(os.getenv("E2EE_PREKEY_UPLOAD_MAX", 1000))
+E2EE_PREKEY_LOW_WATERMARK = int(os.getenv("E2EE_PREKEY_LOW_WATERMARK", 20))
+E2EE_PREKEY_NOTIFY_INTERVAL = int(os.getenv("E2EE_PREKEY_NOTIFY_INTERVAL", 300))
+E2EE_PREKEY_CLAIM_LIMIT = int(os.getenv("E2EE_PREKEY_CLAIM_LIMIT", 30))
+E2EE_SIGNED_PREKEYS_KEPT = int(os.getenv("E2EE_SIGNED_PREKEYS_KEPT", 2))
+
 AUTH_PASSWORD_VALIDATORS = []
 
 LANGUAGE_CODE = 'en-us'
@@ -138,14 +258,12 @@ AUTHENTICATION_BACKENDS = [
 REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
-    'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.SessionAuthentication',
-    ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
+    # JWT only – the API never reads the session; revocation checked in memory
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.RevocationAwareJWTAuthentication',
     ),
 }
 
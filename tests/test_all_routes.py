@@ -98,6 +98,24 @@ def test_auth_routes():
     except Exception as e:
         print_result("POST /accounts/token/refresh/", False, str(e))
     
+    # 4b. Refresh token reuse – a spent refresh token is rejected and its family revoked
+    try:
+        r = requests.post(f"{BASE_URL}/accounts/login/",
+                          json={"username": test_username, "password": test_password})
+        first = r.json()['tokens']['refresh']
+        r = requests.post(f"{BASE_URL}/accounts/token/refresh/", json={"refresh": first})
+        rotated = r.json()['tokens']['refresh']
+        reuse = requests.post(f"{BASE_URL}/accounts/token/refresh/", json={"refresh": first})
+        passed = r.status_code == 200 and reuse.status_code == 401
+        print_result("POST /accounts/token/refresh/ (same token twice -> 401)", passed,
+                     f"Statuses: {r.status_code}, {reuse.status_code}")
+
+        r = requests.post(f"{BASE_URL}/accounts/token/refresh/", json={"refresh": rotated})
+        passed = r.status_code == 401
+        print_result("POST /accounts/token/refresh/ (family revoked after reuse)", passed, f"Status: {r.status_code}")
+    except Exception as e:
+        print_result("POST /accounts/token/refresh/ (reuse)", False, str(e))
+
     # 5. Token Verify
     try:
         data = {"token": test_access_token}
@@ -119,7 +137,18 @@ def test_auth_routes():
             print(f"       Response: {r.text[:300]}")
     except Exception as e:
         print_result("GET /accounts/me/ (authenticated)", False, str(e))
-    
+
+    # 6b. Conditional profile fetch (unchanged -> 304)
+    try:
+        headers = {"Authorization": f"Bearer {test_access_token}"}
+        r = requests.get(f"{BASE_URL}/accounts/me/", headers=headers)
+        headers["If-None-Match"] = r.headers.get("ETag", "")
+        r = requests.get(f"{BASE_URL}/accounts/me/", headers=headers)
+        passed = r.status_code == 304 and not r.content
+        print_result("GET /accounts/me/ (If-None-Match)", passed, f"Status: {r.status_code}")
+    except Exception as e:
+        print_result("GET /accounts/me/ (If-None-Match)", False, str(e))
+
     # 7. Register Public Key
     try:
         headers = {"Authorization": f"Bearer {test_access_token}"}
@@ -132,12 +161,25 @@ def test_auth_routes():
     
     # 8. Send Registration OTP
     try:
-        data = {"email": f"newuser{int(time.time())}@example.com", "mobile_number": "+1111111111"}
+        data = {
+            "email": f"newuser{int(time.time())}@example.com",
+            "username": f"newuser{int(time.time())}",
+            "mobile_number": "+1111111111",
+        }
         r = requests.post(f"{BASE_URL}/accounts/register/send-otp/", json=data)
         passed = r.status_code == 200 and r.json().get('success') == True
         print_result("POST /accounts/register/send-otp/", passed, f"Status: {r.status_code}")
     except Exception as e:
         print_result("POST /accounts/register/send-otp/", False, str(e))
+
+    # 8b. Send Registration OTP – missing fields is a 400, not a 500
+    try:
+        data = {"email": f"newuser{int(time.time())}@example.com"}
+        r = requests.post(f"{BASE_URL}/accounts/register/send-otp/", json=data)
+        passed = r.status_code == 400 and r.json().get('success') == False
+        print_result("POST /accounts/register/send-otp/ (missing fields -> 400)", passed, f"Status: {r.status_code}")
+    except Exception as e:
+        print_result("POST /accounts/register/send-otp/ (missing fields -> 400)", False, str(e))
     
     # 9. Password Reset Request
     try:
@@ -147,7 +189,17 @@ def test_auth_routes():
         print_result("POST /accounts/password-reset/request/", passed, f"Status: {r.status_code}")
     except Exception as e:
         print_result("POST /accounts/password-reset/request/", False, str(e))
-    
+
+    # 9b. Password Reset Request – 5 per 10 min per email, then 429
+    try:
+        data = {"email": f"ratelimit{int(time.time())}@example.com"}
+        codes = [requests.post(f"{BASE_URL}/accounts/password-reset/request/", json=data).status_code
+                 for _ in range(6)]
+        passed = codes[:5] == [200] * 5 and codes[5] == 429
+        print_result("POST /accounts/password-reset/request/ (rate limit -> 429)", passed, f"Statuses: {codes}")
+    except Exception as e:
+        print_result("POST /accounts/password-reset/request/ (rate limit -> 429)", False, str(e))
+
     # 10. Google Login (stub endpoint)
     try:
         data = {"id_token": "fake_token"}
@@ -158,6 +210,22 @@ def test_auth_routes():
     except Exception as e:
         print_result("POST /accounts/google-login/", False, str(e))
 
+    # 11. Logout revokes the access token of the same login
+    try:
+        r = requests.post(f"{BASE_URL}/accounts/login/",
+                          json={"username": test_username, "password": test_password})
+        tokens = r.json()['tokens']
+        r = requests.post(f"{BASE_URL}/accounts/logout/", json={"refresh": tokens['refresh']})
+        logged_out = r.status_code == 200
+        verify = requests.post(f"{BASE_URL}/accounts/token/verify/", json={"token": tokens['access']})
+        me = requests.get(f"{BASE_URL}/accounts/me/",
+                          headers={"Authorization": f"Bearer {tokens['access']}"})
+        passed = logged_out and verify.status_code == 401 and me.status_code == 401
+        print_result("POST /accounts/logout/ (access token revoked)", passed,
+                     f"Statuses: logout {r.status_code}, verify {verify.status_code}, me {me.status_code}")
+    except Exception as e:
+        print_result("POST /accounts/logout/ (access token revoked)", False, str(e))
+
 def test_chat_routes():
     """Test chat service routes"""
     print_section("TESTING CHAT SERVICE ROUTES")
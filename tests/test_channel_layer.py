@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+"""
+Multi-process channel-layer check: consumers in separate worker processes
+join the same group, a third process does group_send, and every worker
+must receive the event. Uses CHANNEL_LAYERS from auth_project.settings,
+so it exercises the real Redis (optionally sharded) configuration.
+
+Needs Redis reachable at CHANNEL_REDIS_URLS / REDIS_URL.
+"""
+import asyncio
+import multiprocessing
+import os
+import sys
+import uuid
+
+SERVER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'server')
+
+GREEN = '\033[92m'
+RED = '\033[91m'
+RESET = '\033[0m'
+
+WORKERS = 3
+TIMEOUT = 10
+
+
+def print_result(test_name, passed, details=""):
+    status = f"{GREEN}✓ PASS{RESET}" if passed else f"{RED}✗ FAIL{RESET}"
+    print(f"{status} | {test_name}")
+    if details and not passed:
+        print(f"       {details}")
+
+
+def _layer():
+    sys.path.insert(0, SERVER_DIR)
+    from django.conf import settings
+    if not settings.configured:
+        from auth_project import settings as project_settings
+        settings.configure(CHANNEL_LAYERS=project_settings.CHANNEL_LAYERS)
+    from channels.layers import get_channel_layer
+    return get_channel_layer()
+
+
+def _worker(group, ready_q, result_q):
+    layer = _layer()
+
+    async def run():
+        channel = await layer.new_channel()
+        await layer.group_add(group, channel)
+        ready_q.put(channel)
+        try:
+            message = await asyncio.wait_for(layer.receive(channel), TIMEOUT)
+            result_q.put((os.getpid(), message.get('data')))
+        except asyncio.TimeoutError:
+            result_q.put((os.getpid(), None))
+        finally:
+            await layer.group_discard(group, channel)
+
+    asyncio.run(run())
+
+
+def test_group_send_reaches_other_processes():
+    ctx = multiprocessing.get_context('spawn')
+    ready_q, result_q = ctx.Queue(), ctx.Queue()
+    group = f"user_test_{uuid.uuid4().hex}"
+    payload = {'type': 'message', 'id': uuid.uuid4().hex}
+
+    procs = [ctx.Process(target=_worker, args=(group, ready_q, result_q)) for _ in range(WORKERS)]
+    for p in procs:
+        p.start()
+
+    try:
+        for _ in procs:
+            ready_q.get(timeout=TIMEOUT)
+
+        layer = _layer()
+        asyncio.run(layer.group_send(group, {'type': 'chat.message', 'data': payload}))
+
+        results = [result_q.get(timeout=TIMEOUT + 5) for _ in procs]
+    finally:
+        for p in procs:
+            p.join(timeout=TIMEOUT)
+            if p.is_alive():
+                p.terminate()
+
+    received = [data for _, data in results if data == payload]
+    pids = {pid for pid, _ in results}
+    assert len(pids) == WORKERS and os.getpid() not in pids
+    assert len(received) == WORKERS, f"only {len(received)}/{WORKERS} workers got the event"
+
+
+if __name__ == "__main__":
+    try:
+        test_group_send_reaches_other_processes()
+        print_result("group_send reaches consumers in other worker processes", True)
+    except Exception as e:
+        print_result("group_send reaches consumers in other worker processes", False, repr(e))
+        sys.exit(1)
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+"""
+Google sign-in against the local stand-in issuer.
+
+Start the auth server with DEBUG on and the same key path, e.g.
+
+    GOOGLE_ID_TOKEN_LOCAL_KEY=/tmp/google_local_key.pem python manage.py runserver
+
+then run this script with the same GOOGLE_ID_TOKEN_LOCAL_KEY. It mints
+Google-shaped ID tokens with that key and checks the login endpoint.
+"""
+import os
+import sys
+import time
+
+import requests
+
+APP_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'app'))
+SERVER_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'server'))
+
+BASE_URL = "http://127.0.0.1:8000"
+LOGIN_URL = f"{BASE_URL}/accounts/google-login/"
+
+GREEN = '\033[92m'
+RED = '\033[91m'
+RESET = '\033[0m'
+
+
+def print_result(test_name, passed, details=""):
+    status = f"{GREEN}✓ PASS{RESET}" if passed else f"{RED}✗ FAIL{RESET}"
+    print(f"{status} | {test_name}")
+    if details and not passed:
+        print(f"       {details}")
+
+
+def setup_django():
+    sys.path.insert(0, SERVER_DIR)
+    sys.path.insert(0, APP_DIR)
+    os.environ.setdefault('GOOGLE_ID_TOKEN_LOCAL_KEY', '/tmp/google_local_key.pem')
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'auth_project.settings')
+    import django
+    django.setup()
+
+
+def main():
+    setup_django()
+    from accounts.google_auth import LocalIssuer
+
+    issuer = LocalIssuer(os.environ['GOOGLE_ID_TOKEN_LOCAL_KEY'])
+    ts = int(time.time())
+    sub = f"local-{ts}"
+    email = f"google{ts}@example.com"
+    ok = True
+
+    r = requests.post(LOGIN_URL, json={"id_token": issuer.mint(sub, email, name="Google Test")})
+    body = r.json() if r.ok else {}
+    user = body.get("user") or {}
+    passed = r.status_code == 200 and bool(body.get("tokens")) and not user.get("username", "g_").startswith("g_")
+    print_result("new Google user is created with a readable username", passed, f"{r.status_code} {r.text[:200]}")
+    ok &= passed
+
+    r = requests.post(LOGIN_URL, json={"id_token": issuer.mint(sub, email)})
+    passed = r.status_code == 200 and r.json().get("user", {}).get("id") == user.get("id")
+    print_result("returning Google user resolves to the same account", passed, f"{r.status_code} {r.text[:200]}")
+    ok &= passed
+
+    r = requests.post(LOGIN_URL, json={"id_token": issuer.mint(sub, email, audience="someone-else")})
+    passed = r.status_code == 401
+    print_result("token for another client id is rejected", passed, f"Status: {r.status_code}")
+    ok &= passed
+
+    r = requests.post(LOGIN_URL, json={"id_token": issuer.mint(sub, email, ttl=-3600)})
+    passed = r.status_code == 401
+    print_result("expired token is rejected", passed, f"Status: {r.status_code}")
+    ok &= passed
+
+    r = requests.post(LOGIN_URL, json={"id_token": issuer.mint(sub, email, email_verified=False)})
+    passed = r.status_code == 401
+    print_result("unverified Google email is rejected", passed, f"Status: {r.status_code}")
+    ok &= passed
+
+    r = requests.post(LOGIN_URL, json={"google_id": sub, "email": email})
+    passed = r.status_code == 400
+    print_result("client-supplied google_id / email alone is refused", passed, f"Status: {r.status_code}")
+    ok &= passed
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+"""
+Message-store contract check, run against every backend: append, newest
+page, paging backwards with `before`, `latest` across conversations and
+batched `rename_sender`.
+
+Needs the project database (Postgres backend) and a local mongod for the
+Mongo backend (MONGO_URI / MONGO_DB_NAME, e.g. mongodb://localhost:27017).
+Backends that can't connect are reported as skipped.
+"""
+import os
+import sys
+import time
+
+APP_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'app'))
+SERVER_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'server'))
+
+GREEN = '\033[92m'
+RED = '\033[91m'
+YELLOW = '\033[93m'
+RESET = '\033[0m'
+
+MESSAGES = 25
+PAGE = 10
+
+
+def print_result(test_name, passed, details=""):
+    status = f"{GREEN}✓ PASS{RESET}" if passed else f"{RED}✗ FAIL{RESET}"
+    print(f"{status} | {test_name}")
+    if details and not passed:
+        print(f"       {details}")
+
+
+def setup_django():
+    sys.path.insert(0, SERVER_DIR)
+    sys.path.insert(0, APP_DIR)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'auth_project.settings')
+    import django
+    django.setup()
+
+
+def check_backend(name):
+    from django.db import connection
+
+    from chat.message_store import MongoBucketMessageStore, get_message_store
+    from chat.models import Conversation
+
+    store = get_message_store(name)
+    try:
+        # every backend needs Postgres for the Conversation rows
+        connection.ensure_connection()
+        if isinstance(store, MongoBucketMessageStore):
+            store.buckets.database.client.admin.command('ping')
+            store.ensure_indexes()
+    except Exception as e:
+        print(f"{YELLOW}- SKIP{RESET} | {name}: {e}")
+        return True
+
+    conv_a = Conversation.objects.create(is_group=True, name='test_message_store_a')
+    conv_b = Conversation.objects.create(is_group=True, name='test_message_store_b')
+    ok = True
+    try:
+        sent = []
+        for i in range(MESSAGES):
+            sent.append(store.append(conv_a.id, sender_id='1', sender_username='alice',
+                                     ciphertext=f'c{i}'.encode(), metadata={'i': i}, sender_key_id=i % 3))
+            time.sleep(0.002)  # distinct timestamps so the order checks are exact
+        store.append(conv_b.id, sender_id='2', sender_username='bob', ciphertext=b'only')
+
+        rows, has_more = store.history(conv_a.id, PAGE)
+        passed = [bytes(r.ciphertext) for r in rows] == [f'c{i}'.encode() for i in range(MESSAGES - PAGE, MESSAGES)]
+        print_result(f"{name}: newest page oldest-first", passed and has_more)
+        ok &= passed and has_more
+
+        seen = [str(r.id) for r in rows]
+        before = (rows[0].timestamp, rows[0].id)
+        while has_more:
+            rows, has_more = store.history(conv_a.id, PAGE, before=before)
+            seen = [str(r.id) for r in rows] + seen
+            before = (rows[0].timestamp, rows[0].id) if rows else None
+        passed = seen == [str(m.id) for m in sent]
+        print_result(f"{name}: paging with before covers every message once", passed,
+                     f"got {len(seen)} ids, expected {len(sent)}")
+        ok &= passed
+
+        latest = store.latest([conv_a.id, conv_b.id], 5)
+        by_conv = {str(k): v for k, v in latest.items()}
+        passed = (
+            len(by_conv.get(str(conv_a.id), ([], False))[0]) == 5
+            and by_conv[str(conv_a.id)][1] is True
+            and [bytes(r.ciphertext) for r in by_conv.get(str(conv_b.id), ([], False))[0]] == [b'only']
+        )
+        print_result(f"{name}: latest per conversation", passed)
+        ok &= passed
+
+        rows, _ = store.history(conv_a.id, 1)
+        passed = rows[0].sender_key_id == (MESSAGES - 1) % 3 and rows[0].metadata == {'i': MESSAGES - 1}
+        print_result(f"{name}: sender_key_id and metadata round-trip", passed)
+        ok &= passed
+
+        # sender id no real user has, so the rename never touches other rows
+        renamer = 'test_rename_sender'
+        for i in range(5):
+            store.append(conv_b.id, sender_id=renamer, sender_username='carol', ciphertext=f'r{i}'.encode())
+        after, batches = None, 0
+        while True:
+            _, after = store.rename_sender(renamer, 'carol2', 2, after)
+            batches += 1
+            if after is None or batches > 10:
+                break
+        rows, _ = store.history(conv_b.id, 10)
+        passed = (
+            all(r.sender_username == 'carol2' for r in rows if r.sender_id == renamer)
+            and [r.sender_username for r in rows if r.sender_id == '2'] == ['bob']
+        )
+        print_result(f"{name}: rename_sender rewrites only that sender, in batches", passed)
+        ok &= passed
+    finally:
+        for conv in (conv_a, conv_b):
+            store.delete_conversation(conv.id)
+            conv.delete()
+    return ok
+
+
+def main():
+    setup_django()
+    from chat.message_store import MESSAGE_STORES
+
+    results = [check_backend(name) for name in sorted(MESSAGE_STORES)]
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == '__main__':
+    main()
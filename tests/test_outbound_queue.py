@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+"""
+OutboundQueue shedding and batching (chat/outbound.py): ephemeral drops
+on overflow, coalescing runs of messages into `batch` frames, the
+overflow policies and get_batch limits.
+
+Pure logic – no server, database or Redis needed.
+"""
+import asyncio
+import os
+import sys
+
+APP_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'app'))
+
+GREEN = '\033[92m'
+RED = '\033[91m'
+RESET = '\033[0m'
+
+
+def print_result(test_name, passed, details=""):
+    status = f"{GREEN}✓ PASS{RESET}" if passed else f"{RED}✗ FAIL{RESET}"
+    print(f"{status} | {test_name}")
+    if details and not passed:
+        print(f"       {details}")
+
+
+def setup_django():
+    sys.path.insert(0, APP_DIR)
+    from django.conf import settings
+    if not settings.configured:
+        # module defaults only; the queue reads nothing else
+        settings.configure()
+
+
+def msg(n):
+    return {'type': 'message', 'n': n}
+
+
+def queue(max_size, policy='disconnect'):
+    from chat.outbound import NodeStats, OutboundQueue
+    return OutboundQueue(max_size=max_size, policy=policy, stats=NodeStats())
+
+
+def check_ephemeral_overflow():
+    q = queue(3)
+    q.put({'type': 'typing'})
+    q.put({'type': 'read'})
+    q.put({'type': 'read'})
+    accepted = q.put(msg(1))
+    types = [i['type'] for i in q._items]
+    passed = accepted and types == ['read', 'read', 'message'] and q.stats.counters['dropped_ephemeral'] == 1
+    print_result("full queue drops a queued ephemeral event first", passed, f"{types}")
+    ok = passed
+
+    accepted = q.put({'type': 'presence'})
+    passed = accepted and len(q) == 3 and q.stats.counters['dropped_ephemeral'] == 2
+    print_result("incoming ephemeral event is dropped, not queued", passed, f"len={len(q)}")
+    return ok and passed
+
+
+def check_coalescing():
+    q = queue(2)
+    q.put(msg(1))
+    q.put(msg(2))
+    accepted = q.put(msg(3))
+    items = list(q._items)
+    passed = (
+        accepted
+        and len(items) == 2
+        and items[0] == {'type': 'batch', 'events': [msg(1), msg(2)]}
+        and items[1] == msg(3)
+        and q.stats.counters['coalesced'] == 1
+    )
+    print_result("full queue coalesces a run of messages into a batch frame", passed, f"{items}")
+    return passed
+
+
+def check_coalesce_cap():
+    import chat.outbound as outbound
+
+    saved = outbound.WS_COALESCE_MAX_EVENTS
+    outbound.WS_COALESCE_MAX_EVENTS = 2
+    try:
+        q = queue(3)
+        for n in range(3):
+            q.put(msg(n))
+        q.put(msg(3))
+        sizes = [len(i['events']) if i['type'] == 'batch' else 1 for i in q._items]
+        passed = sizes == [2, 1, 1]
+    finally:
+        outbound.WS_COALESCE_MAX_EVENTS = saved
+    print_result("coalescing respects CHAT_WS_COALESCE_MAX_EVENTS", passed, f"{sizes}")
+    return passed
+
+
+def check_policies():
+    q = queue(2)
+    q.put({'type': 'read', 'n': 1})
+    q.put({'type': 'read', 'n': 2})
+    disconnect = q.put({'type': 'read', 'n': 3}) is False
+
+    q = queue(2, policy='drop_oldest')
+    q.put({'type': 'read', 'n': 1})
+    q.put({'type': 'read', 'n': 2})
+    kept = q.put({'type': 'read', 'n': 3})
+    ns = [i['n'] for i in q._items]
+    passed = disconnect and kept and ns == [2, 3] and q.stats.counters['dropped_overflow'] == 1
+    print_result("overflow policy: disconnect / drop_oldest", passed, f"disconnect={disconnect} kept={ns}")
+    return passed
+
+
+def check_get_batch():
+    async def run():
+        q = queue(10)
+        q.put({'type': 'batch', 'events': [msg(0), msg(1)]})
+        for n in range(2, 5):
+            q.put(msg(n))
+        first = await q.get_batch(max_events=3, window=0.01)
+        rest = await q.get_batch(max_events=3, window=0.01)
+        return first, rest
+
+    first, rest = asyncio.run(run())
+    passed = (
+        [e['n'] for e in first] == [0, 1, 2]
+        and [e['n'] for e in rest] == [3, 4]
+    )
+    print_result("get_batch flattens batch frames and stops at max_events / window", passed,
+                 f"{first} {rest}")
+    return passed
+
+
+def main():
+    setup_django()
+    results = [
+        check_ephemeral_overflow(),
+        check_coalescing(),
+        check_coalesce_cap(),
+        check_policies(),
+        check_get_batch(),
+    ]
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == '__main__':
+    main()